@@ -0,0 +1,430 @@
+"""
+LexIQ Labs – Batch Runner
+
+Purpose:
+- Run contract generation (and optional Gemini refinement) over large
+  JSONL ticket exports with constant memory
+- Read input lazily through mmap; never build lists of records
+- Run deterministic stages inline, Gemini refinement on a bounded pool
+- Fall back to a locally composed reply when Gemini returns nothing
+- Write results to JSONL in input order
+- Checkpoint byte offsets so a killed job resumes where it stopped;
+  refuse to resume over an input that changed since (size, mtime)
+- Optionally tolerate typos in ticket keywords (--fuzzy)
+- Profile records on demand (profiling: LEXIQ_PROFILE, plus
+  LEXIQ_PROFILE_RATE, or "profile": true on a record with
+  LEXIQ_PROFILE_ALLOW_REQUESTS)
+
+Input lines:  {"id", "persona", "customer_message", "user_intent"?,
+               "empathy_summary"?, "clarifications"?, "voice_profile"?,
+               "language"? (detected when absent), "tone_mode"?}
+Output lines: {"id", "offset", "god_mode_id", "pain_point_id", "confidence",
+               "contract", "response", "source": gemini|fallback|null}
+              or {"id", "offset", "error": invalid_record|stage_error}
+
+A record that is malformed, or that makes a stage fail, becomes an
+error line; it never stops the run (a resumed run would only hit it
+again).
+
+Usage:
+    python batch_runner.py tickets.jsonl contracts.jsonl --refine --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import empathy_telemetry
+import event_log
+import gemini_refiner
+import gemini_scheduler
+import metrics
+import profiling
+from fallback_composer import compose_fallback
+from library_index import LibraryIndex
+from prompt_library import PromptLibrary
+from response_contract import build_response_contract
+
+BATCH_RECORDS = "lexiq_batch_records_total"
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+DEFAULT_CHECKPOINT_EVERY = 500
+
+INVALID_RECORD = "invalid_record"
+STAGE_ERROR = "stage_error"
+
+
+# ─────────────────────────────────────────
+# Input
+
+def iter_lines(path: str, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield (start_offset, end_offset, line) for each non-empty line,
+    beginning at byte offset `start`. The file is mapped, not read.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if start >= size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = start
+            while position < size:
+                newline = mm.find(b"\n", position)
+                end = size if newline == -1 else newline + 1
+                line = mm[position:end].strip()
+                if line:
+                    yield position, end, line
+                position = end
+
+
+# ─────────────────────────────────────────
+# Checkpoints
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class CheckpointMismatch(ValueError):
+    """The checkpoint was written for a different version of the input."""
+
+
+def input_identity(path: str) -> Dict:
+    """What a checkpoint's offsets are valid for: the input's path, size and mtime."""
+    stat = os.stat(path)
+    return {
+        "input": os.path.abspath(path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    """Atomic write: a crash leaves either the old or the new checkpoint."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ─────────────────────────────────────────
+# Runner
+
+class BatchRunner:
+    def __init__(
+        self,
+        *,
+        library: Optional[PromptLibrary] = None,
+        refine: bool = False,
+        candidates: int = 1,
+        concurrency: int = 8,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        fuzzy: bool = False,
+    ):
+        self.library = library or PromptLibrary.load()
+        self.index = LibraryIndex.from_library(self.library)
+        self.fuzzy = fuzzy
+        self.refine = refine
+        self.candidates = candidates
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+
+    # -------- Stages --------
+
+    def prepare(self, line: bytes, offset: int) -> Tuple[Dict, Optional[Callable]]:
+        """
+        Deterministic stages for one record.
+
+        Returns (result, job); job is the refinement call to run on the
+        pool, None when there is nothing to send to Gemini.
+        """
+        try:
+            record = json.loads(line)
+            persona = record["persona"]
+            customer_message = record["customer_message"]
+        except (ValueError, KeyError, TypeError):
+            return _error_line(None, offset, INVALID_RECORD), None
+        if not (isinstance(persona, str) and persona and isinstance(customer_message, str)):
+            return _error_line(record.get("id"), offset, INVALID_RECORD), None
+
+        request_id = str(record["id"]) if record.get("id") is not None else f"offset:{offset}"
+        capture = profiling.begin(request_id, force=record.get("profile") is True)
+        try:
+            return self._prepare_record(record, persona, customer_message, offset, request_id, capture)
+        except Exception:
+            if capture is not None:
+                capture.finish()
+            return _error_line(record.get("id"), offset, STAGE_ERROR), None
+
+    def _prepare_record(
+        self,
+        record: Dict,
+        persona: str,
+        customer_message: str,
+        offset: int,
+        request_id: str,
+        capture: Optional[profiling.Capture],
+    ) -> Tuple[Dict, Optional[Callable]]:
+        with profiling.attached(capture):
+            # Language-routed: non-English tickets match through the expansions
+            match = self.index.match_pain_point(
+                customer_message=customer_message,
+                persona=persona,
+                language=record.get("language") if isinstance(record.get("language"), str) else None,
+                fuzzy=self.fuzzy,
+            )
+            god_mode_prompt = self.index.select_god_mode_prompt(
+                persona=persona,
+                pain_point_match=match,
+            )
+            contract = build_response_contract(
+                customer_message=customer_message,
+                empathy_summary=record.get("empathy_summary", ""),
+                clarifications=record.get("clarifications") or {},
+                user_intent=record.get("user_intent", ""),
+                persona=persona,
+                god_mode_prompt=god_mode_prompt,
+                voice_profile=record.get("voice_profile"),
+            )
+
+        result = {
+            "id": record.get("id"),
+            "offset": offset,
+            "god_mode_id": god_mode_prompt.get("id"),
+            "pain_point_id": (match.get("pain_point") or {}).get("id"),
+            "confidence": match["confidence"],
+            "contract": contract,
+            "response": None,
+            "source": None,
+        }
+
+        if not self.refine:
+            if capture is not None:
+                capture.finish()
+            return result, None
+
+        tone_mode = record.get("tone_mode")
+        job = partial(
+            self.respond,
+            empathy_telemetry.build_prompt(contract),
+            contract,
+            god_mode_prompt,
+            tone_mode if isinstance(tone_mode, str) else "auto",
+            request_id=request_id,
+            capture=capture,
+        )
+        return result, job
+
+    def refine_one(self, instruction: str, contract: Dict) -> Optional[str]:
+        # Backfills must not take quota from interactive traffic
+        with gemini_scheduler.use_priority(gemini_scheduler.BACKGROUND):
+            if self.candidates > 1:
+                return gemini_refiner.refine_instruction_best(
+                    instruction,
+                    candidate_count=self.candidates,
+                    response_contract=contract,
+                )
+            return gemini_refiner.refine_instruction(instruction)
+
+    def respond(
+        self,
+        instruction: str,
+        contract: Dict,
+        god_mode_prompt: Dict,
+        tone_mode: str,
+        request_id: Optional[str] = None,
+        capture: Optional[profiling.Capture] = None,
+    ) -> Tuple[str, str]:
+        """
+        (response, source): the refined reply, or a composed one when
+        Gemini fails, times out or violates the constraints. Events are
+        tagged with request_id (the record id); a profiling capture
+        started in prepare() continues here and is written at the end.
+        """
+        try:
+            with event_log.request_context(request_id), profiling.attached(capture):
+                refined = self.refine_one(instruction, contract)
+                if refined:
+                    return refined, "gemini"
+                return compose_fallback(
+                    response_contract=contract,
+                    god_mode_prompt=god_mode_prompt,
+                    tone_mode=tone_mode,
+                ), "fallback"
+        finally:
+            if capture is not None:
+                capture.finish()
+
+    # -------- Driver --------
+
+    async def run(
+        self,
+        input_path: str,
+        output_path: str,
+        *,
+        checkpoint_path: Optional[str] = None,
+        resume: bool = True,
+    ) -> Dict:
+        """
+        Process input_path into output_path.
+
+        Memory is bounded by the reorder window (2 × concurrency records),
+        independent of input size. Raises CheckpointMismatch when the
+        checkpoint is for this input but the file changed since
+        (resume=False starts over).
+        """
+        checkpoint_path = checkpoint_path or output_path + CHECKPOINT_SUFFIX
+        identity = input_identity(input_path)
+        state = load_checkpoint(checkpoint_path) if resume else None
+        if state and (
+            state.get("input") != identity["input"]
+            or not os.path.exists(output_path)
+            or os.path.getsize(output_path) < state["output_size"]
+        ):
+            state = None
+        if state and any(state.get(key) != value for key, value in identity.items()):
+            # Its offsets would point into different records
+            raise CheckpointMismatch(
+                f"{input_path} changed since checkpoint {checkpoint_path} was written; "
+                "restart instead of resuming"
+            )
+
+        state = state or {
+            **identity,
+            "input_offset": 0,
+            "output_size": 0,
+            "records": 0,
+            "done": False,
+        }
+        stats = {"records": 0, "refined": 0, "fallback": 0, "invalid": 0, "failed": 0,
+                 "resumed_at": state["input_offset"]}
+
+        if state["done"]:
+            return {**stats, "skipped": "already complete"}
+
+        # Drop anything written after the last checkpoint
+        out = open(output_path, "r+b" if state["output_size"] else "wb")
+        out.truncate(state["output_size"])
+        out.seek(state["output_size"])
+
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-gemini")
+        window: deque = deque()
+        max_window = self.concurrency * 2
+        since_checkpoint = 0
+
+        async def commit_head() -> None:
+            nonlocal since_checkpoint
+            end, result, future = window.popleft()
+            if future is not None:
+                try:
+                    result["response"], result["source"] = await future
+                except Exception:
+                    result = _error_line(result["id"], result["offset"], STAGE_ERROR)
+                else:
+                    stats["refined" if result["source"] == "gemini" else "fallback"] += 1
+
+            error = result.get("error")
+            outcome = "ok" if error is None else "invalid" if error == INVALID_RECORD else "failed"
+            if outcome != "ok":
+                stats[outcome] += 1
+            stats["records"] += 1
+            metrics.inc(BATCH_RECORDS, outcome=outcome)
+
+            out.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+            state["input_offset"] = end
+            state["records"] += 1
+            since_checkpoint += 1
+
+            if since_checkpoint >= self.checkpoint_every:
+                out.flush()
+                os.fsync(out.fileno())
+                state["output_size"] = out.tell()
+                save_checkpoint(checkpoint_path, state)
+                since_checkpoint = 0
+
+        try:
+            for offset, end, line in iter_lines(input_path, state["input_offset"]):
+                result, job = self.prepare(line, offset)
+                future = None
+                if job is not None:
+                    future = loop.run_in_executor(pool, job)
+                window.append((end, result, future))
+
+                # In-order writes: drain finished heads, block when the window is full
+                while window and (len(window) >= max_window or _ready(window[0][2])):
+                    await commit_head()
+
+            while window:
+                await commit_head()
+
+            state["done"] = True
+        finally:
+            for _, _, future in window:
+                if future is not None:
+                    future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+            out.flush()
+            os.fsync(out.fileno())
+            state["output_size"] = out.tell()
+            out.close()
+            save_checkpoint(checkpoint_path, state)
+
+        return stats
+
+
+def _ready(future) -> bool:
+    return future is None or future.done()
+
+
+def _error_line(record_id, offset: int, error: str) -> Dict:
+    return {"id": record_id, "offset": offset, "error": error}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Streaming JSONL batch runner.")
+    parser.add_argument("input", help="JSONL ticket export")
+    parser.add_argument("output", help="JSONL results (written in input order)")
+    parser.add_argument("--refine", action="store_true", help="refine replies with Gemini")
+    parser.add_argument("--candidates", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel Gemini calls")
+    parser.add_argument("--checkpoint", help=f"default: <output>{CHECKPOINT_SUFFIX}")
+    parser.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY)
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--fuzzy", action="store_true", help="typo-tolerant pain point matching")
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(
+        refine=args.refine,
+        candidates=args.candidates,
+        concurrency=args.concurrency,
+        checkpoint_every=args.checkpoint_every,
+        fuzzy=args.fuzzy,
+    )
+    try:
+        stats = asyncio.run(runner.run(
+            args.input,
+            args.output,
+            checkpoint_path=args.checkpoint,
+            resume=not args.restart,
+        ))
+    except CheckpointMismatch as e:
+        parser.error(f"{e} (--restart)")
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+LexIQ Labs – Benchmarks
+
+Run from the repository root, e.g.:
+    python -m benchmarks.run --out bench.json
+"""
@@ -0,0 +1,236 @@
+"""
+LexIQ Labs – Fake Gemini Server
+
+Purpose:
+- Serve generateContent locally with configurable latency and error rate
+- Return plausible payloads for each Gemini-backed stage
+- Let benchmarks and load tests run without network or quota
+- Optionally enforce requests/minute and tokens/minute quotas (429)
+
+Usage:
+    python -m benchmarks.fake_gemini --port 8089 --latency 0.2
+    GEMINI_API_BASE=http://127.0.0.1:8089/v1beta
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from prompt_budget import estimate_tokens
+
+REFINED_REPLY = (
+    "Thanks for flagging this, and I can see why the delay has been frustrating. "
+    "I have looked into your account and the next step is a quick fix on our side, "
+    "which I will confirm by end of day. I will stay on this until it is resolved."
+)
+
+# Extra candidates returned for candidateCount > 1: one too long, one
+# with a forbidden phrase, one terse. Exercises local ranking.
+REFINED_VARIANTS = [
+    REFINED_REPLY,
+    REFINED_REPLY + " " + " ".join(["Honestly, this matters to us."] * 20),
+    "I understand. We will issue a refund right away.",
+    "Thanks, I'll look into it.",
+]
+
+QUESTIONS = "Which plan is the account on?\nWhen did this first start?"
+
+SIMULATION = json.dumps({
+    "simulated_reply": "Thanks, that helps. I'll wait for your update today.",
+    "emotional_direction": "improving",
+})
+
+VOICE_PROFILE = json.dumps({
+    "tone": "warm",
+    "formality": "medium",
+    "sentence_length": "short",
+    "directness": "high",
+    "apology_tendency": "low",
+    "warmth": "high",
+    "closing_style": "first name sign-off",
+})
+
+
+def canned_replies(prompt: str, count: int = 1) -> List[str]:
+    if "simulating a possible next customer reply" in prompt:
+        return [SIMULATION] * count
+    if "clarification questions" in prompt:
+        return [QUESTIONS] * count
+    if "analyzing writing style" in prompt:
+        return [VOICE_PROFILE] * count
+    return [REFINED_VARIANTS[i % len(REFINED_VARIANTS)] for i in range(count)]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # load tests open many connections at once
+
+
+class FakeGeminiServer:
+    """
+    Threaded HTTP server answering POST .../models/<model>:generateContent.
+
+    Use as a context manager; `endpoint` is ready for gemini_client.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        max_candidates: int = 8,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        quota_window: float = 60.0,
+        seed: int = 7,
+    ):
+        self.latency = latency
+        self.max_candidates = max_candidates
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.rejected = 0
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.quota_window = quota_window
+        self._usage = deque()  # (timestamp, tokens) inside the quota window
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes: with Nagle on,
+            # the client's delayed ACK adds ~40 ms to every call
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload = server.handle(body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = _HTTPServer((host, port), Handler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.base_url}/models/gemini-2.5-flash:generateContent"
+
+    def _over_quota(self, tokens: int) -> bool:
+        """Sliding-window quota check; call with the lock held."""
+        if not self.rpm_limit and not self.tpm_limit:
+            return False
+
+        now = time.monotonic()
+        while self._usage and self._usage[0][0] <= now - self.quota_window:
+            self._usage.popleft()
+
+        if self.rpm_limit and len(self._usage) >= self.rpm_limit:
+            return True
+        if self.tpm_limit and sum(t for _, t in self._usage) + tokens > self.tpm_limit:
+            return True
+
+        self._usage.append((now, tokens))
+        return False
+
+    def handle(self, body: Dict):
+        try:
+            prompt = body["contents"][0]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            prompt = None
+
+        with self._lock:
+            self.requests += 1
+            if prompt is not None and self._over_quota(estimate_tokens(prompt)):
+                self.rejected += 1
+                return 429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED",
+                                       "message": "fake quota exceeded"}}
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.error_rate
+
+        time.sleep(delay)
+
+        if fail:
+            return 500, {"error": {"code": 500, "message": "fake internal error"}}
+
+        if prompt is None:
+            return 400, {"error": {"code": 400, "message": "invalid payload"}}
+
+        count = int((body.get("generationConfig") or {}).get("candidateCount") or 1)
+        if count > self.max_candidates:
+            return 400, {"error": {"code": 400, "message": "candidateCount out of range"}}
+
+        return 200, {
+            "candidates": [
+                {"content": {"role": "model", "parts": [{"text": text}]}}
+                for text in canned_replies(prompt, count)
+            ]
+        }
+
+    def start(self) -> "FakeGeminiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local fake Gemini server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-candidates", type=int, default=8)
+    parser.add_argument("--rpm-limit", type=int, default=0)
+    parser.add_argument("--tpm-limit", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        max_candidates=args.max_candidates,
+        rpm_limit=args.rpm_limit,
+        tpm_limit=args.tpm_limit,
+    )
+    print(f"Fake Gemini listening on {server.base_url}")
+    server._httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+LexIQ Labs – Fuzzy Matching Benchmark
+
+Purpose:
+- Misspell the synthetic corpus: each keyword word of at least four
+  letters gets one random edit (delete, insert, substitute, transpose)
+  with probability --typo-rate
+- Compare exact and fuzzy matching on clean and misspelled messages:
+  latency, and how often the message's source pain point is found
+- Check the budget: fuzzy match latency within --max-ratio (default 2x)
+  of exact, and no change on clean messages
+- Report the deletion index build time and size
+
+Usage:
+    python -m benchmarks.fuzzy --messages 500 --typo-rate 0.5
+"""
+
+import argparse
+import random
+import string
+import sys
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from benchmarks.harness import measure_stage, report_meta, write_report
+from benchmarks.synthetic import generate_corpus
+from fuzzy_matcher import MIN_LENGTH_DISTANCE_1
+from library_index import LibraryIndex
+from pain_point_matcher import pain_point_tags
+from prompt_library import PromptLibrary
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """One random edit that keeps the first letter (people rarely miss it)."""
+    i = rng.randrange(1, len(word))
+    edit = rng.choice(("delete", "insert", "substitute", "transpose"))
+    if edit == "delete":
+        return word[:i] + word[i + 1:]
+    if edit == "insert":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if edit == "substitute":
+        return word[:i] + rng.choice(string.ascii_lowercase.replace(word[i], "")) + word[i + 1:]
+    if i == len(word) - 1:
+        i -= 1
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def misspell_corpus(library: PromptLibrary, corpus: List[Dict], rate: float, seed: int) -> List[Dict]:
+    """Copies of the corpus messages with typos in their pain point's keywords."""
+    rng = random.Random(seed)
+    keyword_words = {
+        pain_point.get("id"): {
+            word for tag in pain_point_tags(pain_point) for word in tag.lower().split()
+            if word.isalpha() and len(word) >= MIN_LENGTH_DISTANCE_1
+        }
+        for persona in library.personas
+        for pain_point in library.pain_points_for(persona)
+    }
+
+    misspelled = []
+    for item in corpus:
+        words = keyword_words.get(item["source_pain_point_id"], ())
+        message = " ".join(
+            misspell(word, rng) if word.lower() in words and rng.random() < rate else word
+            for word in item["customer_message"].split()
+        )
+        misspelled.append(dict(item, customer_message=message))
+    return misspelled
+
+
+def hit_rate(index: LibraryIndex, corpus: List[Dict], fuzzy: bool) -> float:
+    on_topic = [item for item in corpus if item["source_pain_point_id"]]
+    hits = 0
+    for item in on_topic:
+        match = index.match_pain_point(
+            customer_message=item["customer_message"], persona=item["persona"], fuzzy=fuzzy,
+        )
+        if match["matched"] and match["pain_point"].get("id") == item["source_pain_point_id"]:
+            hits += 1
+    return round(hits / len(on_topic), 4) if on_topic else 0.0
+
+
+def changed_on_clean(index: LibraryIndex, corpus: List[Dict]) -> int:
+    """Clean messages whose top pain point differs between exact and fuzzy."""
+    changed = 0
+    for item in corpus:
+        kwargs = dict(customer_message=item["customer_message"], persona=item["persona"])
+        exact = index.match_pain_point(**kwargs)
+        fuzzy = index.match_pain_point(**kwargs, fuzzy=True)
+        if (exact["pain_point"] or {}).get("id") != (fuzzy["pain_point"] or {}).get("id"):
+            changed += 1
+    return changed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exact vs typo-tolerant pain point matching.")
+    parser.add_argument("--messages", type=int, default=500, help="per persona")
+    parser.add_argument("--typo-rate", type=float, default=0.5, help="share of keyword words misspelled")
+    parser.add_argument("--max-ratio", type=float, default=2.0, help="fuzzy / exact p50 latency budget")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    library = PromptLibrary.load()
+    index = LibraryIndex.from_library(library)
+    clean = generate_corpus(library, count_per_persona=args.messages, seed=args.seed)
+    typos = misspell_corpus(library, clean, args.typo_rate, args.seed)
+
+    start = perf_counter()
+    vocabulary = index.fuzzy_index()
+    build_ms = round((perf_counter() - start) * 1000, 1)
+
+    def exact(item: Dict) -> Dict:
+        return index.match_pain_point(customer_message=item["customer_message"], persona=item["persona"])
+
+    def fuzzy(item: Dict) -> Dict:
+        return index.match_pain_point(
+            customer_message=item["customer_message"], persona=item["persona"], fuzzy=True,
+        )
+
+    stages = {
+        "exact_clean": measure_stage(exact, clean),
+        "fuzzy_clean": measure_stage(fuzzy, clean),
+        "exact_typos": measure_stage(exact, typos),
+        "fuzzy_typos": measure_stage(fuzzy, typos),
+    }
+    ratios = {
+        corpus: round(stages[f"fuzzy_{corpus}"]["p50_us"] / stages[f"exact_{corpus}"]["p50_us"], 3)
+        for corpus in ("clean", "typos")
+    }
+    changed = changed_on_clean(index, clean)
+
+    write_report({
+        "meta": report_meta(**vars(args)),
+        "deletion_index": {"words": len(vocabulary), "build_ms": build_ms},
+        "stages": stages,
+        "p50_ratio": ratios,
+        "within_budget": all(ratio <= args.max_ratio for ratio in ratios.values()),
+        "hit_rate": {
+            "exact_clean": hit_rate(index, clean, fuzzy=False),
+            "exact_typos": hit_rate(index, typos, fuzzy=False),
+            "fuzzy_typos": hit_rate(index, typos, fuzzy=True),
+        },
+        "changed_on_clean": changed,
+    }, args.out)
+    return 0 if all(ratio <= args.max_ratio for ratio in ratios.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
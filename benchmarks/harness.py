@@ -0,0 +1,131 @@
+"""
+LexIQ Labs – Benchmark Harness
+
+Purpose:
+- Time a stage over a list of inputs (per-call latency, throughput)
+- Measure peak allocation of a stage with tracemalloc (separate pass)
+- Summarize as p50/p95/p99 and compare reports between commits
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from time import perf_counter, perf_counter_ns
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_ns: List[int], wall_seconds: float) -> Dict:
+    values = sorted(latencies_ns)
+    calls = len(values)
+    return {
+        "calls": calls,
+        "throughput_per_s": round(calls / wall_seconds, 1) if wall_seconds else None,
+        "mean_us": round(sum(values) / calls / 1000, 2) if calls else 0.0,
+        "p50_us": round(percentile(values, 0.50) / 1000, 2),
+        "p95_us": round(percentile(values, 0.95) / 1000, 2),
+        "p99_us": round(percentile(values, 0.99) / 1000, 2),
+        "max_us": round(values[-1] / 1000, 2) if calls else 0.0,
+    }
+
+
+def measure_stage(
+    fn: Callable,
+    inputs: Sequence,
+    *,
+    memory_sample: Optional[int] = 200,
+    warmup: int = 5,
+) -> Dict:
+    """
+    Run fn(item) for every input and report latency + peak memory.
+
+    Memory is measured in a separate, smaller pass so tracemalloc
+    overhead does not distort latency numbers.
+    """
+    for item in inputs[:warmup]:
+        fn(item)
+
+    latencies: List[int] = []
+    start = perf_counter()
+    for item in inputs:
+        t0 = perf_counter_ns()
+        fn(item)
+        latencies.append(perf_counter_ns() - t0)
+    wall = perf_counter() - start
+
+    result = summarize(latencies, wall)
+
+    if memory_sample:
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            for item in inputs[:memory_sample]:
+                fn(item)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result["peak_alloc_kb"] = round((peak - baseline) / 1024, 1)
+
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_meta(**params) -> Dict:
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+    }
+
+
+def compare(current: Dict, baseline: Dict, *, tolerance: float = 0.2) -> Dict:
+    """
+    Per-stage ratios (current / baseline) for p50/p95/p99.
+    Stages slower than 1 + tolerance at p95 are flagged.
+    """
+    comparison = {}
+    for stage, now in current.get("stages", {}).items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        ratios = {
+            key: round(now[key] / before[key], 3) if before.get(key) else None
+            for key in ("p50_us", "p95_us", "p99_us")
+        }
+        ratios["regression"] = bool(
+            ratios["p95_us"] and ratios["p95_us"] > 1 + tolerance
+        )
+        comparison[stage] = ratios
+    return comparison
+
+
+def write_report(report: Dict, out: Optional[str]) -> None:
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,165 @@
+"""
+LexIQ Labs – Service Load Test
+
+Purpose:
+- Drive the HTTP service with concurrent clients against a fake Gemini server
+- Mix deterministic routes (match, contract) with Gemini routes
+  (refine, questions, time-travel)
+- Report status counts, latency percentiles and throughput per route,
+  including 429s produced by backpressure
+
+Usage:
+    python -m benchmarks.load_test --clients 200 --requests 2000 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from collections import Counter, defaultdict
+from time import perf_counter, perf_counter_ns
+from typing import Dict, List, Optional
+
+import gemini_client
+import gemini_refiner
+from benchmarks.fake_gemini import REFINED_REPLY, FakeGeminiServer
+from benchmarks.harness import report_meta, summarize, write_report
+from benchmarks.synthetic import generate_corpus
+from prompt_library import PromptLibrary
+from server import EngineService
+
+ROUTE_MIX = [
+    ("/match", 4),
+    ("/contract", 2),
+    ("/refine", 2),
+    ("/questions", 1),
+    ("/time-travel", 1),
+]
+
+
+async def _request(host: str, port: int, path: str, body: Dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode("utf-8")
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1") + data
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    status = int(raw.split(b" ", 2)[1])
+    return status
+
+
+async def run_load(
+    *,
+    host: str,
+    port: int,
+    corpus: List[Dict],
+    clients: int,
+    total: int,
+    seed: int,
+) -> Dict:
+    rng = random.Random(seed)
+    routes = [r for r, w in ROUTE_MIX for _ in range(w)]
+    jobs = asyncio.Queue()
+    for i in range(total):
+        item = corpus[i % len(corpus)]
+        body = {
+            "customer_message": item["customer_message"],
+            "persona": item["persona"],
+            "user_intent": "Acknowledge and commit to a follow-up today.",
+            "drafted_response": REFINED_REPLY,
+        }
+        jobs.put_nowait((rng.choice(routes), body))
+
+    latencies: Dict[str, List[int]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def client():
+        while True:
+            try:
+                path, body = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = perf_counter_ns()
+            try:
+                status = await _request(host, port, path, body)
+            except (ConnectionError, OSError):
+                status = 0
+            latencies[path].append(perf_counter_ns() - t0)
+            statuses[path][status] += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    wall = perf_counter() - start
+
+    routes_report = {}
+    for path, values in latencies.items():
+        routes_report[path] = summarize(values, wall)
+        routes_report[path]["status"] = dict(statuses[path])
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    overall = summarize(all_latencies, wall)
+    overall["status"] = dict(sum(statuses.values(), Counter()))
+    return {"overall": overall, "routes": routes_report}
+
+
+async def _main(args) -> Dict:
+    library = PromptLibrary.load()
+    corpus = generate_corpus(library, count_per_persona=100, seed=args.seed)
+
+    with FakeGeminiServer(latency=args.latency, jitter=args.jitter) as fake:
+        gemini_client.GEMINI_ENDPOINT = fake.endpoint
+        gemini_refiner.GEMINI_API_KEY = "load-test"
+        os.environ["GEMINI_API_KEY"] = "load-test"
+
+        service = EngineService(
+            library=library,
+            concurrency=args.concurrency,
+            queue_size=args.queue,
+            gemini_workers=args.gemini_workers,
+        )
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        try:
+            result = await run_load(
+                host="127.0.0.1", port=port, corpus=corpus,
+                clients=args.clients, total=args.requests, seed=args.seed,
+            )
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+        result["fake_gemini_requests"] = fake.requests
+
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the LexIQ HTTP service.")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--gemini-workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake Gemini seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(_main(args))
+    write_report({"meta": report_meta(**vars(args)), **result}, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
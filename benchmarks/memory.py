@@ -0,0 +1,190 @@
+"""
+LexIQ Labs – Library Memory Benchmark
+
+Purpose:
+- Compare the dict form (PromptLibrary) and the compact form
+  (CompactLibrary) of a prompt library scaled up N× (default 50×)
+- Report retained heap (tracemalloc), GC-tracked object counts and
+  match+select latency for both forms
+- Fork workers after loading and report each worker's private (copied)
+  memory after a workload and a full GC pass, with and without
+  gc.freeze — i.e. how much copy-on-write sharing survives
+
+Usage:
+    python -m benchmarks.memory --scale 50 --workers 4
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.harness import measure_stage, report_meta, write_report
+from benchmarks.synthetic import generate_corpus
+from compact_library import CompactLibrary, freeze_for_fork
+from pain_point_matcher import TAG_FORMS, match_pain_point, select_god_mode_prompt
+from prompt_library import PromptLibrary
+
+FORMS = {"dict": PromptLibrary, "compact": CompactLibrary}
+
+
+def _source(entry: Dict) -> Dict:
+    # The YAML fields only: the libraries compute TAG_FORMS themselves
+    return {key: value for key, value in entry.items() if key != TAG_FORMS}
+
+
+def scaled_sources(library: PromptLibrary, scale: int) -> Dict[str, str]:
+    """
+    Replicate every entry `scale` times with distinct ids and texts.
+
+    Returned as JSON text so each load builds fresh, unshared strings —
+    the same object layout a YAML parse of a large library produces.
+    """
+    god_mode = {}
+    for persona, entries in library.god_mode_sections.items():
+        god_mode[persona] = []
+        for copy in range(scale):
+            for entry in entries:
+                scaled = dict(_source(entry), id=f"{entry['id']}_x{copy}")
+                scaled["prompts"] = {
+                    mode: [
+                        {"id": f"{ex['id']}_x{copy}", "text": f"{ex['text']} [{copy}]"}
+                        for ex in examples
+                    ]
+                    for mode, examples in entry.get("prompts", {}).items()
+                }
+                god_mode[persona].append(scaled)
+
+    pain_points = {"pain_points": {
+        persona: [
+            dict(_source(entry), id=f"{entry['id']}_x{copy}", text=f"{entry['text']} [{copy}]")
+            for copy in range(scale)
+            for entry in entries
+        ]
+        for persona, entries in library.pain_point_sections.items()
+    }}
+
+    return {"god_mode": json.dumps(god_mode), "pain_points": json.dumps(pain_points)}
+
+
+def build(form: str, sources: Dict[str, str]):
+    return FORMS[form](
+        god_mode=json.loads(sources["god_mode"]),
+        pain_points=json.loads(sources["pain_points"]),
+    )
+
+
+def measure_retained(fn: Callable) -> Dict:
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    try:
+        result = fn()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    objects = len(gc.get_objects()) - objects_before
+    del result
+    return {"retained_mb": round(retained / 2**20, 2), "gc_tracked_objects": objects}
+
+
+def _private_kb() -> Optional[int]:
+    """Private (unshared) resident memory of this process, Linux only."""
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    return sum(int(fields.get(k, "0 kB").split()[0]) for k in ("Private_Dirty", "Private_Clean"))
+
+
+def _workload(library, corpus: List[Dict]) -> None:
+    for item in corpus:
+        match = match_pain_point(
+            customer_message=item["customer_message"],
+            pain_points=library.pain_points_for(item["persona"]),
+        )
+        select_god_mode_prompt(
+            persona=item["persona"],
+            god_mode_prompts=library.god_mode_prompts,
+            pain_point_match=match,
+        )
+
+
+def measure_fork(library, corpus: List[Dict], *, workers: int, freeze: bool) -> Optional[Dict]:
+    """
+    Fork `workers` children that run the workload plus a full collection
+    and report their private memory (the pages they had to copy).
+    """
+    if not hasattr(os, "fork") or _private_kb() is None:
+        return None
+
+    if freeze:
+        freeze_for_fork()
+
+    readers = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _workload(library, corpus)
+            gc.collect()
+            os.write(write_fd, str(_private_kb()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        readers.append((pid, read_fd))
+
+    private = []
+    for pid, read_fd in readers:
+        with os.fdopen(read_fd, "rb") as f:
+            private.append(int(f.read() or 0))
+        os.waitpid(pid, 0)
+
+    if freeze:
+        gc.unfreeze()
+
+    return {
+        "workers": workers,
+        "private_mb_per_worker": round(sum(private) / len(private) / 1024, 2),
+        "private_mb_total": round(sum(private) / 1024, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dict vs compact prompt library memory.")
+    parser.add_argument("--scale", type=int, default=50, help="library size multiplier")
+    parser.add_argument("--workers", type=int, default=4, help="forked workers")
+    parser.add_argument("--messages", type=int, default=300, help="per persona")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    base = PromptLibrary.load()
+    sources = scaled_sources(base, args.scale)
+    corpus = generate_corpus(base, count_per_persona=args.messages, seed=args.seed)
+
+    report = {"meta": report_meta(**vars(args)), "forms": {}}
+    for form in FORMS:
+        result = measure_retained(lambda: build(form, sources))
+
+        library = build(form, sources)
+        result["match_select"] = measure_stage(
+            lambda item: _workload(library, [item]), corpus, memory_sample=None,
+        )
+        result["fork"] = measure_fork(library, corpus, workers=args.workers, freeze=False)
+        result["fork_frozen"] = measure_fork(library, corpus, workers=args.workers, freeze=True)
+        report["forms"][form] = result
+        del library
+        gc.collect()
+
+    write_report(report, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+LexIQ Labs – Pipeline Benchmark
+
+Purpose:
+- Replay synthetic messages through the deterministic core
+  (normalize → match → select → contract → fallback → constraint check)
+- Measure the Gemini-backed stages against a local fake server
+- Report throughput, p50/p95/p99 and peak memory per stage as JSON
+
+Usage:
+    python -m benchmarks.run --messages 500 --out bench.json
+    python -m benchmarks.run --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import blender
+import empathy_telemetry
+import gemini_client
+import gemini_refiner
+import question_generator
+import time_travel
+import voice_profile
+from benchmarks.fake_gemini import REFINED_REPLY, FakeGeminiServer
+from benchmarks.harness import compare, measure_stage, report_meta, write_report
+from benchmarks.synthetic import TRANSLATED, generate_corpus, generate_translated_messages
+from fallback_composer import compose_fallback
+from library_index import LibraryIndex
+from pain_point_matcher import match_pain_point, normalize, select_god_mode_prompt
+from prompt_library import PromptLibrary
+from response_contract import build_response_contract
+from similarity_selector import SimilarityIndex
+from thread_context import ThreadContext
+
+WRITING_SAMPLES = [
+    "Hi Sam, thanks for the quick note. I've checked and the fix is live now.",
+    "Totally fair question. Short answer: yes, and I'll send details by Friday.",
+    "Appreciate your patience here. I'll own this one until it's closed out.",
+]
+
+
+def _contract(item: Dict, god_mode_prompt: Dict) -> Dict:
+    return build_response_contract(
+        customer_message=item["customer_message"],
+        empathy_summary="Customer sounds frustrated and wants a clear next step.",
+        clarifications={},
+        user_intent="Acknowledge the issue and commit to a follow-up today.",
+        persona=item["persona"],
+        god_mode_prompt=god_mode_prompt,
+    )
+
+
+def run_core(library: PromptLibrary, corpus: List[Dict], memory_sample: int) -> Dict:
+    stages: Dict[str, Dict] = {}
+
+    stages["normalize"] = measure_stage(
+        lambda item: normalize(item["customer_message"]),
+        corpus, memory_sample=memory_sample,
+    )
+
+    stages["match_pain_point"] = measure_stage(
+        lambda item: match_pain_point(
+            customer_message=item["customer_message"],
+            pain_points=library.pain_points_for(item["persona"]),
+        ),
+        corpus, memory_sample=memory_sample,
+    )
+
+    matched = [
+        (
+            item,
+            match_pain_point(
+                customer_message=item["customer_message"],
+                pain_points=library.pain_points_for(item["persona"]),
+            ),
+        )
+        for item in corpus
+    ]
+
+    stages["select_god_mode_prompt"] = measure_stage(
+        lambda pair: select_god_mode_prompt(
+            persona=pair[0]["persona"],
+            god_mode_prompts=library.god_mode_prompts,
+            pain_point_match=pair[1],
+        ),
+        matched, memory_sample=memory_sample,
+    )
+
+    selected = [
+        (
+            item,
+            select_god_mode_prompt(
+                persona=item["persona"],
+                god_mode_prompts=library.god_mode_prompts,
+                pain_point_match=match,
+            ),
+        )
+        for item, match in matched
+    ]
+
+    index = LibraryIndex.from_library(library)
+    stages["index_match_select"] = measure_stage(
+        lambda item: index.select_god_mode_prompt(
+            persona=item["persona"],
+            pain_point_match=index.match_pain_point(
+                customer_message=item["customer_message"], persona=item["persona"],
+            ),
+        ),
+        corpus, memory_sample=memory_sample,
+    )
+
+    translated = [
+        item
+        for language in TRANSLATED
+        for persona in library.personas
+        for item in generate_translated_messages(
+            library, persona=persona, language=language, count=max(1, len(corpus) // 30),
+        )
+    ]
+    if translated:
+        stages["index_match_translated"] = measure_stage(
+            lambda item: index.match_pain_point(
+                customer_message=item["customer_message"], persona=item["persona"],
+            ),
+            translated, memory_sample=memory_sample,
+        )
+
+    similarity = SimilarityIndex.from_library(library)
+    if similarity.available:
+        stages["similarity_select"] = measure_stage(
+            lambda item: similarity.select(
+                customer_message=item["customer_message"],
+                persona=item["persona"],
+                pain_point_match=index.match_pain_point(
+                    customer_message=item["customer_message"], persona=item["persona"],
+                ),
+                index=index,
+            ),
+            corpus, memory_sample=memory_sample,
+        )
+
+    edits = [
+        (persona, dict(entry))
+        for persona in library.personas
+        for entry in library.pain_points_for(persona)
+    ]
+    stages["index_upsert"] = measure_stage(
+        lambda edit: index.upsert_pain_point(*edit), edits, memory_sample=memory_sample,
+    )
+
+    stages["build_response_contract"] = measure_stage(
+        lambda pair: _contract(*pair), selected, memory_sample=memory_sample,
+    )
+
+    stages["blend"] = measure_stage(
+        lambda pair: blender.blend(
+            customer_message=pair[0]["customer_message"],
+            persona=pair[0]["persona"],
+            empathy_summary="",
+            clarifications=None,
+            user_intent="Acknowledge and commit to a follow-up.",
+            god_mode_prompt=pair[1],
+        ),
+        selected, memory_sample=memory_sample,
+    )
+
+    contracts = [(_contract(item, prompt), prompt) for item, prompt in selected]
+    stages["compose_fallback"] = measure_stage(
+        lambda pair: compose_fallback(response_contract=pair[0], god_mode_prompt=pair[1]),
+        contracts, memory_sample=memory_sample,
+    )
+
+    # One long thread: a turn must cost the same at turn 10 and turn 10,000
+    thread = ThreadContext()
+    for item, match in matched:
+        thread.add_customer_turn(item["customer_message"], match=match)
+        thread.add_agent_turn(REFINED_REPLY)
+    stages["thread_turn"] = measure_stage(
+        lambda pair: (thread.add_customer_turn(pair[0]["customer_message"], match=pair[1]), thread.summary()),
+        matched, memory_sample=memory_sample,
+    )
+
+    drafts = [
+        example["text"]
+        for prompt in library.god_mode_prompts
+        for mode in ("safe", "direct")
+        for example in prompt.get("prompts", {}).get(mode, [])
+    ] + [REFINED_REPLY, REFINED_REPLY + " We guarantee a refund."]
+
+    stages["constraint_check"] = measure_stage(
+        gemini_refiner._violates_constraints, drafts, memory_sample=memory_sample,
+    )
+
+    match_rate = sum(1 for _, m in matched if m["matched"]) / (len(matched) or 1)
+    return {"stages": stages, "match_rate": round(match_rate, 3)}
+
+
+def run_gemini(
+    library: PromptLibrary,
+    corpus: List[Dict],
+    *,
+    calls: int,
+    latency: float,
+    jitter: float,
+) -> Dict:
+    sample = corpus[:calls]
+    contracts = [
+        _contract(
+            item,
+            select_god_mode_prompt(
+                persona=item["persona"],
+                god_mode_prompts=library.god_mode_prompts,
+                pain_point_match={"matched": False},
+            ),
+        )
+        for item in sample
+    ]
+
+    original_endpoint = gemini_client.GEMINI_ENDPOINT
+    original_key = gemini_refiner.GEMINI_API_KEY
+    original_env = os.environ.get("GEMINI_API_KEY")
+
+    stages: Dict[str, Dict] = {}
+
+    with FakeGeminiServer(latency=latency, jitter=jitter) as server:
+        gemini_client.GEMINI_ENDPOINT = server.endpoint
+        gemini_refiner.GEMINI_API_KEY = "benchmark"
+        os.environ["GEMINI_API_KEY"] = "benchmark"
+
+        try:
+            stages["gemini_refine_instruction"] = measure_stage(
+                lambda c: gemini_refiner.refine_instruction(empathy_telemetry.build_prompt(c)),
+                contracts, memory_sample=None, warmup=1,
+            )
+            stages["gemini_refine_best_of_3"] = measure_stage(
+                lambda c: gemini_refiner.refine_instruction_best(
+                    empathy_telemetry.build_prompt(c),
+                    candidate_count=3,
+                    response_contract=c,
+                ),
+                contracts, memory_sample=None, warmup=1,
+            )
+            stages["gemini_refine_response"] = measure_stage(
+                lambda c: empathy_telemetry.refine_response(response_contract=c),
+                contracts, memory_sample=None, warmup=1,
+            )
+            stages["gemini_questions"] = measure_stage(
+                lambda item: question_generator.generate_questions(
+                    customer_message=item["customer_message"], persona=item["persona"],
+                ),
+                sample, memory_sample=None, warmup=1,
+            )
+            stages["gemini_time_travel"] = measure_stage(
+                lambda item: time_travel.simulate_time_travel(
+                    customer_message=item["customer_message"],
+                    drafted_response=REFINED_REPLY,
+                    persona=item["persona"],
+                ),
+                sample, memory_sample=None, warmup=1,
+            )
+            stages["gemini_voice_profile"] = measure_stage(
+                lambda _: voice_profile.create_voice_profile(writing_samples=WRITING_SAMPLES),
+                sample, memory_sample=None, warmup=1,
+            )
+        finally:
+            gemini_client.GEMINI_ENDPOINT = original_endpoint
+            gemini_refiner.GEMINI_API_KEY = original_key
+            if original_env is None:
+                os.environ.pop("GEMINI_API_KEY", None)
+            else:
+                os.environ["GEMINI_API_KEY"] = original_env
+
+    return stages
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the LexIQ pipeline.")
+    parser.add_argument("--messages", type=int, default=500, help="messages per persona")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--memory-sample", type=int, default=200)
+    parser.add_argument("--gemini-calls", type=int, default=20, help="0 to skip")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake Gemini seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    library = PromptLibrary.load()
+    corpus = generate_corpus(library, count_per_persona=args.messages, seed=args.seed)
+
+    core = run_core(library, corpus, args.memory_sample)
+    stages = dict(core["stages"])
+
+    if args.gemini_calls:
+        stages.update(run_gemini(
+            library, corpus,
+            calls=args.gemini_calls, latency=args.latency, jitter=args.jitter,
+        ))
+
+    report = {
+        "meta": report_meta(**vars(args)),
+        "corpus": {"messages": len(corpus), "match_rate": core["match_rate"]},
+        "stages": stages,
+    }
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    write_report(report, args.out)
+
+    regressions = [s for s, c in report.get("comparison", {}).items() if c["regression"]]
+    if regressions:
+        print(f"p95 regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+LexIQ Labs – Gemini Scheduler Benchmark
+
+Purpose:
+- Reproduce a quota incident locally: a background burst (voice profiles)
+  and steady interactive traffic share one key against a fake server
+  that enforces a requests-per-window quota
+- Run the same workload unscheduled and through gemini_scheduler
+- Report outcomes (ok / rate_limited / deadline_exceeded) and latency
+  per stage
+
+The quota window is shortened (default 6 s) on both the fake server
+and the scheduler so the run takes seconds instead of minutes.
+
+Usage:
+    python -m benchmarks.scheduler --quota 20 --window 6 --background 60 --interactive 40
+"""
+
+import argparse
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, perf_counter_ns
+from typing import Dict, List, Optional
+
+import gemini_client
+import gemini_scheduler
+from benchmarks.fake_gemini import FakeGeminiServer
+from benchmarks.harness import report_meta, summarize, write_report
+
+# stage → share of the steady (non-burst) traffic
+STEADY_MIX = [
+    ("refine_instruction", 6),
+    ("questions", 2),
+    ("time_travel", 2),
+]
+
+
+def _payload(stage: str) -> Dict:
+    return {"contents": [{"parts": [{"text": f"[{stage}] benchmark prompt " * 20}]}]}
+
+
+def run_workload(*, background: int, interactive: int, duration: float, seed_offset: int = 0) -> Dict:
+    """
+    Fire `background` voice_profile calls at t=0, then spread
+    `interactive` mixed calls evenly over `duration` seconds.
+    """
+    steady = [stage for stage, weight in STEADY_MIX for _ in range(weight)]
+    outcomes: Dict[str, Counter] = defaultdict(Counter)
+    latencies: Dict[str, List[int]] = defaultdict(list)
+    lock = threading.Lock()
+
+    def call(stage: str) -> None:
+        t0 = perf_counter_ns()
+        try:
+            gemini_client.generate_content(
+                stage=stage, payload=_payload(stage), timeout=10, api_key="benchmark",
+            )
+            outcome = "ok"
+        except gemini_client.GeminiError as e:
+            outcome = e.reason
+        with lock:
+            outcomes[stage][outcome] += 1
+            if outcome == "ok":
+                latencies[stage].append(perf_counter_ns() - t0)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=background + interactive) as pool:
+        for _ in range(background):
+            pool.submit(call, "voice_profile")
+        for i in range(interactive):
+            time.sleep(duration / max(1, interactive))
+            pool.submit(call, steady[(i + seed_offset) % len(steady)])
+    wall = perf_counter() - start
+
+    stages = {}
+    for stage, counts in outcomes.items():
+        stages[stage] = {
+            "outcomes": dict(counts),
+            "latency_ok": summarize(latencies[stage], wall) if latencies[stage] else None,
+        }
+    return {"wall_s": round(wall, 2), "stages": stages}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Gemini rate-limit scheduler.")
+    parser.add_argument("--quota", type=int, default=20, help="fake requests per window")
+    parser.add_argument("--window", type=float, default=6.0, help="fake quota window (s)")
+    parser.add_argument("--headroom", type=float, default=0.9, help="scheduler share of quota")
+    parser.add_argument("--background", type=int, default=60)
+    parser.add_argument("--interactive", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    quota = args.quota * args.headroom
+    report = {"meta": report_meta(**vars(args)), "modes": {}}
+
+    try:
+        for mode, limit in (("unscheduled", 0), ("scheduled", quota)):
+            with FakeGeminiServer(
+                latency=args.latency, rpm_limit=args.quota, quota_window=args.window,
+            ) as fake:
+                gemini_client.GEMINI_ENDPOINT = fake.endpoint
+                gemini_scheduler.configure(rpm=limit, window=args.window)
+                result = run_workload(
+                    background=args.background,
+                    interactive=args.interactive,
+                    duration=args.duration,
+                )
+                result["fake_requests"] = fake.requests
+                result["fake_rejected"] = fake.rejected
+            report["modes"][mode] = result
+    finally:
+        gemini_scheduler.configure()
+
+    write_report(report, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+LexIQ Labs – God Mode Selector Evaluation
+
+Purpose:
+- Score God Mode selection against hand-labelled messages
+  (selector_labels.jsonl: persona, customer_message, god_mode_id)
+- Compare the tag path (match_pain_point + select_god_mode_prompt),
+  similarity ranking alone, and SimilarityIndex.select (similarity with
+  the tag fallback below MIN_SIMILARITY)
+- List every miss, so labels and selector changes can be reviewed
+
+Usage:
+    python -m benchmarks.selector_eval --out selector.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+from benchmarks.harness import report_meta, write_report
+from library_index import LibraryIndex
+from prompt_library import PromptLibrary
+from similarity_selector import SimilarityIndex
+
+LABELS = os.path.join(os.path.dirname(__file__), "selector_labels.jsonl")
+
+
+def load_labels(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(index: LibraryIndex, similarity: SimilarityIndex, labels: List[Dict]) -> Dict:
+    correct = {"tags": 0, "similarity": 0, "similarity_with_fallback": 0}
+    misses: List[Dict] = []
+    for item in labels:
+        match = index.match_pain_point(customer_message=item["customer_message"], persona=item["persona"])
+        ranked = similarity.rank(
+            customer_message=item["customer_message"], persona=item["persona"], top_k=1,
+        )
+        chosen = {
+            "tags": index.select_god_mode_prompt(persona=item["persona"], pain_point_match=match).get("id"),
+            "similarity": ranked[0]["id"] if ranked else None,
+            "similarity_with_fallback": similarity.select(
+                customer_message=item["customer_message"],
+                persona=item["persona"],
+                pain_point_match=match,
+                index=index,
+            ).get("id"),
+        }
+        for selector, god_mode_id in chosen.items():
+            correct[selector] += god_mode_id == item["god_mode_id"]
+        if chosen["similarity_with_fallback"] != item["god_mode_id"]:
+            misses.append(dict(item, chosen=chosen))
+
+    return {
+        "labelled": len(labels),
+        "correct": correct,
+        "accuracy": {
+            selector: round(count / len(labels), 3) if labels else 0.0
+            for selector, count in correct.items()
+        },
+        "misses": misses,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="God Mode selection accuracy on labelled messages.")
+    parser.add_argument("--labels", default=LABELS, help="JSONL of persona, customer_message, god_mode_id")
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    library = PromptLibrary.load()
+    similarity = SimilarityIndex.from_library(library)
+    if not similarity.available:
+        print("similarity selector needs NumPy", file=sys.stderr)
+        return 1
+
+    report = evaluate(LibraryIndex.from_library(library), similarity, load_labels(args.labels))
+    write_report({"meta": report_meta(**vars(args)), **report}, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
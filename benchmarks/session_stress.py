@@ -0,0 +1,202 @@
+"""
+LexIQ Labs – Session Stress Test
+
+Purpose:
+- Hammer one SessionState from many threads and asyncio tasks at once:
+  accepted responses (into threads), settings updates, snapshot reads,
+  near-duplicate lookups
+- Check nothing was lost: every response in the history and the
+  retrieval index, every turn in its thread, no errors
+- Compare throughput with the unsafe baseline: the same session with
+  its locks replaced by no-ops
+
+Usage:
+    python -m benchmarks.session_stress --threads 8 --tasks 8 --ops 2000
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from benchmarks.harness import report_meta, write_report
+from session_state import AsyncSessionState, SessionState
+
+THREADS_PER_SESSION = 4
+TONE_MODES = ("auto", "conservative", "assertive")
+
+
+class _NoLock:
+    """Stand-in for the session lock in the unsafe baseline."""
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def make_session(safe: bool) -> SessionState:
+    session = SessionState()
+    session.set_persona("support")
+    if not safe:
+        session._lock = session.response_history._lock = _NoLock()
+    return session
+
+
+def _operation(session: SessionState, worker: str, n: int) -> int:
+    """One mixed step. Returns the number of responses it added (0 or 1)."""
+    step = n % 4
+    if step == 0 or step == 2:
+        session.add_response(
+            customer_message=f"{worker} message {n}: the export still fails",
+            final_response=f"Reply {n} to {worker}.",
+            god_mode_id="gm_support_01",
+            thread_id=f"thread{n % THREADS_PER_SESSION}",
+        )
+        return 1
+    if step == 1:
+        session.update_settings(tone_mode=TONE_MODES[n % len(TONE_MODES)])
+        # A snapshot never changes under its reader
+        responses = session.list_responses()
+        count = len(responses)
+        if sum(1 for _ in responses) != count:
+            raise AssertionError("snapshot changed while iterating")
+        return 0
+    session.find_similar_responses(
+        customer_message=f"{worker} message {n}: the export still fails",
+        god_mode_id="gm_support_01",
+    )
+    return 0
+
+
+async def _async_operation(session: AsyncSessionState, worker: str, n: int) -> int:
+    step = n % 4
+    if step == 0 or step == 2:
+        await session.add_response(
+            customer_message=f"{worker} message {n}: the export still fails",
+            final_response=f"Reply {n} to {worker}.",
+            god_mode_id="gm_support_01",
+            thread_id=f"thread{n % THREADS_PER_SESSION}",
+        )
+        return 1
+    if step == 1:
+        await session.update_settings(tone_mode=TONE_MODES[n % len(TONE_MODES)])
+        session.list_responses()
+        return 0
+    await session.find_similar_responses(
+        customer_message=f"{worker} message {n}: the export still fails",
+        god_mode_id="gm_support_01",
+    )
+    return 0
+
+
+def run_round(*, safe: bool, threads: int, tasks: int, ops: int) -> Dict:
+    session = make_session(safe)
+    facade = AsyncSessionState(session)
+    added: List[int] = []
+    errors: List[str] = []
+    start_barrier = threading.Barrier(threads + 1)
+
+    def thread_worker(worker: str) -> None:
+        count = 0
+        start_barrier.wait()
+        for n in range(ops):
+            try:
+                count += _operation(session, worker, n)
+            except Exception as e:  # the unsafe baseline may fail here
+                errors.append(f"{type(e).__name__}: {e}")
+        added.append(count)
+
+    async def task_worker(worker: str) -> None:
+        count = 0
+        for n in range(ops):
+            try:
+                count += await _async_operation(facade, worker, n)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            if n % 8 == 0:
+                await asyncio.sleep(0)
+        added.append(count)
+
+    async def run_tasks() -> None:
+        await asyncio.gather(*(task_worker(f"task{i}") for i in range(tasks)))
+
+    workers = [threading.Thread(target=thread_worker, args=(f"thread{i}",)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    start = perf_counter()
+    start_barrier.wait()
+    asyncio.run(run_tasks())
+    for worker in workers:
+        worker.join()
+    seconds = perf_counter() - start
+
+    # Negative: an operation failed halfway (history written, thread not)
+    expected = sum(added)
+    snapshot = session.snapshot()
+    turns = sum(state["turns"] for state in snapshot["threads"])
+    total_ops = (threads + tasks) * ops
+    return {
+        "ops": total_ops,
+        "seconds": round(seconds, 3),
+        "ops_per_s": round(total_ops / seconds, 1),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "lost_updates": {
+            "history": expected - len(snapshot["responses"]),
+            "index": expected - len(session.response_history._index),
+            "thread_turns": 2 * expected - turns,
+        },
+    }
+
+
+def run(*, safe: bool, threads: int, tasks: int, ops: int, rounds: int) -> Dict:
+    results = [run_round(safe=safe, threads=threads, tasks=tasks, ops=ops) for _ in range(rounds)]
+    lost = {key: sum(r["lost_updates"][key] for r in results) for key in results[0]["lost_updates"]}
+    errors = sum(r["errors"] for r in results)
+    return {
+        "best_ops_per_s": max(r["ops_per_s"] for r in results),
+        "errors": errors,
+        "lost_updates": lost,
+        "consistent": errors == 0 and not any(lost.values()),
+        "rounds": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent SessionState stress test.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=8, help="asyncio tasks, alongside the threads")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread or task")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--switch-interval", type=float, default=1e-5,
+                        help="sys.setswitchinterval, small to provoke interleavings")
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sys.setswitchinterval(args.switch_interval)
+    options = dict(threads=args.threads, tasks=args.tasks, ops=args.ops, rounds=args.rounds)
+    safe = run(safe=True, **options)
+    unsafe = run(safe=False, **options)
+
+    write_report({
+        "meta": report_meta(**vars(args)),
+        "safe": safe,
+        "unsafe": unsafe,
+        "throughput_ratio": round(safe["best_ops_per_s"] / unsafe["best_ops_per_s"], 3),
+    }, args.out)
+    return 0 if safe["consistent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
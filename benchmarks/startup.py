@@ -0,0 +1,138 @@
+"""
+LexIQ Labs – Cold Start Benchmark
+
+Purpose:
+- Measure interpreter cold start for the engine with `python -X importtime`
+- Compare the old eager import set (requests + yaml everywhere) with `import lexiq`
+- Compare first match from YAML vs from a library snapshot
+- Enforce a startup budget (non-zero exit when exceeded)
+
+Usage:
+    python -m benchmarks.startup --runs 7 --budget-ms 30
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from benchmarks.harness import report_meta, write_report
+from prompt_library import GOD_MODE_FILENAME, PAIN_POINTS_FILENAME, PROMPTS_DIR, save_snapshot
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_FIRST_MATCH = (
+    "import lexiq; "
+    "lib = lexiq.PromptLibrary.load({dir!r}, use_snapshot={snapshot}); "
+    "lexiq.match_pain_point(customer_message='the export is broken again', "
+    "pain_points=lib.pain_points_for('support'))"
+)
+
+# Everything a caller paid for before imports were deferred:
+# each Gemini module imported requests, the loader imported yaml.
+EAGER_BASELINE = (
+    "import requests, yaml, pain_point_matcher, blender, response_contract, "
+    "gemini_refiner, empathy_telemetry, question_generator, time_travel, "
+    "voice_profile, session_state, prompt_library"
+)
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|")
+
+
+def _run(code: str, *, importtime: bool = False) -> subprocess.CompletedProcess:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", code]
+    return subprocess.run(
+        cmd, cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+
+
+def import_self_us(code: str) -> int:
+    """
+    Sum of per-module self import times reported by -X importtime.
+    """
+    stderr = _run(code, importtime=True).stderr
+    total = 0
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_LINE.match(line)
+        if m:
+            total += int(m.group(1))
+    return total
+
+
+def wall_ms(code: str, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = perf_counter()
+        _run(code)
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def measure(code: str, runs: int, interpreter_us: int) -> Dict:
+    samples = wall_ms(code, runs)
+    imports = [import_self_us(code) for _ in range(runs)]
+    return {
+        "wall_ms_median": round(statistics.median(samples), 2),
+        "wall_ms_min": round(min(samples), 2),
+        "import_ms_median": round(
+            max(0, statistics.median(imports) - interpreter_us) / 1000, 2
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LexIQ cold start.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--budget-ms", type=float, default=30.0,
+        help="max import time for `import lexiq` + first match from snapshot",
+    )
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    interpreter_us = int(statistics.median(import_self_us("pass") for _ in range(args.runs)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in (GOD_MODE_FILENAME, PAIN_POINTS_FILENAME):
+            shutil.copy2(os.path.join(PROMPTS_DIR, name), tmp)
+        save_snapshot(tmp)
+
+        scenarios = {
+            "eager_baseline": EAGER_BASELINE,
+            "import_lexiq": "import lexiq",
+            "first_match_yaml": _FIRST_MATCH.format(dir=tmp, snapshot=False),
+            "first_match_snapshot": _FIRST_MATCH.format(dir=tmp, snapshot=True),
+        }
+
+        results = {
+            name: measure(code, args.runs, interpreter_us)
+            for name, code in scenarios.items()
+        }
+
+    budgeted = results["first_match_snapshot"]["import_ms_median"]
+    report = {
+        "meta": report_meta(**vars(args)),
+        "interpreter_import_ms": round(interpreter_us / 1000, 2),
+        "scenarios": results,
+        "budget": {
+            "limit_ms": args.budget_ms,
+            "measured_ms": budgeted,
+            "ok": budgeted <= args.budget_ms,
+        },
+    }
+
+    write_report(report, args.out)
+    return 0 if report["budget"]["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
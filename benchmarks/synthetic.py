@@ -0,0 +1,176 @@
+"""
+LexIQ Labs – Synthetic Customer Messages
+
+Purpose:
+- Generate reproducible customer messages per persona
+- Weave real library keywords into varied sentence shapes
+- Mix in off-topic messages so the no-match path is exercised too
+- Build non-English messages from the keyword expansions, to exercise
+  language detection and the per-language indexes
+"""
+
+import random
+from typing import Dict, Iterator, List
+
+from pain_point_matcher import pain_point_tags
+from prompt_library import PromptLibrary
+
+OPENERS = [
+    "Hi team,",
+    "Hello,",
+    "Hey there —",
+    "Good morning,",
+    "",
+]
+
+BRIDGES = [
+    "Honestly it feels like {kw} and now {kw2}.",
+    "We keep running into {kw}, plus {kw2}.",
+    "This is the third time: {kw}. Also {kw2}.",
+    "Our team flagged {kw} again, and {kw2} is not helping.",
+    "Can someone explain the {kw}? On top of that, {kw2}.",
+]
+
+CLOSERS = [
+    "Please advise.",
+    "Need an answer today!!",
+    "Thanks in advance.",
+    "Let me know what the next step is.",
+    "",
+]
+
+OFF_TOPIC = [
+    "Just checking in to say thanks for the webinar last week.",
+    "Can you send me the slides from yesterday's session?",
+    "Who is the right contact for our marketing partnership?",
+    "Out of office until Monday, will reply then.",
+    "Quick question about your office address for a delivery.",
+]
+
+
+def generate_messages(
+    library: PromptLibrary,
+    *,
+    persona: str,
+    count: int,
+    seed: int = 7,
+    off_topic_ratio: float = 0.2,
+) -> Iterator[Dict]:
+    """
+    Yield synthetic messages for one persona.
+
+    Each item:
+    {
+        "persona": str,
+        "customer_message": str,
+        "source_pain_point_id": str | None
+    }
+    """
+    rng = random.Random(f"{seed}:{persona}")
+    pain_points: List[Dict] = library.pain_points_for(persona)
+
+    for _ in range(count):
+        if not pain_points or rng.random() < off_topic_ratio:
+            yield {
+                "persona": persona,
+                "customer_message": rng.choice(OFF_TOPIC),
+                "source_pain_point_id": None,
+            }
+            continue
+
+        pain_point = rng.choice(pain_points)
+        tags = pain_point_tags(pain_point) or [pain_point.get("text", "")]
+        kw, kw2 = (rng.sample(tags, 2) if len(tags) > 1 else tags * 2)
+
+        parts = [
+            rng.choice(OPENERS),
+            pain_point.get("text", "") + ".",
+            rng.choice(BRIDGES).format(kw=kw, kw2=kw2),
+            rng.choice(CLOSERS),
+        ]
+
+        yield {
+            "persona": persona,
+            "customer_message": " ".join(p for p in parts if p),
+            "source_pain_point_id": pain_point.get("id"),
+        }
+
+
+# language -> (openers, bridges, closers); bridges take two variants
+TRANSLATED = {
+    "es": (
+        ["Hola,", "Buenos días,", ""],
+        ["La verdad es que {kw} y ahora {kw2}.", "Otra vez {kw}, y además {kw2}.",
+         "Ya es la tercera vez: {kw}. También {kw2}."],
+        ["Por favor, necesitamos una respuesta.", "Gracias.", ""],
+    ),
+    "de": (
+        ["Hallo,", "Guten Morgen,", ""],
+        ["Ehrlich gesagt: {kw} und jetzt auch noch {kw2}.", "Schon wieder {kw}, und {kw2} ist nicht hilfreich.",
+         "Das ist das dritte Mal: {kw}. Außerdem {kw2}."],
+        ["Bitte um eine Antwort.", "Danke.", ""],
+    ),
+    "fr": (
+        ["Bonjour,", "Bonsoir,", ""],
+        ["Honnêtement, {kw} et maintenant {kw2}.", "Encore une fois {kw}, et en plus {kw2}.",
+         "C’est la troisième fois : {kw}. Aussi {kw2}."],
+        ["Merci de nous répondre rapidement.", "Merci.", ""],
+    ),
+}
+
+
+def generate_translated_messages(
+    library: PromptLibrary,
+    *,
+    persona: str,
+    language: str,
+    count: int,
+    seed: int = 7,
+) -> Iterator[Dict]:
+    """
+    Yield messages in `language` built from translated variants of one
+    pain point's keywords. Only pain points with at least two expanded
+    keywords are used; yields nothing when there are none.
+
+    Each item: {"persona", "customer_message", "language", "source_pain_point_id"}
+    """
+    rng = random.Random(f"{seed}:{persona}:{language}")
+    expansions = library.keyword_expansions.get(language) or {}
+    openers, bridges, closers = TRANSLATED[language]
+
+    candidates = []
+    for pain_point in library.pain_points_for(persona):
+        variants = [expansions[tag] for tag in pain_point_tags(pain_point) if expansions.get(tag)]
+        if len(variants) >= 2:
+            candidates.append((pain_point, variants))
+    if not candidates:
+        return
+
+    for _ in range(count):
+        pain_point, variants = rng.choice(candidates)
+        first, second = rng.sample(variants, 2)
+        parts = [
+            rng.choice(openers),
+            rng.choice(bridges).format(kw=rng.choice(first), kw2=rng.choice(second)),
+            rng.choice(closers),
+        ]
+        yield {
+            "persona": persona,
+            "customer_message": " ".join(p for p in parts if p),
+            "language": language,
+            "source_pain_point_id": pain_point.get("id"),
+        }
+
+
+def generate_corpus(
+    library: PromptLibrary,
+    *,
+    count_per_persona: int,
+    seed: int = 7,
+) -> List[Dict]:
+    corpus: List[Dict] = []
+    for persona in library.personas:
+        corpus.extend(
+            generate_messages(library, persona=persona, count=count_per_persona, seed=seed)
+        )
+    return corpus
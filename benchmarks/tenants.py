@@ -0,0 +1,183 @@
+"""
+LexIQ Labs – Tenant Scaling Benchmark
+
+Purpose:
+- Generate N tenant overlays (a few God Mode, pain point and forbidden
+  phrase customizations each) and load them through TenantLibraries
+- Report retained memory and load time from 10 to 1,000 tenants,
+  against one full library copy per tenant (measured on a few tenants,
+  scaled to N)
+- Measure cold first-request load and warm match+select latency
+  through tenant indexes
+
+Usage:
+    python -m benchmarks.tenants --tenants 10 100 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from benchmarks.harness import measure_stage, report_meta, write_report
+from benchmarks.memory import measure_retained
+from benchmarks.synthetic import generate_corpus
+from library_index import LibraryIndex
+from prompt_library import PromptLibrary, load_yaml
+from tenant_library import TenantLibraries, TenantLibrary, overlay_path, parse_overlay
+
+
+def make_overlay(library: PromptLibrary, tenant_id: str, rng: random.Random) -> Dict:
+    """Two customized God Mode entries, three pain points per persona, two phrases."""
+    god_mode = []
+    for entry in rng.sample(library.god_mode_prompts, 2):
+        custom = dict(entry, pain_point_tags=list(entry.get("pain_point_tags") or []) + [tenant_id])
+        custom["prompts"] = {
+            mode: [dict(example, text=f"{example['text']} ({tenant_id})") for example in examples]
+            for mode, examples in (entry.get("prompts") or {}).items()
+        }
+        god_mode.append(custom)
+
+    pain_points = {
+        persona: {"upsert": [
+            dict(entry, keywords=list(entry.get("keywords") or []) + [f"{tenant_id} portal"])
+            for entry in rng.sample(library.pain_points_for(persona), 3)
+        ]}
+        for persona in library.personas
+    }
+
+    return {"tenant_overlay": {
+        "forbidden_phrases": [f"{tenant_id} discount", "free upgrade"],
+        "god_mode": {"upsert": god_mode},
+        "pain_points": pain_points,
+    }}
+
+
+def write_overlays(library: PromptLibrary, directory: str, count: int, seed: int) -> List[str]:
+    # JSON is valid YAML and much faster to write
+    rng = random.Random(seed)
+    tenant_ids = []
+    for n in range(count):
+        tenant_id = f"tenant{n:04d}"
+        with open(os.path.join(directory, tenant_id + ".yml"), "w", encoding="utf-8") as f:
+            json.dump(make_overlay(library, tenant_id, rng), f)
+        tenant_ids.append(tenant_id)
+    return tenant_ids
+
+
+def load_overlays(base: LibraryIndex, directory: str, tenant_ids: List[str]) -> TenantLibraries:
+    tenants = TenantLibraries(base, tenants_dir=directory, max_tenants=len(tenant_ids), idle_seconds=None)
+    for tenant_id in tenant_ids:
+        tenants.get(tenant_id)
+    return tenants
+
+
+def load_full_copies(prompts_dir: Optional[str], directory: str, tenant_ids: List[str]) -> List[TenantLibrary]:
+    """The naive layout: every tenant parses and indexes its own library."""
+    copies = []
+    for tenant_id in tenant_ids:
+        library = PromptLibrary.load(prompts_dir, use_snapshot=False)
+        overlay = parse_overlay(load_yaml(overlay_path(tenant_id, directory)))
+        copies.append(TenantLibrary(tenant_id, LibraryIndex.from_library(library), overlay))
+    return copies
+
+
+def _timed(fn) -> float:
+    start = perf_counter()
+    fn()
+    return perf_counter() - start
+
+
+def run_scale(
+    base: LibraryIndex,
+    corpus: List[Dict],
+    directory: str,
+    tenant_ids: List[str],
+    *,
+    full_sample: int,
+) -> Dict:
+    count = len(tenant_ids)
+    overlay = measure_retained(lambda: load_overlays(base, directory, tenant_ids))
+    overlay["load_s"] = round(_timed(lambda: load_overlays(base, directory, tenant_ids)), 3)
+    overlay["kb_per_tenant"] = round(overlay["retained_mb"] * 1024 / count, 1)
+    overlay["load_ms_per_tenant"] = round(overlay["load_s"] * 1000 / count, 3)
+
+    sample = tenant_ids[:full_sample]
+    full = measure_retained(lambda: load_full_copies(None, directory, sample))
+    full_seconds = _timed(lambda: load_full_copies(None, directory, sample))
+    full_kb = full["retained_mb"] * 1024 / len(sample)
+    full_ms = full_seconds * 1000 / len(sample)
+
+    # Cold: the first request of each tenant pays its load
+    tenants = TenantLibraries(base, tenants_dir=directory, max_tenants=count, idle_seconds=None)
+    cold = measure_stage(tenants.get, tenant_ids, memory_sample=None, warmup=0)
+
+    items = [dict(item, tenant=tenant_ids[n % count]) for n, item in enumerate(corpus)]
+    warm = measure_stage(
+        lambda item: _match_select(tenants.get(item["tenant"]).index, item),
+        items, memory_sample=None,
+    )
+
+    return {
+        "tenants": count,
+        "overlay": overlay,
+        "full_copies": {
+            "measured_tenants": len(sample),
+            "kb_per_tenant": round(full_kb, 1),
+            "load_ms_per_tenant": round(full_ms, 3),
+            "estimated_mb": round(full_kb * count / 1024, 2),
+            "estimated_load_s": round(full_ms * count / 1000, 3),
+        },
+        "memory_ratio": round(full_kb / overlay["kb_per_tenant"], 1) if overlay["kb_per_tenant"] else None,
+        "first_request": cold,
+        "match_select": warm,
+    }
+
+
+def _match_select(index: LibraryIndex, item: Dict) -> Dict:
+    match = index.match_pain_point(customer_message=item["customer_message"], persona=item["persona"])
+    return index.select_god_mode_prompt(persona=item["persona"], pain_point_match=match)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tenant overlay memory and load-time scaling.")
+    parser.add_argument("--tenants", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--full-sample", type=int, default=5,
+                        help="tenants loaded as full copies for the baseline")
+    parser.add_argument("--messages", type=int, default=200, help="per persona")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    library = PromptLibrary.load()
+    base = LibraryIndex.from_library(library)
+    corpus = generate_corpus(library, count_per_persona=args.messages, seed=args.seed)
+
+    report = {
+        "meta": report_meta(**vars(args)),
+        "shared_base": measure_retained(lambda: LibraryIndex.from_library(PromptLibrary.load())),
+        "scales": [],
+    }
+
+    directory = tempfile.mkdtemp(prefix="lexiq_tenants_")
+    try:
+        tenant_ids = write_overlays(library, directory, max(args.tenants), args.seed)
+        for count in sorted(args.tenants):
+            report["scales"].append(run_scale(
+                base, corpus, directory, tenant_ids[:count],
+                full_sample=min(args.full_sample, count),
+            ))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    write_report(report, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,10 @@ This file MUST NOT generate final user-facing text.
 from typing import Dict, List, Optional
 from datetime import datetime
 
+from metrics import timed
 
+
+@timed("blend")
 def blend(
     *,
     customer_message: str,
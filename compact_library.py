@@ -0,0 +1,256 @@
+"""
+LexIQ Labs – Compact Prompt Library
+
+Purpose:
+- Hold the prompt libraries in far fewer, smaller objects than the raw
+  YAML dicts: __slots__ entries, interned tag tuples, and every example
+  text in one shared string buffer addressed by offsets
+- Stay drop-in compatible with code that treats entries as dicts
+  (entry.get("id"), entry["prompts"]["safe"], "inspired_by" in entry)
+- Be loaded once before forking workers and shared copy-on-write
+- Trade speed for memory: every entry read is a Python-level get(), so
+  linear match/select scans run slower than over the dict form
+
+Usage:
+    library = CompactLibrary.load()
+    freeze_for_fork()          # right before creating a fork-based pool
+"""
+
+import gc
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pain_point_matcher import compile_tag_forms
+from prompt_library import PromptLibrary
+
+_MISSING = object()
+
+
+def _intern_all(values) -> Tuple[str, ...]:
+    return tuple(sys.intern(str(v)) for v in values or ())
+
+
+def _intern(value) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class ExampleStore:
+    """
+    All example texts of a library in one string; example i is
+    buffer[offsets[i]:offsets[i + 1]]. Example ids are interned.
+    """
+
+    __slots__ = ("buffer", "offsets", "ids")
+
+    def __init__(self, ids: Sequence[str], texts: Sequence[str]):
+        offsets = array("L", [0])
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        self.buffer = "".join(texts)
+        self.offsets = offsets
+        self.ids = tuple(ids)
+
+    def text(self, index: int) -> str:
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class ExampleList(Sequence):
+    """
+    Read-only view of one prompt's examples for one mode (safe/direct).
+    Items are materialized as {"id", "text"} dicts on access.
+    """
+
+    __slots__ = ("_store", "_start", "_stop")
+
+    def __init__(self, store: ExampleStore, start: int, stop: int):
+        self._store = store
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        position = self._start + index
+        return {"id": self._store.ids[position], "text": self._store.text(position)}
+
+    def texts(self) -> List[str]:
+        return [self._store.text(i) for i in range(self._start, self._stop)]
+
+
+class _CompactEntry:
+    """
+    Dict-compatible read access over __slots__ fields. A field that was
+    absent in the YAML is stored as None and reported as missing.
+    """
+
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+    _KEYS: frozenset = frozenset()
+
+    def _value(self, key: str):
+        if key not in self._KEYS:
+            return _MISSING
+        value = getattr(self, key)
+        return _MISSING if value is None else value
+
+    def get(self, key: str, default=None):
+        # Hot path for the matcher: no extra call layer
+        if key in self._KEYS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        return default
+
+    def __getitem__(self, key: str):
+        value = self._value(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._value(key) is not _MISSING
+
+    def keys(self) -> List[str]:
+        return [k for k in self._FIELDS if self._value(k) is not _MISSING]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.get('id')!r})"
+
+
+class PainPoint(_CompactEntry):
+    __slots__ = ("id", "text", "keywords", "_tag_forms")
+    _FIELDS = __slots__[:3]
+    _KEYS = frozenset(__slots__)  # _tag_forms: readable, not listed (see tag_forms)
+
+    def __init__(self, entry: Dict):
+        self.id = _intern(entry.get("id"))
+        self.text = entry.get("text")
+        self.keywords = _intern_all(entry.get("keywords"))
+        self._tag_forms = compile_tag_forms(self.keywords)
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "text": self.text, "keywords": list(self.keywords)}
+
+
+class GodModePrompt(_CompactEntry):
+    __slots__ = (
+        "id",
+        "persona",
+        "blend_type",
+        "pain_point",
+        "pain_point_tags",
+        "fingerprint_id",
+        "inspired_by",
+        "psychology_used",
+        "_tag_forms",
+        "_store",
+        "_ranges",
+    )
+    _FIELDS = __slots__[:8] + ("prompts",)
+    _KEYS = frozenset(_FIELDS + ("_tag_forms",))
+
+    def __init__(self, entry: Dict, store: ExampleStore, ranges: Tuple[Tuple[str, int, int], ...]):
+        self.id = _intern(entry.get("id"))
+        self.persona = _intern(entry.get("persona"))
+        self.blend_type = _intern(entry.get("blend_type"))
+        self.pain_point = _intern(entry.get("pain_point"))
+        self.pain_point_tags = _intern_all(entry.get("pain_point_tags"))
+        self.fingerprint_id = entry.get("fingerprint_id")
+        self.inspired_by = entry.get("inspired_by")
+        self.psychology_used = entry.get("psychology_used")
+        self._tag_forms = compile_tag_forms(self.pain_point_tags)
+        self._store = store
+        self._ranges = ranges  # ((mode, start, stop), ...)
+
+    @property
+    def prompts(self) -> Dict[str, ExampleList]:
+        return {
+            mode: ExampleList(self._store, start, stop)
+            for mode, start, stop in self._ranges
+        }
+
+    def to_dict(self) -> Dict:
+        data = {k: v for k, v in self.items() if k not in ("pain_point_tags", "prompts")}
+        data["pain_point_tags"] = list(self.pain_point_tags)
+        data["prompts"] = {mode: list(examples) for mode, examples in self.prompts.items()}
+        return data
+
+
+def _compact_god_mode(sections: Dict[str, List[Dict]]) -> Dict[str, Tuple[GodModePrompt, ...]]:
+    ids: List[str] = []
+    texts: List[str] = []
+    staged = []
+
+    for persona, entries in sections.items():
+        for entry in entries or []:
+            ranges = []
+            for mode, examples in (entry.get("prompts") or {}).items():
+                start = len(ids)
+                for example in examples or []:
+                    ids.append(sys.intern(str(example.get("id"))))
+                    texts.append(example.get("text") or "")
+                ranges.append((sys.intern(mode), start, len(ids)))
+            staged.append((persona, entry, tuple(ranges)))
+
+    store = ExampleStore(ids, texts)
+    compact: Dict[str, List[GodModePrompt]] = {persona: [] for persona in sections}
+    for persona, entry, ranges in staged:
+        compact[persona].append(GodModePrompt(entry, store, ranges))
+
+    return {persona: tuple(entries) for persona, entries in compact.items()}
+
+
+class CompactLibrary(PromptLibrary):
+    """
+    PromptLibrary whose entries are GodModePrompt / PainPoint objects.
+
+    Built from the raw YAML (or snapshot) data, which is dropped after
+    conversion. Lists become tuples: the library is read-only.
+    """
+
+    def __init__(self, *, god_mode: Dict, pain_points: Dict, keyword_expansions: Optional[Dict] = None):
+        god_mode_sections = _compact_god_mode(god_mode or {})
+        pain_point_sections = {
+            sys.intern(persona): tuple(PainPoint(entry) for entry in entries or [])
+            for persona, entries in ((pain_points or {}).get("pain_points") or {}).items()
+        }
+
+        self.god_mode_sections = god_mode_sections
+        self.pain_point_sections = pain_point_sections
+        self.god_mode_prompts = tuple(
+            entry for entries in god_mode_sections.values() for entry in entries
+        )
+        self._god_mode_by_id = {entry.id: entry for entry in self.god_mode_prompts}
+        self.keyword_expansions = (keyword_expansions or {}).get("keyword_expansions") or {}
+
+    def pain_points_for(self, persona: str) -> Tuple[PainPoint, ...]:
+        return self.pain_point_sections.get(persona) or ()
+
+
+def freeze_for_fork() -> None:
+    """
+    Move every live object into the GC's permanent generation.
+
+    Call after loading libraries and right before forking: collections in
+    the children then never touch (and copy) the shared pages.
+    """
+    gc.collect()
+    gc.freeze()
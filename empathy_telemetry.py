@@ -10,13 +10,14 @@ Purpose:
 
 import os
 import json
-import requests
-from typing import Dict, Optional
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 
-GEMINI_ENDPOINT = (
-    "https://generativelanguage.googleapis.com/v1beta/models/"
-    "gemini-2.5-flash:generateContent"
-)
+import event_log
+from gemini_client import MISSING_API_KEY, GeminiError, first_candidate_text, generate_content
+from prompt_budget import dedupe, estimate_tokens, fit_message, minify_json, report
+
+DEFAULT_TOKEN_BUDGET = 1500
 
 
 def refine_response(
@@ -24,12 +25,14 @@ def refine_response(
     response_contract: Dict,
     temperature: float = 0.4,
     timeout: int = 15,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
 ) -> Optional[str]:
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
+        event_log.emit("gemini_stage", stage="refine_response", outcome="error", reason=MISSING_API_KEY)
         return None
 
-    prompt = build_prompt(response_contract)
+    prompt = build_prompt(response_contract, token_budget)
 
     payload = {
         "contents": [
@@ -45,27 +48,101 @@ def refine_response(
         },
     }
 
+    start = perf_counter()
     try:
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={api_key}",
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload),
+        data = generate_content(
+            stage="refine_response",
+            payload=payload,
             timeout=timeout,
+            api_key=api_key,
         )
-        response.raise_for_status()
-        data = response.json()
-
-        return (
-            data["candidates"][0]["content"]["parts"][0]["text"].strip()
-            if data.get("candidates")
-            else None
+    except GeminiError as e:
+        event_log.emit(
+            "gemini_stage", stage="refine_response", outcome="error",
+            latency_s=perf_counter() - start, reason=e.reason,
         )
-
-    except Exception:
         return None
 
-
-def build_prompt(contract: Dict) -> str:
+    text = first_candidate_text(data).strip()
+    event_log.emit(
+        "gemini_stage", stage="refine_response",
+        outcome=event_log.OK if text else "rejected",
+        latency_s=perf_counter() - start,
+        reason=None if text else "empty_output",
+    )
+    return text or None
+
+
+def build_prompt(contract: Dict, token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    return build_prompt_with_stats(contract, token_budget)[0]
+
+
+def build_prompt_with_stats(
+    contract: Dict,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+) -> Tuple[str, Dict]:
+    """
+    Build the refinement prompt within a token budget.
+
+    The customer message is stripped of quoted replies and signatures
+    (and truncated only if still over budget), JSON is minified and
+    principles are de-duplicated. Rules and structure are never cut.
+    A thread_summary in the input context (see thread_context) is sent
+    as is: it is already bounded.
+
+    Returns (prompt, stats) where stats reports tokens saved versus
+    the uncompacted prompt.
+    """
+    context = contract["input_context"]
+    clarifications = context.get("clarifications", {})
+    principles = contract["psychology_constraints"]["principles"]
+    voice = contract.get("voice_constraints", {})
+    thread_summary = context.get("thread_summary") or ""
+
+    verbose = _render(
+        customer_message=context["customer_message"],
+        empathy_summary=context["empathy_summary"],
+        clarifications=json.dumps(clarifications, indent=2),
+        user_intent=context["user_intent"],
+        principles=principles,
+        voice=json.dumps(voice, indent=2),
+        thread_summary=thread_summary,
+    )
+
+    fields = dict(
+        empathy_summary=context["empathy_summary"],
+        clarifications=minify_json(clarifications),
+        user_intent=context["user_intent"],
+        principles=dedupe(principles),
+        voice=minify_json(voice),
+        thread_summary=thread_summary,
+    )
+    message = fit_message(
+        context["customer_message"],
+        fixed_tokens=estimate_tokens(_render(customer_message="", **fields)),
+        token_budget=token_budget,
+    )
+    prompt = _render(customer_message=message, **fields)
+
+    return prompt, report(
+        stage="refine_response",
+        verbose_prompt=verbose,
+        prompt=prompt,
+        token_budget=token_budget,
+    )
+
+
+def _render(
+    *,
+    customer_message: str,
+    empathy_summary: str,
+    clarifications: str,
+    user_intent: str,
+    principles: List[str],
+    voice: str,
+    thread_summary: str = "",
+) -> str:
+    thread = f"Conversation so far:\n{thread_summary}\n\n" if thread_summary else ""
     return f"""
 You are refining a customer-facing response.
 
@@ -78,17 +155,17 @@ IMPORTANT RULES:
 ---
 
 CONTEXT:
-Customer message:
-\"\"\"{contract['input_context']['customer_message']}\"\"\"
+{thread}Customer message:
+\"\"\"{customer_message}\"\"\"
 
 Empathy summary:
-{contract['input_context']['empathy_summary']}
+{empathy_summary}
 
 Clarifications:
-{json.dumps(contract['input_context'].get('clarifications', {}), indent=2)}
+{clarifications}
 
 User intent:
-{contract['input_context']['user_intent']}
+{user_intent}
 
 ---
 
@@ -101,12 +178,12 @@ RESPONSE STRUCTURE (MANDATORY):
 ---
 
 PSYCHOLOGICAL CONSTRAINTS:
-{chr(10).join('- ' + p for p in contract['psychology_constraints']['principles'])}
+{chr(10).join('- ' + p for p in principles)}
 
 ---
 
 VOICE CONSTRAINTS:
-{json.dumps(contract.get('voice_constraints', {}), indent=2)}
+{voice}
 
 ---
 
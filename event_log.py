@@ -0,0 +1,252 @@
+"""
+LexIQ Labs – Event Log
+
+Purpose:
+- Structured events for the Gemini-backed stages: one JSON line per
+  event with request id, stage, outcome, latency and reason code
+- Never block the request path: events go through a bounded queue
+  (logging QueueHandler) to a background writer (QueueListener)
+- Bounded memory when the sink is slow: a full queue drops the event
+  and counts it (lexiq_events_dropped_total)
+- Sample high-volume success events; failures are always written
+
+Configure with LEXIQ_EVENT_LOG ("stderr", "stdout", a file path, or
+"off", the default: importing the engine writes nothing unless asked)
+and LEXIQ_EVENT_SAMPLE (share of success events kept, default 0.1), or
+call configure(). The writer starts on the first event.
+
+Request ids are carried in a context variable: set them per request
+(request_context) and copy the context into worker threads
+(contextvars.copy_context().run).
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator, Optional
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+
+import metrics
+
+LOGGER_NAME = "lexiq.events"
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_SAMPLE_RATE = 0.1
+EVENTS_DROPPED = "lexiq_events_dropped_total"
+
+OK = "ok"
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "lexiq_request_id", default=None
+)
+
+
+# ─────────────────────────────────────────
+# Request ids
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Tag every event emitted inside the block with request_id (or a new one)."""
+    request_id = request_id or new_request_id()
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+# ─────────────────────────────────────────
+# Handlers
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) instead of blocking or raising."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc(EVENTS_DROPPED)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The payload is a fresh dict: formatting waits for the writer thread
+        return record
+
+
+class _DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Stopping waits for room: a full queue must not lose the stop signal
+        self.queue.put(self._sentinel)
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+        }
+        payload.update(getattr(record, "event", None) or {"message": record.getMessage()})
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _EventLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.sample_rate = _env_sample_rate()
+        self._handler: Optional[_DroppingQueueHandler] = None
+        self._listener: Optional[_DrainingQueueListener] = None
+        self._configured = False
+        self.enabled = True
+
+    def configure(
+        self,
+        *,
+        sink: Optional[str] = None,
+        handler: Optional[logging.Handler] = None,
+        sample_rate: Optional[float] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        with self._lock:
+            self._configure_locked(sink, handler, sample_rate, queue_size)
+
+    def _configure_locked(
+        self,
+        sink: Optional[str],
+        handler: Optional[logging.Handler],
+        sample_rate: Optional[float],
+        queue_size: int,
+    ) -> None:
+        self._stop_locked()
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, sample_rate))
+
+        sink = sink if sink is not None else os.getenv("LEXIQ_EVENT_LOG", "off")
+        self._configured = True
+        self.enabled = handler is not None or sink.lower() not in ("", "off", "0", "none")
+        if not self.enabled:
+            return
+
+        if handler is None:
+            if sink == "stderr":
+                handler = logging.StreamHandler(sys.stderr)
+            elif sink == "stdout":
+                handler = logging.StreamHandler(sys.stdout)
+            else:
+                handler = logging.FileHandler(sink, encoding="utf-8")
+        handler.setFormatter(JsonLineFormatter())
+
+        events: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, queue_size))
+        self._handler = _DroppingQueueHandler(events)
+        self._listener = _DrainingQueueListener(events, handler, respect_handler_level=False)
+        self.logger.addHandler(self._handler)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Flush queued events and stop the writer thread."""
+        with self._lock:
+            self._stop_locked()
+
+    def _stop_locked(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._handler is not None:
+            self.logger.removeHandler(self._handler)
+            self._handler = None
+
+    def ensure_started(self) -> bool:
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    self._configure_locked(None, None, None, DEFAULT_QUEUE_SIZE)
+        return self.enabled
+
+
+def _env_sample_rate() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv("LEXIQ_EVENT_SAMPLE", DEFAULT_SAMPLE_RATE))))
+    except ValueError:
+        return DEFAULT_SAMPLE_RATE
+
+
+_LOG = _EventLog()
+atexit.register(_LOG.stop)
+
+
+def configure(**kwargs) -> None:
+    """
+    (Re)start the writer. Keyword arguments: sink ("stderr", "stdout",
+    a path or "off"), handler (any logging.Handler, overrides sink),
+    sample_rate, queue_size.
+    """
+    _LOG.configure(**kwargs)
+
+
+def stop() -> None:
+    _LOG.stop()
+
+
+# ─────────────────────────────────────────
+# Emitting
+
+def emit(
+    event: str,
+    *,
+    stage: str,
+    outcome: str = OK,
+    latency_s: Optional[float] = None,
+    reason: Optional[str] = None,
+    **fields,
+) -> None:
+    """
+    Queue one event. Success events (outcome "ok") are kept with
+    probability sample_rate and carry it, so counts can be scaled back.
+    """
+    if not _LOG.ensure_started():
+        return
+
+    sampled = outcome == OK
+    if sampled and _LOG.sample_rate < 1.0 and random.random() >= _LOG.sample_rate:
+        return
+
+    payload = {
+        "event": event,
+        "request_id": _request_id.get(),
+        "stage": stage,
+        "outcome": outcome,
+    }
+    if latency_s is not None:
+        payload["latency_ms"] = round(latency_s * 1000, 3)
+    if reason is not None:
+        payload["reason"] = reason
+    if sampled:
+        payload["sample_rate"] = _LOG.sample_rate
+    payload.update(fields)
+
+    handler = _LOG._handler
+    if handler is None:
+        return
+    # Straight to the queue handler: Logger.log would walk the stack for a caller
+    record = logging.LogRecord(
+        LOGGER_NAME, logging.INFO if sampled else logging.WARNING, "", 0, event, None, None,
+    )
+    record.event = payload
+    handler.handle(record)
@@ -0,0 +1,334 @@
+"""
+LexIQ Labs – Fallback Composer
+
+Purpose:
+- Produce a usable reply when Gemini is unavailable, times out or
+  returns nothing that passes the hard constraints
+- Follow the response contract: one sentence per mandatory section
+- Take psychology from the selected God Mode example lines
+  (safe or direct, by tone_mode) and register from the voice profile
+- Deterministic, local and well under a millisecond; the result passes
+  the same checks as refined text (gemini_refiner._constraint_violation)
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+import re
+import zlib
+
+import metrics
+from metrics import timed
+from gemini_refiner import _constraint_violation
+from language import STOPWORDS
+from pain_point_matcher import normalize, tag_forms
+
+TONE_MODES = ("auto", "conservative", "assertive")
+
+# tone_mode -> God Mode example set
+_EXAMPLE_SET = {"conservative": "safe", "assertive": "direct"}
+
+# Customer terms restated in the reconfirmation sentence
+MAX_RESTATED_TERMS = 2
+
+_SPACES = re.compile(r"\s+")
+
+_STOPWORDS = frozenset().union(*STOPWORDS.values())
+
+# ─────────────────────────────────────────
+# Sentence templates
+#
+# Keyed by register; each template carries the cue words the multi-
+# candidate ranker looks for, so a fallback reply scores as covering
+# the same sections a refined one does.
+
+_RECONFIRMATION = {
+    "casual": ("You mentioned {terms}, so that's what I'm focusing on.",
+               "I can see what you're running into here."),
+    "formal": ("Regarding {terms}, that is what I am focusing on.",
+               "I can see the situation you have described."),
+}
+
+_ACKNOWLEDGEMENT = {
+    # (register, example set, apologetic)
+    ("casual", "safe", True): "Sorry for the hassle, I understand why this is frustrating.",
+    ("casual", "safe", False): "I understand why this is frustrating.",
+    ("casual", "direct", True): "Sorry about this, and that's a fair concern.",
+    ("casual", "direct", False): "That's a fair concern.",
+    ("formal", "safe", True): "I apologize for the inconvenience and understand your concern.",
+    ("formal", "safe", False): "I understand your concern and appreciate your patience.",
+    ("formal", "direct", True): "I apologize for this; your concern is valid.",
+    ("formal", "direct", False): "Your concern is valid.",
+}
+
+_NEXT_STEP = {
+    "casual": "I'll follow up {when}.",
+    "formal": "I will follow up {when}.",
+}
+
+_ASSURANCE = {
+    ("casual", False): "I'll keep you posted until it's sorted.",
+    ("casual", True): "I'm here to help and I'll keep you posted until it's sorted.",
+    ("formal", False): "I will keep you updated until it is resolved.",
+    ("formal", True): "I am here to help and will keep you updated until it is resolved.",
+}
+
+# user_intent wording -> when the follow-up is promised
+_FOLLOW_UP_WHEN = (
+    ("today", "today"),
+    ("end of day", "by end of day"),
+    ("tomorrow", "tomorrow"),
+    ("this week", "this week"),
+)
+_DEFAULT_WHEN = "shortly"
+
+
+# ─────────────────────────────────────────
+# Voice profile
+
+def _trait(voice_profile: Dict, key: str) -> str:
+    value = voice_profile.get(key)
+    return str(value).lower() if value is not None else ""
+
+
+def voice_traits(voice_profile: Optional[Dict]) -> Dict[str, bool]:
+    """
+    Reduce a free-form voice profile (see voice_profile) to the switches
+    the composer honours.
+
+    Returns:
+    {
+        "formal": bool,       # formal register, no contractions
+        "concise": bool,      # shortest example line, no extras
+        "apologetic": bool,   # apologies allowed
+        "direct": bool,       # direct example set under tone_mode "auto"
+        "warm": bool          # warmer assurance
+    }
+    """
+    profile = voice_profile or {}
+    formality = _trait(profile, "formality")
+    sentence_length = _trait(profile, "sentence_length")
+    apology = _trait(profile, "apology_tendency")
+    directness = _trait(profile, "directness")
+    warmth = _trait(profile, "warmth")
+
+    return {
+        "formal": "formal" in formality and "informal" not in formality and "semi" not in formality,
+        "concise": any(word in sentence_length for word in ("short", "concise", "brief")),
+        "apologetic": not any(
+            word in apology for word in ("low", "rare", "never", "minimal", "seldom", "avoid")
+        ),
+        "direct": "indirect" not in directness
+        and any(word in directness for word in ("high", "direct", "blunt", "assertive")),
+        "warm": any(word in warmth for word in ("high", "warm")),
+    }
+
+
+def example_set_for(tone_mode: Optional[str], traits: Dict[str, bool]) -> str:
+    """
+    God Mode example set ("safe" or "direct") for a session tone_mode.
+    "auto" follows the voice profile's directness and defaults to safe.
+    """
+    if tone_mode in _EXAMPLE_SET:
+        return _EXAMPLE_SET[tone_mode]
+    return "direct" if traits.get("direct") else "safe"
+
+
+# ─────────────────────────────────────────
+# Building blocks
+
+def _clean(text: str) -> str:
+    text = _SPACES.sub(" ", text).strip()
+    if text and text[-1] not in ".!?":
+        text += "."
+    return text
+
+
+def _usable(text: str) -> bool:
+    return bool(text) and _constraint_violation(text) is None
+
+
+# (id(prompt), example set) -> (prompt, usable lines). Checking the lines
+# is most of a compose (non-ASCII text is slow through `re`). Keyed on
+# the prompt entry: compact entries build their example views on every
+# access, and library edits replace entries rather than change them.
+_LINES: Dict[Tuple[int, str], Tuple[Dict, Tuple[str, ...]]] = {}
+_LINES_MAX = 16384
+
+
+def _usable_lines(god_mode_prompt: Dict, example_set: str) -> Tuple[str, ...]:
+    key = (id(god_mode_prompt), example_set)
+    cached = _LINES.get(key)
+    if cached is not None and cached[0] is god_mode_prompt:
+        return cached[1]
+
+    if len(_LINES) >= _LINES_MAX:
+        _LINES.clear()
+    examples = (god_mode_prompt.get("prompts") or {}).get(example_set) or ()
+    lines = tuple(
+        line for line in (
+            _clean(example.get("text") or "")
+            for example in examples
+            if isinstance(example, dict)
+        )
+        if _usable(line)
+    )
+    _LINES[key] = (god_mode_prompt, lines)
+    return lines
+
+
+def example_lines(god_mode_prompt: Dict, example_set: str) -> Tuple[str, ...]:
+    """
+    Example texts of one set that pass the hard constraints. Falls back
+    to the other set when the requested one is empty.
+    """
+    for key in (example_set, "direct" if example_set == "safe" else "safe"):
+        lines = _usable_lines(god_mode_prompt, key)
+        if lines:
+            return lines
+    return ()
+
+
+@lru_cache(maxsize=4096)
+def _content_words(text: str) -> frozenset:
+    return frozenset(
+        word for word in normalize(text).split() if len(word) > 2 and word not in _STOPWORDS
+    )
+
+
+def _pick(lines: Sequence[str], customer_message: str, concise: bool) -> Optional[str]:
+    """
+    The example line sharing the most content words with the message;
+    among equals, the shortest (concise) or one chosen by message hash.
+    """
+    if not lines:
+        return None
+    words = _content_words(customer_message)
+    overlaps = [len(words & _content_words(line)) for line in lines]
+    best = max(overlaps)
+    candidates = [line for line, overlap in zip(lines, overlaps) if overlap == best]
+    if concise:
+        return min(candidates, key=len)
+    # Same message, same line: replays and retries stay stable
+    return candidates[zlib.crc32(customer_message.encode("utf-8")) % len(candidates)]
+
+
+def restated_terms(customer_message: str, god_mode_prompt: Dict) -> List[str]:
+    """
+    God Mode pain point tags that appear in the customer's message, in
+    the order the prompt lists them: the customer's own words for the
+    issue, safe to say back.
+    """
+    tags = god_mode_prompt.get("pain_point_tags") or []
+    if not customer_message or not tags:
+        return []
+
+    # Whole words only: "roi" must not restate "heroic"
+    text = f" {' '.join(normalize(customer_message).split())} "
+    terms: List[str] = []
+    for tag, form in zip(tags, tag_forms(god_mode_prompt)):
+        form = " ".join(form.split())
+        if tag.startswith("_") or not form or f" {form} " not in text:
+            continue
+        if _usable(tag) and tag not in terms:
+            terms.append(tag)
+            if len(terms) >= MAX_RESTATED_TERMS:
+                break
+    return terms
+
+
+@lru_cache(maxsize=1024)
+def _phrase_pattern(phrases: Tuple[str, ...]) -> Pattern:
+    return re.compile("|".join(re.escape(p) for p in phrases), re.IGNORECASE)
+
+
+def _follow_up_when(user_intent: str) -> str:
+    intent = user_intent.lower()
+    for cue, when in _FOLLOW_UP_WHEN:
+        if cue in intent:
+            return when
+    return _DEFAULT_WHEN
+
+
+# ─────────────────────────────────────────
+# Composer
+
+@timed("compose_fallback")
+def compose_fallback(
+    *,
+    response_contract: Dict,
+    god_mode_prompt: Dict,
+    tone_mode: Optional[str] = "auto",
+    voice_profile: Optional[Dict] = None,
+    forbidden_phrases: Sequence[str] = (),
+) -> str:
+    """
+    Assemble a reply from the contract's mandatory sections, one God
+    Mode example line and the voice profile.
+
+    `voice_profile` defaults to the contract's voice_constraints. The
+    reply never exceeds MAX_WORDS and never contains a forbidden phrase.
+    `forbidden_phrases` adds phrases to avoid (a tenant's, see
+    tenant_library): example lines and sentences using them are left out.
+    """
+    context = response_contract.get("input_context") or {}
+    customer_message = context.get("customer_message") or ""
+    user_intent = context.get("user_intent") or ""
+
+    traits = voice_traits(voice_profile or response_contract.get("voice_constraints"))
+    register = "formal" if traits["formal"] else "casual"
+    example_set = example_set_for(tone_mode, traits)
+    extra = _phrase_pattern(tuple(forbidden_phrases)) if forbidden_phrases else None
+
+    sentences: Dict[str, str] = {}
+    for section in _sections(response_contract):
+        if section == "reconfirmation":
+            terms = restated_terms(customer_message, god_mode_prompt)
+            with_terms, without_terms = _RECONFIRMATION[register]
+            sentences[section] = with_terms.format(terms=" and ".join(terms)) if terms else without_terms
+        elif section == "acknowledgement":
+            # Safe tone plus an apologetic voice earns the apology; direct never opens with one
+            apologetic = traits["apologetic"] and example_set == "safe" and not traits["concise"]
+            sentences[section] = _ACKNOWLEDGEMENT[(register, example_set, apologetic)]
+        elif section == "solution_or_next_steps":
+            lines = example_lines(god_mode_prompt, example_set)
+            if extra is not None:
+                lines = tuple(line for line in lines if not extra.search(line))
+            line = _pick(lines, customer_message, traits["concise"])
+            next_step = _NEXT_STEP[register].format(when=_follow_up_when(user_intent))
+            sentences[section] = f"{line} {next_step}" if line else next_step
+        elif section == "assurance":
+            sentences[section] = _ASSURANCE[(register, traits["warm"] and not traits["concise"])]
+
+    if extra is not None:
+        sentences = {k: s for k, s in sentences.items() if not extra.search(s)}
+    reply = _fit(sentences)
+    metrics.inc("lexiq_fallback_responses_total", tone=example_set)
+    return reply
+
+
+def _sections(response_contract: Dict) -> Tuple[str, ...]:
+    structure = response_contract.get("response_structure") or ()
+    sections = tuple(
+        item["section"] for item in structure
+        if isinstance(item, dict) and item.get("section")
+    )
+    return sections or ("reconfirmation", "acknowledgement", "solution_or_next_steps", "assurance")
+
+
+# Dropped first when a reply would break the limits
+_OPTIONAL_ORDER = ("reconfirmation", "acknowledgement")
+
+
+def _fit(sentences: Dict[str, str]) -> str:
+    reply = " ".join(s for s in sentences.values() if s)
+    if _constraint_violation(reply) is None:
+        return reply
+
+    for section in _OPTIONAL_ORDER:
+        sentences.pop(section, None)
+        reply = " ".join(s for s in sentences.values() if s)
+        if _constraint_violation(reply) is None:
+            return reply
+
+    # Templates alone always pass
+    return " ".join((_NEXT_STEP["casual"].format(when=_DEFAULT_WHEN), _ASSURANCE[("casual", False)]))
@@ -0,0 +1,340 @@
+"""
+LexIQ Labs – Fuzzy Matcher
+
+Purpose:
+- Typo-tolerant pain point matching: "refnd", "procurment",
+  "ghosted us agian" still find their keywords
+- SymSpell-style deletion index over every word of the library's
+  keywords (and keyword expansions), built once: a message token
+  resolves to its nearest keyword word in a few dict lookups
+- Edit distance (optimal string alignment: one transposition costs 1)
+  of 1 for words of 5-7 characters, 2 from 8 characters; shorter words,
+  stopwords and numbers are never corrected
+- Keywords found only after correction count as signals but weigh
+  less: 1 - DISTANCE_PENALTY per edit
+
+Used through LibraryIndex.match_pain_point(..., fuzzy=True); the exact
+path is unchanged.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from language import STOPWORDS
+
+MAX_DISTANCE = 2
+# Shortest word (in characters) corrected at distance 1 and at distance 2
+MIN_LENGTH_DISTANCE_1 = 5
+MIN_LENGTH_DISTANCE_2 = 8
+
+# Weight lost per edit by a keyword found only after correction
+DISTANCE_PENALTY = 0.25
+MIN_WEIGHT = 0.25
+
+_STOPWORDS = frozenset().union(*STOPWORDS.values())
+
+# Corrections memoized per token; cleared when the vocabulary grows
+_MEMO_MAX = 65536
+
+
+def allowed_distance(length: int) -> int:
+    if length >= MIN_LENGTH_DISTANCE_2:
+        return MAX_DISTANCE
+    if length >= MIN_LENGTH_DISTANCE_1:
+        return 1
+    return 0
+
+
+def term_weight(distance: int) -> float:
+    return max(MIN_WEIGHT, 1.0 - DISTANCE_PENALTY * distance)
+
+
+def _delete_levels(word: str, distance: int) -> Iterator[set]:
+    """
+    Strings reachable from word by deleting characters, one set per
+    number of deletions (1 .. distance), each string in the first set only.
+    """
+    seen = {word}
+    frontier = {word}
+    for _ in range(distance):
+        next_frontier = set()
+        for current in frontier:
+            if len(current) <= 1:
+                continue
+            for i in range(len(current)):
+                variant = current[:i] + current[i + 1:]
+                if variant not in seen:
+                    seen.add(variant)
+                    next_frontier.add(variant)
+        if not next_frontier:
+            return
+        yield next_frontier
+        frontier = next_frontier
+
+
+def _deletes(word: str, distance: int) -> set:
+    """Every string reachable from word by deleting up to `distance` characters."""
+    found = set()
+    for level in _delete_levels(word, distance):
+        found |= level
+    return found
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or limit + 1 once it is known to exceed limit.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    # Typos are local: only the differing middle needs the full table
+    prefix = 0
+    while prefix < len(a) and prefix < len(b) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < len(a) - prefix and suffix < len(b) - prefix
+        and a[-1 - suffix] == b[-1 - suffix]
+    ):
+        suffix += 1
+    a = a[prefix:len(a) - suffix]
+    b = b[prefix:len(b) - suffix]
+    if not a or not b:
+        return len(a) + len(b)
+
+    previous_previous: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous_previous is not None and j > 1
+                and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+class DeletionIndex:
+    """
+    SymSpell deletion index: every vocabulary word is stored under each
+    of its deletions (up to the distance its length allows). A token's
+    own deletions then meet the deletions of every word within that
+    distance, without scanning the vocabulary.
+
+    Words can be added at any time (library edits); they are never
+    removed, as a stale word only costs a correction that finds nothing.
+
+    base: layer this index over another one. Lookups see the words of
+    both; added words go to this layer only, so a fork's edits never
+    reach its base (or the base's other forks).
+    """
+
+    def __init__(self, words: Iterable[str] = (), *, base: Optional["DeletionIndex"] = None):
+        # word -> number of keyword terms using it (ties go to the common word)
+        self._words: Dict[str, int] = {}
+        self._deletes: Dict[str, Tuple[str, ...]] = {}
+        self._memo: Dict[str, Optional[Tuple[str, int]]] = {}
+        # This layer first, then its bases
+        self._layers: Tuple["DeletionIndex", ...] = (self,) + (base._layers if base is not None else ())
+        # Bumped on every new word; a layer's memo is only good for its bases' versions
+        self._version = 0
+        self._memo_versions: Tuple[int, ...] = self._versions()
+        self.add_all(words)
+
+    def __len__(self) -> int:
+        if len(self._layers) == 1:
+            return len(self._words)
+        return len({word for layer in self._layers for word in layer._words})
+
+    def __contains__(self, word: str) -> bool:
+        return any(word in layer._words for layer in self._layers)
+
+    def _versions(self) -> Tuple[int, ...]:
+        return tuple(layer._version for layer in self._layers[1:])
+
+    def add_all(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if not word:
+            return
+        if word in self._words:
+            self._words[word] += 1
+            return
+        self._words[word] = 1
+        for variant in _deletes(word, allowed_distance(len(word))) | {word}:
+            # Replaced, never appended in place: concurrent readers see old or new
+            self._deletes[variant] = self._deletes.get(variant, ()) + (word,)
+        self._version += 1
+        if self._memo:
+            self._memo = {}
+
+    def lookup(self, token: str) -> Optional[Tuple[str, int]]:
+        """(nearest vocabulary word, distance), or None if none is close enough."""
+        if token in self._words:
+            return token, 0
+        if len(self._layers) > 1:
+            if token in self:
+                return token, 0
+            versions = self._versions()
+            if versions != self._memo_versions:
+                self._memo = {}
+                self._memo_versions = versions
+        memo = self._memo
+        if token in memo:
+            return memo[token]
+
+        result = None
+        limit = allowed_distance(len(token))
+        if limit and token not in _STOPWORDS and not any(c.isdigit() for c in token):
+            result = self._nearest(token, limit)
+
+        if len(memo) >= _MEMO_MAX:
+            memo.clear()
+        memo[token] = result
+        return result
+
+    def _nearest(self, token: str, limit: int) -> Optional[Tuple[str, int]]:
+        best: Optional[Tuple[int, int, str]] = None  # (distance, -count, word)
+        seen = set()
+        layers = self._layers
+        words = self._words if len(layers) == 1 else None
+        # A word d edits away shares a deletion with the token that takes at
+        # most d deletions from the token: after level d, nothing closer is left
+        levels = _delete_levels(token, limit)
+        variants = {token}
+        level = 0
+        while variants is not None:
+            for variant in variants:
+                for layer in layers:
+                    for word in layer._deletes.get(variant, ()):
+                        if word in seen:
+                            continue
+                        seen.add(word)
+                        # Both sides must allow the distance: "cost" never becomes "cast"
+                        word_limit = min(limit, allowed_distance(len(word)))
+                        if not word_limit:
+                            continue
+                        distance = osa_distance(token, word, word_limit)
+                        if distance > word_limit:
+                            continue
+                        if words is not None:
+                            count = words[word]
+                        else:
+                            count = sum(other._words.get(word, 0) for other in layers)
+                        key = (distance, -count, word)
+                        if best is None or key < best:
+                            best = key
+            if best is not None and best[0] <= level:
+                break
+            variants = next(levels, None)
+            level += 1
+        return (best[2], best[0]) if best is not None else None
+
+    def correct(self, text: str) -> "Correction":
+        """Correct every token of a normalized text that is not a vocabulary word."""
+        tokens = text.split()
+        corrected: List[str] = []
+        distances: List[int] = []
+        changed = False
+        for token in tokens:
+            found = self.lookup(token)
+            if found is None or found[1] == 0:
+                corrected.append(token)
+                distances.append(0)
+            else:
+                corrected.append(found[0])
+                distances.append(found[1])
+                changed = True
+        return Correction(corrected, distances, changed)
+
+
+class Correction:
+    """
+    A message after correction: the corrected text (single-spaced) and,
+    per token, how many edits it took.
+    """
+
+    __slots__ = ("text", "changed", "_spans")
+
+    def __init__(self, tokens: List[str], distances: List[int], changed: bool):
+        self.text = " ".join(tokens)
+        self.changed = changed
+        # (start, end, distance) of every corrected token
+        spans = []
+        position = 0
+        for token, distance in zip(tokens, distances):
+            if distance:
+                spans.append((position, position + len(token), distance))
+            position += len(token) + 1
+        self._spans = tuple(spans)
+
+    @property
+    def corrections(self) -> int:
+        return len(self._spans)
+
+    @property
+    def corrected_words(self) -> List[str]:
+        return [self.text[start:end] for start, end, _ in self._spans]
+
+    def distance_of(self, term: str) -> Optional[int]:
+        """
+        Fewest edits behind any occurrence of term in the corrected text
+        (the sum over the tokens it spans), or None if it does not occur.
+        """
+        text = self.text
+        best: Optional[int] = None
+        position = text.find(term)
+        while position != -1:
+            end = position + len(term)
+            distance = sum(d for start, stop, d in self._spans if start < end and stop > position)
+            if best is None or distance < best:
+                best = distance
+                if not best:
+                    break
+            position = text.find(term, position + 1)
+        return best
+
+    def weight_of(self, term: str) -> float:
+        distance = self.distance_of(term)
+        return 0.0 if distance is None else term_weight(distance)
+
+
+def fuzzy_score_match(
+    text: str,
+    correction: Correction,
+    forms: Sequence[str],
+    expansions: Optional[Mapping[str, Sequence[str]]] = None,
+) -> Tuple[int, float]:
+    """
+    score_forms over a message and its correction: (signals, weighted
+    score). `forms` are normalized tags (see tag_forms). A tag in the
+    message itself weighs 1; found only after correction, it weighs
+    term_weight of its edits.
+    """
+    signals = 0
+    weighted = 0.0
+    for tag in forms:
+        weight = 1.0 if tag in text else correction.weight_of(tag)
+        if weight < 1.0:
+            for variant in (expansions or {}).get(tag, ()):
+                weight = max(weight, 1.0 if variant in text else correction.weight_of(variant))
+                if weight == 1.0:
+                    break
+        if weight:
+            signals += 1
+            weighted += weight
+    return signals, weighted
+
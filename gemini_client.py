@@ -0,0 +1,206 @@
+"""
+LexIQ Labs – Gemini Client
+
+Purpose:
+- Single place where Gemini generateContent requests are sent
+- Classify failures into reason codes instead of swallowing them
+- Record per-call latency and outcome metrics, and a "gemini_request"
+  event per call (event_log)
+- Reuse pooled keep-alive connections across calls and threads
+- Admit every call through the shared rate-limit scheduler
+- Run each call through the metrics stage hook ("gemini_<stage>"), so
+  profiling captures it with the rest of the request
+- Send the API key in the x-goog-api-key header, never in the URL, so
+  error messages and logs can't carry it
+
+Callers still decide how to degrade (return None / [] on GeminiError).
+"""
+
+import json
+import os
+import re
+import threading
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import event_log
+import gemini_scheduler
+import metrics
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Override to point at a proxy or a local fake server (benchmarks)
+GEMINI_API_BASE = os.getenv(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta"
+)
+GEMINI_ENDPOINT = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent"
+
+# Max keep-alive connections kept open to Gemini (one per concurrent call)
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "16"))
+
+# Reason codes
+MISSING_API_KEY = "missing_api_key"
+TIMEOUT = "timeout"
+CONNECTION_ERROR = "connection_error"
+RATE_LIMITED = "rate_limited"
+HTTP_ERROR = "http_error"
+BAD_RESPONSE = "bad_response"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+# Last line of defence for details logged from exception messages
+_KEY_PARAM = re.compile(r"(key=)[^&\s'\"]+", re.IGNORECASE)
+
+
+class GeminiError(Exception):
+    def __init__(self, reason: str, detail: str = "", status: Optional[int] = None):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+        self.status = status  # HTTP status, for HTTP_ERROR
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def http_session():
+    """
+    Shared requests.Session with a connection pool sized for concurrency.
+    """
+    global _http_session
+
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                # Deferred: requests costs ~100 ms to import; cold starts
+                # that never reach Gemini should not pay for it
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+
+    return _http_session
+
+
+def generate_content(
+    *,
+    stage: str,
+    payload: Dict,
+    timeout: float,
+    api_key: Optional[str] = None,
+) -> Dict:
+    """
+    POST a generateContent payload and return the decoded JSON body.
+
+    Raises GeminiError with a reason code on any failure.
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        metrics.inc(metrics.GEMINI_REQUESTS, stage=stage, outcome=MISSING_API_KEY)
+        event_log.emit("gemini_request", stage=stage, outcome="error", reason=MISSING_API_KEY)
+        raise GeminiError(MISSING_API_KEY)
+
+    try:
+        gemini_scheduler.admit(stage=stage, payload=payload)
+    except gemini_scheduler.DeadlineExceeded as e:
+        metrics.inc(metrics.GEMINI_REQUESTS, stage=stage, outcome=DEADLINE_EXCEEDED)
+        event_log.emit("gemini_request", stage=stage, outcome="error", reason=DEADLINE_EXCEEDED)
+        raise GeminiError(DEADLINE_EXCEEDED, str(e))
+
+    session = http_session()
+    start = perf_counter()
+    outcome = "ok"
+    detail = None
+
+    try:
+        return metrics.hooked(f"gemini_{stage}", _post, session, api_key, payload, timeout)
+
+    except GeminiError as e:
+        outcome = e.reason
+        detail = e.detail[:200]
+        raise
+
+    except Exception as e:
+        # Not a reason-coded failure (a bug, a profiling hook...): still not a success
+        outcome = "error"
+        detail = _scrub(f"{type(e).__name__}: {e}")[:200]
+        raise
+
+    finally:
+        elapsed = perf_counter() - start
+        metrics.observe(metrics.STAGE_DURATION, elapsed, stage=f"gemini_{stage}")
+        metrics.inc(metrics.GEMINI_REQUESTS, stage=stage, outcome=outcome)
+        if outcome == "ok":
+            event_log.emit("gemini_request", stage=stage, latency_s=elapsed)
+        else:
+            event_log.emit(
+                "gemini_request", stage=stage, outcome="error", latency_s=elapsed,
+                reason=outcome, detail=detail,
+            )
+
+
+def _post(session, api_key: str, payload: Dict, timeout: float) -> Dict:
+    import requests  # already loaded by http_session(); for exception types
+
+    try:
+        response = session.post(
+            GEMINI_ENDPOINT,
+            headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
+            data=json.dumps(payload),
+            timeout=timeout,
+        )
+    except requests.Timeout as e:
+        raise GeminiError(TIMEOUT, _scrub(str(e)))
+    except requests.RequestException as e:
+        raise GeminiError(CONNECTION_ERROR, _scrub(str(e)))
+
+    if response.status_code == 429:
+        gemini_scheduler.SCHEDULER.penalize(_retry_after(response))
+        raise GeminiError(RATE_LIMITED, response.text[:200])
+    if response.status_code != 200:
+        raise GeminiError(
+            HTTP_ERROR, f"{response.status_code} {response.text[:200]}", status=response.status_code,
+        )
+
+    try:
+        return response.json()
+    except ValueError as e:
+        raise GeminiError(BAD_RESPONSE, str(e))
+
+
+def _scrub(text: str) -> str:
+    return _KEY_PARAM.sub(r"\1<redacted>", text)
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def candidate_texts(data: Dict) -> List[str]:
+    """
+    Text of every candidate (candidateCount > 1); malformed ones are skipped.
+    """
+    texts = []
+    for candidate in data.get("candidates") or []:
+        try:
+            texts.append(candidate["content"]["parts"][0]["text"] or "")
+        except (KeyError, IndexError, TypeError):
+            continue
+    return texts
+
+
+def first_candidate_text(data: Dict) -> str:
+    """
+    Extract the first candidate's text, or "" if the shape is unexpected.
+    """
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"] or ""
+    except (KeyError, IndexError, TypeError):
+        return ""
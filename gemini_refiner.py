@@ -1,18 +1,27 @@
 # gemini_refiner.py
 
+import contextvars
 import os
-import requests
 import re
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = "gemini-2.5-flash"
-
-GEMINI_ENDPOINT = (
-    f"https://generativelanguage.googleapis.com/v1beta/models/"
-    f"{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+import event_log
+import metrics
+from gemini_client import (
+    GEMINI_POOL_SIZE,
+    HTTP_ERROR,
+    MISSING_API_KEY,
+    GeminiError,
+    candidate_texts,
+    first_candidate_text,
+    generate_content,
 )
 
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
 # ─────────────────────────────────────────
 # Hard safety checks
 
@@ -28,24 +37,75 @@ FORBIDDEN_PHRASES = [
 
 MAX_WORDS = 120
 
+# One pass over the text instead of one scan per phrase
+_FORBIDDEN_PATTERN = re.compile(
+    "|".join(re.escape(p) for p in FORBIDDEN_PHRASES), re.IGNORECASE
+)
+
+
+def _constraint_violation(text: str) -> Optional[str]:
+    """Return the reason code of the first hard constraint violated, if any."""
+    if len(text.split()) > MAX_WORDS:
+        return "max_words"
+
+    if _FORBIDDEN_PATTERN.search(text):
+        return "forbidden_phrase"
+
+    return None
+
 
 def _violates_constraints(text: str) -> bool:
     """Check if Gemini output violates hard constraints."""
-    text_lc = text.lower()
+    return _constraint_violation(text) is not None
 
-    if len(text.split()) > MAX_WORDS:
-        return True
 
-    for phrase in FORBIDDEN_PHRASES:
-        if phrase in text_lc:
-            return True
+# Reason codes of refinements that returned nothing usable
+EMPTY_OUTPUT = "empty_output"
+NO_USABLE_CANDIDATE = "no_usable_candidate"
 
-    return False
+
+def _event(stage: str, outcome: str, start: Optional[float] = None, **fields) -> None:
+    event_log.emit(
+        "gemini_stage", stage=stage, outcome=outcome,
+        latency_s=perf_counter() - start if start is not None else None,
+        **fields,
+    )
 
 
 # ─────────────────────────────────────────
 # Gemini refiner
 
+SYSTEM_PROMPT = (
+    "You are a language refiner.\n\n"
+    "Rewrite the instruction below into a customer-facing reply.\n\n"
+    "RULES:\n"
+    "- Do NOT add new ideas\n"
+    "- Do NOT change intent or tone\n"
+    "- Do NOT add promises, policies, or guarantees\n"
+    "- Do NOT exceed 120 words\n"
+    "- Preserve emotional stance exactly\n\n"
+    "Return ONLY the final reply.\n\n"
+    "INSTRUCTION:\n"
+)
+
+
+def _payload(instruction_block: str, candidate_count: int = 1) -> Dict:
+    payload = {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "text": SYSTEM_PROMPT + instruction_block
+                    }
+                ]
+            }
+        ]
+    }
+    if candidate_count > 1:
+        payload["generationConfig"] = {"candidateCount": candidate_count}
+    return payload
+
+
 def refine_instruction(
     instruction_block: str,
     timeout: int = 8
@@ -60,65 +120,239 @@ def refine_instruction(
     """
 
     if not GEMINI_API_KEY:
-        print("[Gemini Refiner] Missing API key.")
+        _event("refine_instruction", "error", reason=MISSING_API_KEY)
+        return None
+
+    start = perf_counter()
+    try:
+        data = generate_content(
+            stage="refine_instruction",
+            payload=_payload(instruction_block),
+            timeout=timeout,
+            api_key=GEMINI_API_KEY,
+        )
+    except GeminiError as e:
+        _event("refine_instruction", "error", start, reason=e.reason)
+        return None
+
+    result = first_candidate_text(data).strip()
+
+    if not result:
+        _event("refine_instruction", "rejected", start, reason=EMPTY_OUTPUT)
         return None
 
-    system_prompt = (
-        "You are a language refiner.\n\n"
-        "Rewrite the instruction below into a customer-facing reply.\n\n"
-        "RULES:\n"
-        "- Do NOT add new ideas\n"
-        "- Do NOT change intent or tone\n"
-        "- Do NOT add promises, policies, or guarantees\n"
-        "- Do NOT exceed 120 words\n"
-        "- Preserve emotional stance exactly\n\n"
-        "Return ONLY the final reply.\n\n"
-        "INSTRUCTION:\n"
+    violation = _constraint_violation(result)
+    if violation:
+        metrics.inc(metrics.CONSTRAINT_REJECTIONS, reason=violation)
+        _event("refine_instruction", "rejected", start, reason=violation)
+        return None
+
+    _event("refine_instruction", event_log.OK, start)
+    return result
+
+
+# ─────────────────────────────────────────
+# Multi-candidate refinement
+#
+# One request asks for N candidates; every candidate is checked against
+# the hard constraints and the survivors are ranked locally. This replaces
+# serial "refine → violates → retry" loops.
+
+# Cues for each mandatory contract section (see response_contract)
+_SECTION_CUES = {
+    "reconfirmation": re.compile(
+        r"\b(you mentioned|you've|you have|you're|sounds like|regarding|about your|"
+        r"i see|i can see|looking at)\b", re.IGNORECASE,
+    ),
+    "acknowledgement": re.compile(
+        r"\b(understand|appreciate|sorry|apolog\w*|frustrat\w*|thank(s| you)|"
+        r"hear you|fair|makes sense|valid)\b", re.IGNORECASE,
+    ),
+    "solution_or_next_steps": re.compile(
+        r"\b(next step\w*|i'll|i will|we'll|we will|let's|here's|plan|"
+        r"by (today|tomorrow|end of day|monday|tuesday|wednesday|thursday|friday)|"
+        r"(i|we) can (fix|help|get|set|send|schedule|walk|check|reset|restore|move)|"
+        r"(i'm|we're|i am|we are) going to|please try|in the meantime|right away|"
+        r"schedule|send (you|over))\b", re.IGNORECASE,
+    ),
+    "assurance": re.compile(
+        r"\b(keep you (posted|updated)|update you|stay on|own(ing)? this|"
+        r"make sure|here (to help|for you)|follow(ing)? up|personally|rest assured|"
+        r"until (it's|it is) (resolved|fixed|sorted))\b", re.IGNORECASE,
+    ),
+}
+
+_CONTENT_WORD = re.compile(r"[a-z]{4,}")
+
+# Word count where a reply reads as complete but not padded
+IDEAL_WORDS = (40, 100)
+
+
+def _length_fit(word_count: int) -> float:
+    low, high = IDEAL_WORDS
+    if low <= word_count <= high:
+        return 1.0
+    if word_count < low:
+        return word_count / low
+    return max(0.0, (MAX_WORDS - word_count) / (MAX_WORDS - high))
+
+
+def _structure_coverage(text: str, customer_message: Optional[str]) -> float:
+    covered = sum(1 for cue in _SECTION_CUES.values() if cue.search(text))
+
+    # Reconfirmation also counts when the reply reuses the customer's words
+    if customer_message and not _SECTION_CUES["reconfirmation"].search(text):
+        theirs = set(_CONTENT_WORD.findall(customer_message.lower()))
+        ours = set(_CONTENT_WORD.findall(text.lower()))
+        if theirs and len(theirs & ours) >= min(2, len(theirs)):
+            covered += 1
+
+    return covered / len(_SECTION_CUES)
+
+
+def rank_candidates(
+    candidates: List[str],
+    *,
+    response_contract: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    Check candidates against the hard constraints and rank the survivors
+    by contract-structure coverage (70%) and length fit (30%).
+
+    Returns (best first):
+    [
+        {
+            "text": str,
+            "score": float,
+            "coverage": float,
+            "length_fit": float
+        }
+    ]
+    """
+    customer_message = (
+        (response_contract or {}).get("input_context", {}).get("customer_message")
     )
 
-    payload = {
-        "contents": [
+    ranked = []
+    for position, text in enumerate(candidates):
+        text = text.strip()
+        if not text:
+            continue
+
+        violation = _constraint_violation(text)
+        if violation:
+            metrics.inc(metrics.CONSTRAINT_REJECTIONS, reason=violation)
+            continue
+
+        coverage = _structure_coverage(text, customer_message)
+        length_fit = _length_fit(len(text.split()))
+        ranked.append((
+            -(0.7 * coverage + 0.3 * length_fit),
+            position,
             {
-                "parts": [
-                    {
-                        "text": system_prompt + instruction_block
-                    }
-                ]
-            }
-        ]
-    }
+                "text": text,
+                "score": round(0.7 * coverage + 0.3 * length_fit, 3),
+                "coverage": round(coverage, 3),
+                "length_fit": round(length_fit, 3),
+            },
+        ))
 
-    try:
-        response = requests.post(
-            GEMINI_ENDPOINT,
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=timeout
-        )
+    ranked.sort(key=lambda x: (x[0], x[1]))
+    return [item for _, _, item in ranked]
 
-        if response.status_code != 200:
-            print("[Gemini Refiner] API error:", response.text)
-            return None
 
-        result = (
-            response.json()
-            .get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-            .strip()
-        )
+def _parallel_candidates(instruction_block: str, candidate_count: int, timeout: int) -> List[str]:
+    def one(_):
+        try:
+            data = generate_content(
+                stage="refine_instruction",
+                payload=_payload(instruction_block),
+                timeout=timeout,
+                api_key=GEMINI_API_KEY,
+            )
+        except GeminiError:
+            return ""
+        return first_candidate_text(data)
 
-        if not result:
-            return None
+    # Each worker runs in a copy of the caller's context: events keep the request id
+    context = contextvars.copy_context()
+    return list(candidate_pool().map(lambda n: context.copy().run(one, n), range(candidate_count)))
 
-        if _violates_constraints(result):
-            print("[Gemini Refiner] Constraint violation detected.")
+
+_candidate_pool: Optional[ThreadPoolExecutor] = None
+_candidate_pool_lock = threading.Lock()
+
+
+def candidate_pool() -> ThreadPoolExecutor:
+    """
+    Shared pool for parallel candidate calls, GEMINI_POOL_SIZE threads
+    (the HTTP connection pool's size): concurrent requests queue here
+    instead of each opening candidate_count more threads.
+    """
+    global _candidate_pool
+
+    if _candidate_pool is None:
+        with _candidate_pool_lock:
+            if _candidate_pool is None:
+                _candidate_pool = ThreadPoolExecutor(
+                    max_workers=GEMINI_POOL_SIZE, thread_name_prefix="gemini-candidates",
+                )
+    return _candidate_pool
+
+
+def _rejects_candidate_count(error: GeminiError) -> bool:
+    return (
+        error.reason == HTTP_ERROR and error.status == 400
+        and "candidatecount" in error.detail.lower()
+    )
+
+
+def refine_instruction_best(
+    instruction_block: str,
+    *,
+    candidate_count: int = 3,
+    response_contract: Optional[Dict] = None,
+    timeout: int = 8,
+) -> Optional[str]:
+    """
+    Like refine_instruction, but asks for several candidates in a single
+    request (candidateCount) and returns the best one that passes the
+    hard constraints.
+
+    If the API rejects candidateCount (a 400 naming it), falls back to
+    parallel single calls; any other error is not retried. Returns None
+    only if no candidate is usable.
+    """
+
+    if not GEMINI_API_KEY:
+        _event("refine_instruction_best", "error", reason=MISSING_API_KEY)
+        return None
+
+    start = perf_counter()
+    try:
+        data = generate_content(
+            stage="refine_instruction",
+            payload=_payload(instruction_block, candidate_count),
+            timeout=timeout,
+            api_key=GEMINI_API_KEY,
+        )
+        candidates = candidate_texts(data)
+    except GeminiError as e:
+        if not _rejects_candidate_count(e) or candidate_count <= 1:
+            _event("refine_instruction_best", "error", start, reason=e.reason)
             return None
+        candidates = _parallel_candidates(instruction_block, candidate_count, timeout)
 
-        return result
+    ranked = rank_candidates(candidates, response_contract=response_contract)
+    metrics.inc("lexiq_refine_candidates_total", len(candidates), outcome="received")
+    metrics.inc("lexiq_refine_candidates_total", len(ranked), outcome="usable")
 
-    except Exception as e:
-        print("[Gemini Refiner] Exception:", str(e))
+    if not ranked:
+        _event(
+            "refine_instruction_best", "rejected", start,
+            reason=NO_USABLE_CANDIDATE, candidates=len(candidates),
+        )
         return None
 
+    _event("refine_instruction_best", event_log.OK, start, candidates=len(candidates), usable=len(ranked))
+    return ranked[0]["text"]
@@ -0,0 +1,272 @@
+"""
+LexIQ Labs – Gemini Scheduler
+
+Purpose:
+- Admit Gemini calls through one shared quota instead of letting every
+  module fire independently
+- Token-bucket limits for requests/minute and tokens/minute
+- Priority classes so interactive refinement is served before questions,
+  Time Travel, and background work (voice profiles, batch jobs)
+- Drop work that waited past its class deadline; record queue time
+
+Callers block in acquire() until admitted. Waiters are ordered by
+(priority, arrival) in a heap; only the head may take quota, so a
+background burst cannot starve interactive traffic.
+
+Limits come from GEMINI_RPM / GEMINI_TPM (0 or unset = unlimited)
+and are enforced over any sliding minute, like the API's own quota.
+With both unlimited the scheduler is a pass-through.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+from time import monotonic
+from typing import Dict, Iterator, Optional
+
+import metrics
+from prompt_budget import estimate_tokens
+
+QUEUE_SECONDS = "lexiq_gemini_queue_seconds"
+DROPPED = "lexiq_gemini_dropped_total"
+
+# Priority classes (lower = served first)
+INTERACTIVE = 0
+QUESTIONS = 1
+TIME_TRAVEL = 2
+BACKGROUND = 3
+
+STAGE_PRIORITY = {
+    "refine_instruction": INTERACTIVE,
+    "refine_response": INTERACTIVE,
+    "questions": QUESTIONS,
+    "time_travel": TIME_TRAVEL,
+    "voice_profile": BACKGROUND,
+}
+
+# Longest a request may wait for quota before it is dropped as stale
+MAX_QUEUE_SECONDS = {
+    INTERACTIVE: 5.0,
+    QUESTIONS: 10.0,
+    TIME_TRAVEL: 20.0,
+    BACKGROUND: 120.0,
+}
+
+# Output tokens reserved per candidate (actual usage is not known up front)
+EXPECTED_OUTPUT_TOKENS = 256
+
+# Share of the quota that may be spent in a burst; the rest refills
+# evenly, so burst + refill never exceeds the quota within one window
+BURST_FRACTION = 0.1
+
+# Pause after the API answers 429 without a Retry-After header
+DEFAULT_BACKOFF_SECONDS = 2.0
+
+_priority_override: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "gemini_priority", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Allows at most `quota` units in any sliding `window` seconds:
+    a burst of BURST_FRACTION × quota, refilled by the remainder spread
+    evenly over the window. A request larger than the burst waits for a
+    full bucket and is charged in full: the level goes negative and the
+    debt is repaid before anything else is admitted. Not thread-safe;
+    the scheduler holds its lock.
+    """
+
+    def __init__(self, quota: float, window: float = 60.0):
+        self.capacity = max(1.0, quota * BURST_FRACTION)
+        self.rate = max(quota - self.capacity, 1.0) / window
+        self.level = self.capacity
+        self.updated = monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+class _Ticket:
+    __slots__ = ("priority", "tokens", "deadline", "cancelled")
+
+    def __init__(self, priority: int, tokens: int, deadline: float):
+        self.priority = priority
+        self.tokens = tokens
+        self.deadline = deadline
+        self.cancelled = False
+
+
+class GeminiScheduler:
+    """
+    rpm / tpm are quotas per `window` seconds (one minute for the API).
+    """
+
+    def __init__(self, *, rpm: float = 0, tpm: float = 0, window: float = 60.0):
+        self.requests = TokenBucket(rpm, window) if rpm else None
+        self.tokens = TokenBucket(tpm, window) if tpm else None
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _pop_cancelled(self) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+
+    def acquire(self, *, priority: int, tokens: int, max_wait: Optional[float] = None) -> float:
+        """
+        Block until quota is granted to this request.
+
+        Returns seconds spent queued. Raises DeadlineExceeded if the
+        request waited longer than max_wait (default: its class deadline).
+        """
+        if not self.enabled:
+            return 0.0
+
+        start = monotonic()
+        if max_wait is None:
+            max_wait = MAX_QUEUE_SECONDS.get(priority, MAX_QUEUE_SECONDS[BACKGROUND])
+        ticket = _Ticket(priority, tokens, start + max_wait)
+
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._order), ticket))
+
+            while True:
+                now = monotonic()
+                self._pop_cancelled()
+
+                timeout = ticket.deadline - now
+                if self._heap[0][2] is ticket:
+                    wait = self._wait_time(tokens, now)
+                    if wait == 0.0:
+                        heapq.heappop(self._heap)
+                        if self.requests is not None:
+                            self.requests.take(1)
+                        if self.tokens is not None:
+                            self.tokens.take(tokens)
+                        self._cond.notify_all()
+                        return now - start
+                    timeout = min(timeout, wait)
+
+                if now >= ticket.deadline:
+                    ticket.cancelled = True
+                    self._pop_cancelled()
+                    self._cond.notify_all()
+                    raise DeadlineExceeded(f"queued {now - start:.2f}s")
+
+                self._cond.wait(timeout)
+
+    def penalize(self, seconds: Optional[float] = None) -> None:
+        """
+        Pause all admissions after the API reported quota exhaustion.
+        """
+        with self._cond:
+            until = monotonic() + (seconds if seconds is not None else DEFAULT_BACKOFF_SECONDS)
+            self._paused_until = max(self._paused_until, until)
+            if self.requests is not None:
+                self.requests.level = 0.0
+                self.requests.updated = monotonic()
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, _, t in self._heap if not t.cancelled)
+
+
+def _env_limit(name: str) -> float:
+    try:
+        return float(os.getenv(name) or 0)
+    except ValueError:
+        return 0.0
+
+
+SCHEDULER = GeminiScheduler(rpm=_env_limit("GEMINI_RPM"), tpm=_env_limit("GEMINI_TPM"))
+
+
+def configure(*, rpm: float = 0, tpm: float = 0, window: float = 60.0) -> GeminiScheduler:
+    """Replace the shared scheduler (tests, benchmarks, services)."""
+    global SCHEDULER
+    SCHEDULER = GeminiScheduler(rpm=rpm, tpm=tpm, window=window)
+    return SCHEDULER
+
+
+@contextlib.contextmanager
+def use_priority(priority: int) -> Iterator[None]:
+    """
+    Run Gemini calls in this context at `priority` regardless of stage,
+    e.g. a batch job's refinements as BACKGROUND.
+    """
+    token = _priority_override.set(priority)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def priority_for(stage: str) -> int:
+    override = _priority_override.get()
+    if override is not None:
+        return override
+    return STAGE_PRIORITY.get(stage, BACKGROUND)
+
+
+def estimate_request_tokens(payload: Dict) -> int:
+    text = " ".join(
+        part.get("text", "")
+        for content in payload.get("contents") or []
+        for part in content.get("parts") or []
+    )
+    candidates = int((payload.get("generationConfig") or {}).get("candidateCount") or 1)
+    return estimate_tokens(text) + EXPECTED_OUTPUT_TOKENS * candidates
+
+
+def admit(*, stage: str, payload: Dict) -> float:
+    """
+    Wait for quota for one generateContent call. Returns queue seconds.
+
+    Raises DeadlineExceeded when the request went stale in the queue.
+    """
+    scheduler = SCHEDULER
+    if not scheduler.enabled:
+        return 0.0
+
+    priority = priority_for(stage)
+    try:
+        waited = scheduler.acquire(priority=priority, tokens=estimate_request_tokens(payload))
+    except DeadlineExceeded:
+        metrics.inc(DROPPED, stage=stage, priority=str(priority))
+        raise
+
+    metrics.observe(QUEUE_SECONDS, waited, priority=str(priority))
+    return waited
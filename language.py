@@ -0,0 +1,86 @@
+"""
+LexIQ Labs – Language Detection
+
+Purpose:
+- Pick the language of a customer message so it is matched against the
+  right keyword index (English tags plus that language's expansions)
+- Deterministic, dependency-free and cheap: a stopword vote over the
+  first MAX_TOKENS tokens of the normalized message
+- Fall back to English whenever the vote is not clear
+
+Stopwords are stored in normalized form (lowercase, accents folded,
+apostrophes dropped), so detect_language() takes the output of
+pain_point_matcher.normalize() directly.
+"""
+
+from typing import Dict, FrozenSet, Tuple
+
+DEFAULT_LANGUAGE = "en"
+SUPPORTED_LANGUAGES: Tuple[str, ...] = ("en", "es", "de", "fr")
+
+# Votes a non-English language needs before it wins
+MIN_VOTES = 2
+
+# Enough tokens to decide; long threads do not cost more
+MAX_TOKENS = 60
+
+STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset(
+        "the and is are was were you your we our not have has had this that with "
+        "for it to of my me can cant dont didnt doesnt please but been still "
+        "again from they them there what when why how just any".split()
+    ),
+    "es": frozenset(
+        "el la los las que y en es por para con una un mi su pero muy esta estoy "
+        "hemos tenemos nos lo se del al como mas ya sin hace nuestro nuestra "
+        "todavia aun nadie nunca desde cuando porque esto eso de hola gracias "
+        "favor tambien ademas otra vez ahora dias buenos".split()
+    ),
+    "de": frozenset(
+        "der die das und ist nicht ich wir sie ein eine mit auf fur zu den dem "
+        "noch aber auch kein keine haben unser unsere bitte seit immer wurde "
+        "schon wieder warum wenn oder nach uns hallo danke jetzt mal sehr "
+        "guten ausserdem".split()
+    ),
+    "fr": frozenset(
+        "le la les des et est pas je nous vous une pour avec qui dans sur mais "
+        "ne plus notre nos toujours depuis sans ce cette il elle ai avons "
+        "aucun aucune rien jamais encore pourquoi quand de la du au en cest "
+        "bonjour bonsoir merci aussi maintenant fois tres trop mon ma mes "
+        "votre vos".split()
+    ),
+}
+
+# token -> languages it votes for (shared words vote for each)
+_VOTES: Dict[str, Tuple[str, ...]] = {}
+for _language in SUPPORTED_LANGUAGES:
+    for _word in STOPWORDS[_language]:
+        _VOTES[_word] = _VOTES.get(_word, ()) + (_language,)
+
+_FOREIGN_STOPWORDS = frozenset(
+    word for word, languages in _VOTES.items() if languages != (DEFAULT_LANGUAGE,)
+)
+
+
+def detect_language(normalized_text: str) -> str:
+    """
+    Language code of a normalized message (see SUPPORTED_LANGUAGES).
+
+    A non-English language wins only with at least MIN_VOTES stopword
+    hits and strictly more hits than English; ties go to the earlier
+    language in SUPPORTED_LANGUAGES.
+    """
+    tokens = normalized_text.split(maxsplit=MAX_TOKENS)[:MAX_TOKENS]
+    # Most messages are English: no foreign stopword, nothing to count
+    if _FOREIGN_STOPWORDS.isdisjoint(tokens):
+        return DEFAULT_LANGUAGE
+
+    counts = dict.fromkeys(SUPPORTED_LANGUAGES, 0)
+    for token in tokens:
+        for language in _VOTES.get(token, ()):
+            counts[language] += 1
+
+    best = max(SUPPORTED_LANGUAGES, key=counts.__getitem__)
+    if best == DEFAULT_LANGUAGE or counts[best] < MIN_VOTES or counts[best] <= counts[DEFAULT_LANGUAGE]:
+        return DEFAULT_LANGUAGE
+    return best
@@ -0,0 +1,84 @@
+"""
+LexIQ Labs – Engine Entry Point
+
+Purpose:
+- One import for the whole engine: `import lexiq`
+- Defer every engine module (and `requests`, `yaml`) until first use
+- Load the prompt libraries once, from a snapshot when available
+
+Example:
+    import lexiq
+
+    library = lexiq.get_library()
+    match = lexiq.match_pain_point(
+        customer_message=text,
+        pain_points=library.pain_points_for("support"),
+    )
+"""
+
+import importlib
+from typing import Dict, List, Optional
+
+# public name -> module that defines it
+_EXPORTS: Dict[str, str] = {
+    # Deterministic core
+    "normalize": "pain_point_matcher",
+    "match_pain_point": "pain_point_matcher",
+    "select_god_mode_prompt": "pain_point_matcher",
+    "blend": "blender",
+    "build_response_contract": "response_contract",
+    "apply_voice_constraints": "voice_profile",
+    "SimilarityIndex": "similarity_selector",
+    "compose_fallback": "fallback_composer",
+    # Gemini-assisted (optional)
+    "refine_instruction": "gemini_refiner",
+    "refine_response": "empathy_telemetry",
+    "generate_questions": "question_generator",
+    "simulate_time_travel": "time_travel",
+    "create_voice_profile": "voice_profile",
+    # State
+    "SessionState": "session_state",
+    "AsyncSessionState": "session_state",
+    "ResponseHistory": "response_history",
+    "ThreadContext": "thread_context",
+    # Libraries
+    "PromptLibrary": "prompt_library",
+    "CompactLibrary": "compact_library",
+    "TenantLibraries": "tenant_library",
+}
+
+__all__ = sorted(_EXPORTS) + ["get_library"]
+
+_libraries: Dict[tuple, object] = {}
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'lexiq' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+def get_library(prompts_dir: Optional[str] = None, *, compact: bool = False):
+    """
+    Return the shared PromptLibrary, loading it on first call.
+
+    compact=True returns a CompactLibrary (smaller; for pre-fork pools).
+    """
+    key = (prompts_dir, compact)
+    library = _libraries.get(key)
+    if library is None:
+        if compact:
+            from compact_library import CompactLibrary as library_class
+        else:
+            from prompt_library import PromptLibrary as library_class
+
+        library = _libraries[key] = library_class.load(prompts_dir)
+    return library
@@ -0,0 +1,746 @@
+"""
+LexIQ Labs – Library Index
+
+Purpose:
+- Indexed pain point matching and God Mode selection with the same
+  results as match_pain_point / select_god_mode_prompt
+- Incremental add / update / remove of single entries in microseconds
+- Versioned, lock-free reads: every edit publishes a new immutable
+  snapshot; readers keep whichever snapshot they grabbed
+- Full rebuild only on compaction
+
+Each per-persona index is a compiled base plus a small overlay of edited
+entries (id → entry, or a tombstone). An edit copies the overlay, never
+the base. Once the overlay grows past COMPACT_AFTER entries the base is
+rebuilt from the merged view.
+
+Ordering matches the library lists: an update keeps the entry's
+position, an add goes last. Ties resolve to the earliest entry, exactly
+as the linear matcher does.
+
+fork() gives an independent copy that shares every compiled base
+(per-tenant libraries, see tenant_library): edits to either side go to
+that side's overlay only.
+
+Pain points are indexed once per language: English tags alone, plus one
+index per language with keyword expansions, where each tag is also
+found through its translated variants. Messages are routed by
+language.detect_language().
+
+match_pain_point(..., fuzzy=True) also tolerates typos: the message is
+corrected against a deletion index of every keyword word
+(fuzzy_matcher), built on first use and shared with forks.
+"""
+
+import copy
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fuzzy_matcher import Correction, DeletionIndex, fuzzy_score_match
+from language import DEFAULT_LANGUAGE, detect_language
+from metrics import timed
+from pain_point_matcher import (
+    compile_expansions,
+    normalize,
+    pain_point_tags,
+    score_forms,
+    tag_forms,
+)
+
+# Overlay size that triggers a rebuild of the base
+COMPACT_AFTER = 256
+
+# Term prefix length used to find candidate terms in a message
+_ANCHOR = 3
+
+WILDCARD_TAG = "_wildcard"
+
+
+class _Snapshot:
+    """
+    One published version of an index. Never mutated after creation.
+    """
+
+    __slots__ = ("version", "base", "overlay", "next_order")
+
+    def __init__(self, version: int, base, overlay: Dict[str, Tuple[int, Optional[Dict]]], next_order: int):
+        self.version = version
+        self.base = base
+        self.overlay = overlay  # id -> (order, entry or None for removed)
+        self.next_order = next_order
+
+
+class _EntryIndex:
+    """
+    Snapshot/overlay bookkeeping shared by the pain point and God Mode
+    indexes. Subclasses provide _compile().
+    """
+
+    def __init__(self, entries: Iterable[Dict], lock: Optional[threading.Lock] = None):
+        entries = list(entries)
+        self._lock = lock or threading.Lock()
+        self._snapshot = _Snapshot(
+            0, self._compile(entries, list(range(len(entries)))), {}, len(entries),
+        )
+
+    def _compile(self, entries: List[Dict], orders: List[int]):
+        raise NotImplementedError
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    # -------- Reads --------
+
+    @staticmethod
+    def _live(snapshot: _Snapshot) -> List[Tuple[int, Dict]]:
+        overlay = snapshot.overlay
+        base = snapshot.base
+        live = [
+            (order, entry)
+            for order, entry in zip(base.orders, base.entries)
+            if entry.get("id") not in overlay
+        ]
+        live.extend((order, entry) for order, entry in overlay.values() if entry is not None)
+        live.sort(key=lambda x: x[0])
+        return live
+
+    def entries(self) -> List[Dict]:
+        """Live entries in library order."""
+        return [entry for _, entry in self._live(self._snapshot)]
+
+    def get(self, entry_id: str) -> Optional[Dict]:
+        snapshot = self._snapshot
+        if entry_id in snapshot.overlay:
+            return snapshot.overlay[entry_id][1]
+        slot = snapshot.base.slots.get(entry_id)
+        return None if slot is None else snapshot.base.entries[slot]
+
+    def __len__(self) -> int:
+        return len(self._live(self._snapshot))
+
+    def fork(self, lock: Optional[threading.Lock] = None) -> "_EntryIndex":
+        """
+        Independent index over the current snapshot. Constant time: the
+        compiled base and overlay are immutable and shared, not copied.
+        """
+        clone = copy.copy(self)
+        clone._lock = lock or threading.Lock()
+        return clone
+
+    # -------- Writes --------
+
+    def _order_of(self, snapshot: _Snapshot, entry_id: str) -> Optional[int]:
+        if entry_id in snapshot.overlay:
+            order, entry = snapshot.overlay[entry_id]
+            return order if entry is not None else None
+        slot = snapshot.base.slots.get(entry_id)
+        return None if slot is None else snapshot.base.orders[slot]
+
+    def _publish(self, snapshot: _Snapshot, entry_id: str, value, next_order: int) -> None:
+        overlay = dict(snapshot.overlay)
+        overlay[entry_id] = value
+        self._snapshot = _Snapshot(snapshot.version + 1, snapshot.base, overlay, next_order)
+        if len(overlay) > COMPACT_AFTER:
+            self._compact_locked()
+
+    def upsert(self, entry: Dict) -> int:
+        """
+        Add or replace one entry (matched on id). Returns the new version.
+        """
+        entry_id = entry.get("id")
+        if not entry_id:
+            raise ValueError("entry has no id")
+
+        with self._lock:
+            snapshot = self._snapshot
+            order = self._order_of(snapshot, entry_id)
+            next_order = snapshot.next_order
+            if order is None:
+                order, next_order = next_order, next_order + 1
+            self._publish(snapshot, entry_id, (order, entry), next_order)
+            return self._snapshot.version
+
+    def remove(self, entry_id: str) -> bool:
+        """
+        Remove one entry. Returns False if it did not exist.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            order = self._order_of(snapshot, entry_id)
+            if order is None:
+                return False
+            self._publish(snapshot, entry_id, (order, None), snapshot.next_order)
+            return True
+
+    def compact(self) -> None:
+        """Fold the overlay into a freshly compiled base."""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        snapshot = self._snapshot
+        entries = [entry for _, entry in self._live(snapshot)]
+        self._snapshot = _Snapshot(
+            snapshot.version + 1,
+            self._compile(entries, list(range(len(entries)))),
+            {},
+            len(entries),
+        )
+
+
+# ─────────────────────────────────────────
+# Pain points
+
+class _PainPointBase:
+    __slots__ = (
+        "entries", "orders", "slots", "tag_counts", "postings", "expanded", "anchors", "short_terms",
+        "word_terms",
+    )
+
+    def __init__(self, entries: List[Dict], orders: List[int], expansions: Dict[str, Tuple[str, ...]]):
+        self.entries = tuple(entries)
+        self.orders = tuple(orders)
+        self.slots = {entry.get("id"): slot for slot, entry in enumerate(entries)}
+        self.tag_counts = tuple(len(pain_point_tags(entry)) for entry in entries)
+
+        # term -> ((slot, tag, occurrences), ...); a term is a normalized
+        # tag or one of its variants. Duplicate tags count, as in score_match.
+        postings: Dict[str, List[Tuple[int, str, int]]] = {}
+        expanded = False
+        for slot, entry in enumerate(entries):
+            occurrences: Dict[str, int] = {}
+            for tag in tag_forms(entry):
+                occurrences[tag] = occurrences.get(tag, 0) + 1
+            for tag, count in occurrences.items():
+                variants = expansions.get(tag, ())
+                expanded = expanded or bool(variants)
+                for term in dict.fromkeys((tag,) + variants):
+                    postings.setdefault(term, []).append((slot, tag, count))
+        self.postings = {term: tuple(refs) for term, refs in postings.items()}
+        self.expanded = expanded
+
+        anchors: Dict[str, List[str]] = {}
+        short = []
+        for term in self.postings:
+            if len(term) >= _ANCHOR:
+                anchors.setdefault(term[:_ANCHOR], []).append(term)
+            else:
+                short.append(term)
+        self.anchors = {prefix: tuple(terms) for prefix, terms in anchors.items()}
+        self.short_terms = tuple(short)
+
+        # word -> terms containing it, for fuzzy matching: a typo-corrected
+        # word can only add the terms it belongs to
+        word_terms: Dict[str, List[str]] = {}
+        for term in self.postings:
+            for word in set(term.split()):
+                word_terms.setdefault(word, []).append(term)
+        self.word_terms = {word: tuple(terms) for word, terms in word_terms.items()}
+
+    def terms_in(self, text: str) -> List[str]:
+        """Distinct indexed terms that occur in text as substrings."""
+        found = set()
+        anchors = self.anchors
+        for i in range(len(text) - _ANCHOR + 1):
+            candidates = anchors.get(text[i:i + _ANCHOR])
+            if candidates:
+                for term in candidates:
+                    if term not in found and text.startswith(term, i):
+                        found.add(term)
+        for term in self.short_terms:
+            if term in text:
+                found.add(term)
+        return list(found)
+
+
+class PainPointIndex(_EntryIndex):
+    """
+    Indexed equivalent of match_pain_point over one persona's pain points,
+    optionally with one language's keyword expansions (compile_expansions).
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Dict],
+        lock: Optional[threading.Lock] = None,
+        expansions: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ):
+        self._expansions = expansions or {}
+        super().__init__(entries, lock)
+
+    def _compile(self, entries: List[Dict], orders: List[int]) -> _PainPointBase:
+        return _PainPointBase(entries, orders, self._expansions)
+
+    def match(self, customer_message: str, *, min_score: int = 2) -> Dict:
+        return self.match_normalized(normalize(customer_message), min_score=min_score)
+
+    def match_normalized(
+        self, text: str, *, min_score: int = 2, correction: Optional[Correction] = None,
+    ) -> Dict:
+        """
+        correction: the message corrected by fuzzy_matcher; when it changed
+        anything, keywords found only after correction count too.
+        """
+        if correction is not None and correction.changed:
+            return self._match_fuzzy(text, correction, min_score)
+
+        snapshot = self._snapshot
+        base, overlay = snapshot.base, snapshot.overlay
+
+        scores: Dict[int, int] = {}
+        if base.expanded:
+            # A tag scores once, however many of its variants appear
+            seen = set()
+            for term in base.terms_in(text):
+                for slot, tag, occurrences in base.postings[term]:
+                    if (slot, tag) not in seen:
+                        seen.add((slot, tag))
+                        scores[slot] = scores.get(slot, 0) + occurrences
+        else:
+            for term in base.terms_in(text):
+                for slot, _, occurrences in base.postings[term]:
+                    scores[slot] = scores.get(slot, 0) + occurrences
+
+        # (score, -order) ranks higher score first, then earlier entry
+        best: Optional[Tuple[int, int, Dict, int]] = None
+        for slot, score in scores.items():
+            if score < min_score:
+                continue
+            entry = base.entries[slot]
+            if overlay and entry.get("id") in overlay:
+                continue
+            key = (score, -base.orders[slot])
+            if best is None or key > best[:2]:
+                best = (score, -base.orders[slot], entry, base.tag_counts[slot])
+
+        for order, entry in overlay.values():
+            if entry is None:
+                continue
+            forms = tag_forms(entry)
+            score = score_forms(text, forms, self._expansions)
+            if score < min_score:
+                continue
+            if best is None or (score, -order) > best[:2]:
+                best = (score, -order, entry, len(forms))
+
+        if best is None:
+            return _no_match()
+
+        score, _, entry, tag_count = best
+        return {
+            "matched": True,
+            "pain_point": entry,
+            "confidence": round(min(score / (tag_count or 1), 1.0), 2),
+            "reason": f"Matched on {score} keyword signals."
+        }
+
+    def _match_fuzzy(self, text: str, correction: Correction, min_score: int) -> Dict:
+        """
+        Signals count toward min_score as usual; ranking and confidence
+        use the weighted score, where a corrected keyword weighs less.
+        """
+        snapshot = self._snapshot
+        base, overlay = snapshot.base, snapshot.overlay
+
+        # term -> weight: 1 in the message itself, less if only after
+        # correction (then it contains a corrected word)
+        weights: Dict[str, float] = dict.fromkeys(base.terms_in(text), 1.0)
+        word_terms = base.word_terms
+        for word in correction.corrected_words:
+            for term in word_terms.get(word, ()):
+                if term not in weights:
+                    weight = correction.weight_of(term)
+                    if weight:
+                        weights[term] = weight
+
+        # slot -> tag -> (weight, occurrences); a tag keeps its best variant
+        tags_found: Dict[int, Dict[str, Tuple[float, int]]] = {}
+        for term, weight in weights.items():
+            for slot, tag, occurrences in base.postings[term]:
+                found = tags_found.setdefault(slot, {})
+                if tag not in found or found[tag][0] < weight:
+                    found[tag] = (weight, occurrences)
+
+        best: Optional[Tuple[float, int, Dict, int, int]] = None
+        for slot, found in tags_found.items():
+            signals = sum(occurrences for _, occurrences in found.values())
+            if signals < min_score:
+                continue
+            entry = base.entries[slot]
+            if overlay and entry.get("id") in overlay:
+                continue
+            weighted = sum(weight * occurrences for weight, occurrences in found.values())
+            key = (weighted, -base.orders[slot])
+            if best is None or key > best[:2]:
+                best = (weighted, -base.orders[slot], entry, base.tag_counts[slot], signals)
+
+        for order, entry in overlay.values():
+            if entry is None:
+                continue
+            forms = tag_forms(entry)
+            signals, weighted = fuzzy_score_match(text, correction, forms, self._expansions)
+            if signals < min_score:
+                continue
+            if best is None or (weighted, -order) > best[:2]:
+                best = (weighted, -order, entry, len(forms), signals)
+
+        if best is None:
+            return _no_match()
+
+        weighted, _, entry, tag_count, signals = best
+        return {
+            "matched": True,
+            "pain_point": entry,
+            "confidence": round(min(weighted / (tag_count or 1), 1.0), 2),
+            "reason": f"Matched on {signals} keyword signals ({weighted:.2f} weighted, typo-tolerant).",
+        }
+
+
+def _no_match() -> Dict:
+    return {
+        "matched": False,
+        "pain_point": None,
+        "confidence": 0.0,
+        "reason": "No strong lexical overlap with known pain points."
+    }
+
+
+# ─────────────────────────────────────────
+# God Mode prompts
+
+def _prompt_tags(prompt: Dict) -> List[str]:
+    return prompt.get("pain_point_tags") or []
+
+
+class _GodModeBase:
+    __slots__ = ("entries", "orders", "slots", "postings", "wildcards")
+
+    def __init__(self, entries: List[Dict], orders: List[int]):
+        self.entries = tuple(entries)
+        self.orders = tuple(orders)
+        self.slots = {entry.get("id"): slot for slot, entry in enumerate(entries)}
+
+        postings: Dict[str, List[int]] = {}
+        for slot, entry in enumerate(entries):
+            for tag in set(_prompt_tags(entry)):
+                postings.setdefault(tag, []).append(slot)
+        self.postings = {tag: tuple(slots) for tag, slots in postings.items()}
+        self.wildcards = self.postings.get(WILDCARD_TAG, ())
+
+
+class GodModeIndex(_EntryIndex):
+    """
+    Indexed equivalent of select_god_mode_prompt over one persona's prompts.
+    """
+
+    def _compile(self, entries: List[Dict], orders: List[int]) -> _GodModeBase:
+        return _GodModeBase(entries, orders)
+
+    def _first(self, snapshot: _Snapshot, slots: Iterable[int], overlay_filter) -> Optional[Dict]:
+        base, overlay = snapshot.base, snapshot.overlay
+        best: Optional[Tuple[int, Dict]] = None
+        for slot in slots:  # base slots are in ascending order
+            entry = base.entries[slot]
+            if entry.get("id") not in overlay:
+                best = (base.orders[slot], entry)
+                break
+        for order, entry in overlay.values():
+            if entry is not None and overlay_filter(entry) and (best is None or order < best[0]):
+                best = (order, entry)
+        return best[1] if best else None
+
+    def select(self, pain_point_match: Dict) -> Dict:
+        snapshot = self._snapshot
+        base, overlay = snapshot.base, snapshot.overlay
+
+        if pain_point_match.get("matched"):
+            pain_tags = set(pain_point_tags(pain_point_match["pain_point"]))
+
+            overlaps: Dict[int, int] = {}
+            for tag in pain_tags:
+                for slot in base.postings.get(tag, ()):
+                    overlaps[slot] = overlaps.get(slot, 0) + 1
+
+            best: Optional[Tuple[int, int, Dict]] = None
+            for slot, overlap in overlaps.items():
+                entry = base.entries[slot]
+                if overlay and entry.get("id") in overlay:
+                    continue
+                key = (overlap, -base.orders[slot])
+                if best is None or key > best[:2]:
+                    best = (overlap, -base.orders[slot], entry)
+
+            for order, entry in overlay.values():
+                if entry is None:
+                    continue
+                overlap = len(pain_tags & set(_prompt_tags(entry)))
+                if overlap and (best is None or (overlap, -order) > best[:2]):
+                    best = (overlap, -order, entry)
+
+            if best is not None:
+                return best[2]
+
+        wildcard = self._first(
+            snapshot, base.wildcards, lambda entry: WILDCARD_TAG in _prompt_tags(entry),
+        )
+        if wildcard is not None:
+            return wildcard
+
+        first = self._first(snapshot, range(len(base.entries)), lambda entry: True)
+        return first if first is not None else {}
+
+
+_NO_PAIN_POINTS = PainPointIndex([])
+
+
+class _FuzzyVocabulary:
+    """
+    Deletion index over every word of the indexed keywords. Built on the
+    first fuzzy match; edits add their words once it exists.
+
+    A fork's vocabulary is a layer over its parent's: it holds only the
+    words of the fork's own edits (kept until the layer is built), so
+    they never leak into the parent or its other forks, and go away
+    with the fork.
+    """
+
+    def __init__(
+        self,
+        words: Optional[Callable[[], Iterable[str]]] = None,
+        base: Optional["_FuzzyVocabulary"] = None,
+    ):
+        self._lock = threading.Lock()
+        self._index: Optional[DeletionIndex] = None
+        self._words = words
+        self._base = base
+        self._edited: List[str] = []  # a layer's words, before it is built
+
+    def get(self) -> DeletionIndex:
+        index = self._index
+        if index is None:
+            base = self._base.get() if self._base is not None else None
+            with self._lock:
+                index = self._index
+                if index is None:
+                    words = self._words() if self._words is not None else self._edited
+                    index = self._index = DeletionIndex(words, base=base)
+                    self._edited = []
+        return index
+
+    def add(self, words: Iterable[str]) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.add_all(words)
+            elif self._words is None:
+                self._edited.extend(words)
+
+
+# ─────────────────────────────────────────
+# Library
+
+class LibraryIndex:
+    """
+    Per-persona pain point and God Mode indexes for a whole library.
+
+    Reads never lock. Writers serialize on one lock; each edit touches a
+    single persona (all of its language indexes for pain points).
+    """
+
+    def __init__(
+        self,
+        *,
+        pain_points: Dict[str, List[Dict]],
+        god_mode_prompts: List[Dict],
+        keyword_expansions: Optional[Dict[str, Dict[str, List[str]]]] = None,
+    ):
+        self._lock = threading.Lock()
+
+        self._expansions: Dict[str, Dict[str, Tuple[str, ...]]] = {DEFAULT_LANGUAGE: {}}
+        for language, expansions in (keyword_expansions or {}).items():
+            if language != DEFAULT_LANGUAGE:
+                self._expansions[language] = compile_expansions(expansions)
+
+        # persona -> language -> index
+        self._pain_points: Dict[str, Dict[str, PainPointIndex]] = {
+            persona: self._pain_point_indexes(entries or [])
+            for persona, entries in pain_points.items()
+        }
+
+        by_persona: Dict[str, List[Dict]] = {}
+        for prompt in god_mode_prompts:
+            by_persona.setdefault(prompt.get("persona"), []).append(prompt)
+        self._god_mode: Dict[str, GodModeIndex] = {
+            persona: GodModeIndex(prompts, self._lock)
+            for persona, prompts in by_persona.items()
+        }
+        self._god_mode_persona: Dict[str, str] = {
+            prompt.get("id"): prompt.get("persona") for prompt in god_mode_prompts
+        }
+        self._fuzzy = _FuzzyVocabulary(self._keyword_words)
+
+    @classmethod
+    def from_library(cls, library) -> "LibraryIndex":
+        return cls(
+            pain_points=library.pain_point_sections,
+            god_mode_prompts=list(library.god_mode_prompts),
+            keyword_expansions=getattr(library, "keyword_expansions", None),
+        )
+
+    def _pain_point_indexes(self, entries: List[Dict]) -> Dict[str, PainPointIndex]:
+        return {
+            language: PainPointIndex(entries, self._lock, expansions)
+            for language, expansions in self._expansions.items()
+        }
+
+    @property
+    def languages(self) -> List[str]:
+        return list(self._expansions)
+
+    def fork(self) -> "LibraryIndex":
+        """
+        Copy-on-write copy of the whole library: shares every compiled
+        base with this index, so it costs a few small dicts instead of a
+        rebuild. Later edits on either side stay on that side.
+        """
+        clone = object.__new__(LibraryIndex)
+        clone._lock = threading.Lock()
+        clone._expansions = self._expansions
+        clone._pain_points = {
+            persona: {language: index.fork(clone._lock) for language, index in indexes.items()}
+            for persona, indexes in self._pain_points.items()
+        }
+        clone._god_mode = {
+            persona: index.fork(clone._lock) for persona, index in self._god_mode.items()
+        }
+        clone._god_mode_persona = dict(self._god_mode_persona)
+        clone._fuzzy = _FuzzyVocabulary(base=self._fuzzy)
+        return clone
+
+    def _keyword_words(self) -> Iterator[str]:
+        """Words of every indexed term, once per term and language index."""
+        for indexes in self._pain_points.values():
+            for index in indexes.values():
+                snapshot = index._snapshot
+                for term in snapshot.base.postings:
+                    yield from term.split()
+                for _, entry in snapshot.overlay.values():
+                    if entry is not None:
+                        yield from self._entry_words(entry)
+
+    def _entry_words(self, entry: Dict) -> Iterator[str]:
+        for tag in tag_forms(entry):
+            yield from tag.split()
+            for expansions in self._expansions.values():
+                for variant in expansions.get(tag, ()):
+                    yield from variant.split()
+
+    def fuzzy_index(self) -> DeletionIndex:
+        return self._fuzzy.get()
+
+    # -------- Reads --------
+    #
+    # Same stage names as the linear functions, so dashboards carry over.
+
+    @timed("match_pain_point")
+    def match_pain_point(
+        self,
+        *,
+        customer_message: str,
+        persona: str,
+        min_score: int = 2,
+        language: Optional[str] = None,
+        fuzzy: bool = False,
+    ) -> Dict:
+        """
+        language: route to this language's index; detected when None.
+        Unknown languages fall back to English.
+        fuzzy: also match keywords within edit distance 1-2 (fuzzy_matcher).
+        """
+        text = normalize(customer_message)
+        indexes = self._pain_points.get(persona)
+        if indexes is None:
+            return _NO_PAIN_POINTS.match_normalized(text, min_score=min_score)
+
+        if language is None and len(indexes) > 1:
+            language = detect_language(text)
+        # Not `or`: an index's truth value is its (sorted) length
+        index = indexes.get(language)
+        if index is None:
+            index = indexes[DEFAULT_LANGUAGE]
+        correction = self.fuzzy_index().correct(text) if fuzzy else None
+        return index.match_normalized(text, min_score=min_score, correction=correction)
+
+    @timed("select_god_mode_prompt")
+    def select_god_mode_prompt(self, *, persona: str, pain_point_match: Dict) -> Dict:
+        index = self._god_mode.get(persona)
+        return index.select(pain_point_match) if index is not None else {}
+
+    def pain_points_for(self, persona: str) -> List[Dict]:
+        indexes = self._pain_points.get(persona)
+        return indexes[DEFAULT_LANGUAGE].entries() if indexes is not None else []
+
+    def god_mode_prompts_for(self, persona: str) -> List[Dict]:
+        index = self._god_mode.get(persona)
+        return index.entries() if index is not None else []
+
+    def get_god_mode_prompt(self, prompt_id: str) -> Optional[Dict]:
+        persona = self._god_mode_persona.get(prompt_id)
+        index = self._god_mode.get(persona)
+        return index.get(prompt_id) if index is not None else None
+
+    @property
+    def version(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "pain_points": {p: i[DEFAULT_LANGUAGE].version for p, i in self._pain_points.items()},
+            "god_mode": {p: i.version for p, i in self._god_mode.items()},
+        }
+
+    # -------- Writes --------
+
+    def upsert_pain_point(self, persona: str, entry: Dict) -> int:
+        indexes = self._pain_points.get(persona)
+        if indexes is None:
+            with self._lock:
+                indexes = self._pain_points.setdefault(persona, self._pain_point_indexes([]))
+        # Language indexes are edited in lockstep, so their versions agree
+        versions = [index.upsert(entry) for index in indexes.values()]
+        self._fuzzy.add(self._entry_words(entry))
+        return versions[0]
+
+    def remove_pain_point(self, persona: str, pain_point_id: str) -> bool:
+        indexes = self._pain_points.get(persona)
+        if indexes is None:
+            return False
+        return all([index.remove(pain_point_id) for index in indexes.values()])
+
+    def upsert_god_mode_prompt(self, entry: Dict) -> int:
+        persona = entry.get("persona")
+        if not persona:
+            raise ValueError("God Mode entry has no persona")
+
+        previous = self._god_mode_persona.get(entry.get("id"))
+        if previous is not None and previous != persona:
+            self._god_mode[previous].remove(entry["id"])
+
+        index = self._god_mode.get(persona)
+        if index is None:
+            with self._lock:
+                index = self._god_mode.setdefault(persona, GodModeIndex([], self._lock))
+        version = index.upsert(entry)
+        self._god_mode_persona[entry["id"]] = persona
+        return version
+
+    def remove_god_mode_prompt(self, prompt_id: str) -> bool:
+        persona = self._god_mode_persona.pop(prompt_id, None)
+        index = self._god_mode.get(persona)
+        return index.remove(prompt_id) if index is not None else False
+
+    def compact(self) -> None:
+        indexes = [i for by_language in self._pain_points.values() for i in by_language.values()]
+        for index in indexes + list(self._god_mode.values()):
+            index.compact()
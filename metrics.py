@@ -0,0 +1,253 @@
+"""
+LexIQ Labs – Metrics
+
+Purpose:
+- Time pipeline stages and count outcomes (error / timeout reason codes,
+  constraint rejections)
+- Keep an in-process histogram registry
+- Export as Prometheus text or JSON
+- Near-zero overhead when disabled (a single flag check per call)
+- Stage hook: lets profiling wrap every timed stage, behind the same
+  flag check (see profiling)
+
+Enable with LEXIQ_METRICS=1 or metrics.enable().
+"""
+
+import functools
+import json
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; spans in-process stages (µs) up to slow Gemini calls (s)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0,
+)
+
+STAGE_DURATION = "lexiq_stage_duration_seconds"
+STAGE_CALLS = "lexiq_stage_calls_total"
+GEMINI_REQUESTS = "lexiq_gemini_requests_total"
+CONSTRAINT_REJECTIONS = "lexiq_constraint_rejections_total"
+
+_enabled = os.getenv("LEXIQ_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+# Called as hook(stage, fn, *args, **kwargs) around every stage when set
+_stage_hook: Optional[Callable] = None
+# The one flag timed() checks: metrics enabled or a stage hook set
+_active = _enabled
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation inside its bucket.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # -------- Export --------
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.50),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }
+                for (name, labels), h in self._histograms.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {"histograms": histograms, "counters": counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        typed = set()
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_labels(labels)} {value:g}")
+
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip(h.bounds, h.counts):
+                    cumulative += n
+                    lines.append(
+                        f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}"
+                    )
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in labels
+    )
+    return "{" + inner + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# -------- Switch --------
+
+def enable() -> None:
+    global _enabled, _active
+    _enabled = True
+    _active = True
+
+
+def disable() -> None:
+    global _enabled, _active
+    _enabled = False
+    _active = _stage_hook is not None
+
+
+def set_stage_hook(hook: Optional[Callable]) -> None:
+    """
+    Install (or with None, remove) the hook run around every stage. It
+    must call fn(*args, **kwargs) and return its result.
+    """
+    global _stage_hook, _active
+    _stage_hook = hook
+    _active = _enabled or hook is not None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# -------- Recording helpers (no-ops when disabled) --------
+
+def observe(name: str, value: float, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.observe(name, value, **labels)
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    if _enabled:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def hooked(stage: str, fn: Callable, *args, **kwargs):
+    """
+    fn(*args, **kwargs) through the stage hook, for stages that record
+    their own metrics (Gemini calls).
+    """
+    hook = _stage_hook
+    if hook is None:
+        return fn(*args, **kwargs)
+    return hook(stage, fn, *args, **kwargs)
+
+
+def _record(stage: str, fn: Callable, args: tuple, kwargs: Dict):
+    if not _enabled:
+        return fn(*args, **kwargs)
+
+    start = perf_counter()
+    outcome = "ok"
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        REGISTRY.observe(STAGE_DURATION, perf_counter() - start, stage=stage)
+        REGISTRY.inc(STAGE_CALLS, stage=stage, outcome=outcome)
+
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator recording latency and outcome of a pipeline stage.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return fn(*args, **kwargs)
+
+            hook = _stage_hook
+            if hook is not None:
+                return hook(stage, _record, stage, fn, args, kwargs)
+            return _record(stage, fn, args, kwargs)
+
+        return wrapper
+
+    return decorator
@@ -8,35 +8,160 @@ Role:
 - Operates deterministically
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 import re
+import sys
+import unicodedata
+
+from metrics import timed
+
+# ─────────────────────────────────────────
+# Normalization
+#
+# Compiled once at import. ASCII text (most tickets) takes the fast path;
+# anything else goes through NFKC, case folding and accent folding, so
+# "Reembolso TARDÍO", "reembolso tardio" and "ｒｅｅｍｂｏｌｓｏ tardío"
+# normalize alike. Apostrophes are dropped rather than turned into
+# spaces: "can’t" and "can't" both become "cant".
+#
+# Character fixes use str.replace: on short texts it beats both
+# str.translate and a regex by an order of magnitude, and English text
+# with typographic punctuation drops back onto the ASCII path.
+
+_APOSTROPHES = ("’", "‘", "ʼ", "′", "´", "＇")
+_PUNCTUATION = ("—", "–", "“", "”", "„", "«", "»", "•", "¿", "¡")
+_ASCII_SEPARATORS = re.compile(r"[^a-z0-9\s]")
+_SEPARATORS = re.compile(r"[^\w\s]|_")
+# Combining marks left by NFD: Latin/Greek/Cyrillic accents and friends
+_COMBINING_MARKS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
 
 
 def normalize(text: str) -> str:
-    return re.sub(r"[^a-z0-9\s]", " ", text.lower())
+    if not text.isascii():
+        for apostrophe in _APOSTROPHES:
+            if apostrophe in text:
+                text = text.replace(apostrophe, "")
+        text = unicodedata.normalize("NFKC", text).casefold()
+        for mark in _PUNCTUATION:
+            if mark in text:
+                text = text.replace(mark, " ")
+
+        # Curly quotes, dashes and full-width letters are often all there
+        # was; accents usually are (Latin-script languages)
+        if not text.isascii():
+            text = _COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text))
+            if not text.isascii():
+                # Recompose what is left (Hangul, Indic scripts) so it compares like the input
+                return _SEPARATORS.sub(" ", unicodedata.normalize("NFC", text).replace("'", ""))
+
+    return _ASCII_SEPARATORS.sub(" ", text.lower().replace("'", "").replace("`", ""))
+
+
+# Entry key holding (tags, normalized tags). Libraries fill it when they
+# are loaded, before any worker forks, so the forms are shared
+# copy-on-write instead of being rebuilt in every worker. The tag list is
+# kept to spot copies whose tags were replaced (dict(entry, keywords=...)).
+TAG_FORMS = "_tag_forms"
+
+
+def normalized_tags(tags: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Tags in the form they are searched for in normalized messages.
+    """
+    return tuple(normalize(tag) for tag in tags) if tags else ()
 
 
-def score_match(text: str, tags: List[str]) -> int:
+def compile_tag_forms(tags: Sequence[str]) -> Tuple[Sequence[str], Tuple[str, ...]]:
+    """
+    The TAG_FORMS value for `tags`. A tag already in normal form is
+    reused rather than copied, so the forms add few new objects.
+    """
+    forms = []
+    for tag in tags or ():
+        form = normalize(tag)
+        forms.append(tag if form == tag else sys.intern(form))
+    return tags, tuple(forms)
+
+
+def tag_forms(entry: Dict) -> Tuple[str, ...]:
+    """
+    normalized_tags of an entry's pain point tags: precomputed at load,
+    or computed now for entries that did not come from a library.
+    """
+    tags = pain_point_tags(entry)
+    cached = entry.get(TAG_FORMS)
+    if cached is not None and cached[0] is tags:
+        return cached[1]
+    return normalized_tags(tags)
+
+
+def pain_point_tags(pain_point: Dict) -> List[str]:
+    """
+    Tags of a pain point. Library entries carry them as `keywords`.
+    """
+    return pain_point.get("pain_point_tags") or pain_point.get("keywords") or []
+
+
+def compile_expansions(expansions: Optional[Mapping[str, Sequence[str]]]) -> Dict[str, Tuple[str, ...]]:
+    """
+    One language's keyword expansions ({keyword: [variants]}) with keys
+    and variants normalized, as score_match expects them.
+    """
+    compiled: Dict[str, Tuple[str, ...]] = {}
+    for keyword, variants in (expansions or {}).items():
+        key = normalize(keyword)
+        extra = tuple(v for v in map(normalize, variants or ()) if v.strip())
+        compiled[key] = tuple(dict.fromkeys(compiled.get(key, ()) + extra))
+    return compiled
+
+
+def score_match(text: str, tags: List[str], expansions: Optional[Mapping[str, Sequence[str]]] = None) -> int:
     """
     Simple frequency-based scoring.
     We keep this lightweight on purpose.
+
+    A tag counts once whether it appears itself or through one of its
+    expansions (translated variants).
+    """
+    return score_forms(text, normalized_tags(tags), expansions)
+
+
+def score_forms(text: str, forms: Sequence[str], expansions: Optional[Mapping[str, Sequence[str]]] = None) -> int:
+    """
+    score_match over tags that are already normalized (see tag_forms).
     """
     score = 0
-    for tag in tags:
+    if not expansions:
+        for tag in forms:
+            if tag in text:
+                score += 1
+        return score
+
+    for tag in forms:
         if tag in text:
             score += 1
+        else:
+            for variant in expansions.get(tag, ()):
+                if variant in text:
+                    score += 1
+                    break
     return score
 
 
+@timed("match_pain_point")
 def match_pain_point(
     *,
     customer_message: str,
     pain_points: List[Dict],
-    min_score: int = 2
+    min_score: int = 2,
+    expansions: Optional[Mapping[str, Sequence[str]]] = None
 ) -> Dict:
     """
     Attempts to find a relevant pain point.
 
+    `expansions` are one language's keyword variants, as returned by
+    compile_expansions.
+
     Returns:
     {
         "matched": bool,
@@ -51,8 +176,7 @@ def match_pain_point(
     best_match: Optional[Tuple[Dict, int]] = None
 
     for pain_point in pain_points:
-        tags = pain_point.get("pain_point_tags", [])
-        score = score_match(text, tags)
+        score = score_forms(text, tag_forms(pain_point), expansions)
 
         if score >= min_score:
             if not best_match or score > best_match[1]:
@@ -68,7 +192,7 @@ def match_pain_point(
         }
 
     pain_point, score = best_match
-    confidence = min(score / (len(pain_point.get("pain_point_tags", [])) or 1), 1.0)
+    confidence = min(score / (len(pain_point_tags(pain_point)) or 1), 1.0)
 
     return {
         "matched": True,
@@ -78,6 +202,7 @@ def match_pain_point(
     }
 
 
+@timed("select_god_mode_prompt")
 def select_god_mode_prompt(
     *,
     persona: str,
@@ -100,7 +225,7 @@ def select_god_mode_prompt(
 
     # If pain point matched, try to align tags
     if pain_point_match.get("matched"):
-        pain_tags = set(pain_point_match["pain_point"].get("pain_point_tags", []))
+        pain_tags = set(pain_point_tags(pain_point_match["pain_point"]))
 
         scored = []
         for prompt in candidates:
@@ -0,0 +1,464 @@
+"""
+LexIQ Labs – Profiling
+
+Purpose:
+- Profile individual requests in production without attaching a
+  profiler: every pipeline stage (match_pain_point,
+  select_god_mode_prompt, blend, build_response_contract, tenant_load,
+  ... any metrics.timed stage) and every Gemini call of a captured
+  request runs under the configured capture
+- cProfile capture, written as <request>.pstats (pstats, snakeviz,
+  gprof2dot)
+- Sampling capture: the stage's thread stack every interval, written as
+  <request>.collapsed (flamegraph.pl, speedscope); for slow requests,
+  as a short CPU-bound stage may end before the first sample
+- tracemalloc snapshots around the contract path (CONTRACT_STAGES):
+  <request>.<stage>.<n>.tracemalloc plus the top allocation sites by
+  line in <request>.alloc.txt
+- A request is captured at the sampling rate, or when it asks to
+  ("profile": true) and the operator allows that
+  (LEXIQ_PROFILE_ALLOW_REQUESTS): callers are not trusted to switch on
+  profiling by themselves
+- At most LEXIQ_PROFILE_MAX_CAPTURES captures per process (default
+  100), so profile files can't fill the disk
+
+Zero overhead when disabled: no hook is installed until configure(),
+so stages pay only metrics' own flag check.
+
+Configure with LEXIQ_PROFILE (modes, comma-separated: "cprofile",
+"sample", "tracemalloc"; unset or "off" disables), LEXIQ_PROFILE_RATE
+(share of requests captured, default 0: only requests that ask),
+LEXIQ_PROFILE_DIR (default "profiles"), LEXIQ_PROFILE_INTERVAL
+(sampling period in seconds, default 0.001),
+LEXIQ_PROFILE_ALLOW_REQUESTS ("1" honours "profile": true, default
+off) and LEXIQ_PROFILE_MAX_CAPTURES, or call configure().
+"""
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from time import perf_counter, sleep
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+import contextvars
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import tracemalloc
+import warnings
+
+import metrics
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+TRACEMALLOC = "tracemalloc"
+MODES = (CPROFILE, SAMPLE, TRACEMALLOC)
+
+DEFAULT_DIRECTORY = "profiles"
+DEFAULT_INTERVAL = 0.001
+DEFAULT_MAX_CAPTURES = 100
+
+# Stages whose allocations are snapshotted in tracemalloc mode
+CONTRACT_STAGES = frozenset({"blend", "build_response_contract", "compose_fallback"})
+# Frames kept per allocation trace, allocation sites per stage in the report
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 25
+# Frames kept per sampled stack
+MAX_STACK_DEPTH = 128
+
+PROFILES_WRITTEN = "lexiq_profiles_total"
+PROFILES_SKIPPED = "lexiq_profiles_skipped_total"
+
+_capture: contextvars.ContextVar[Optional["Capture"]] = contextvars.ContextVar(
+    "lexiq_profile_capture", default=None
+)
+# Thread already inside a captured stage: nested stages run under the outer one
+_local = threading.local()
+
+
+# ─────────────────────────────────────────
+# Capture
+
+class Capture:
+    """
+    Profile data of one request, gathered stage by stage (from any
+    thread: Gemini calls run on worker pools) and written by finish().
+    """
+
+    def __init__(self, profiler: "_Profiler", request_id: Optional[str]):
+        self.profiler = profiler
+        self.request_id = request_id or "request"
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._stacks: Counter = Counter()
+        self._allocations: List[Tuple[str, tracemalloc.Snapshot, List]] = []
+        self.stages: List[Tuple[str, float]] = []
+        self._finished = False
+
+    @contextmanager
+    def attached(self) -> Iterator["Capture"]:
+        """Capture the stages run inside the block (and the threads it hands context to)."""
+        token = _capture.set(self)
+        try:
+            yield self
+        finally:
+            _capture.reset(token)
+
+    def run(self, stage: str, fn: Callable, args: tuple, kwargs: Dict):
+        if getattr(_local, "busy", False):
+            return fn(*args, **kwargs)
+
+        modes = self.profiler.modes
+        profile = cProfile.Profile() if CPROFILE in modes else None
+        tracing = TRACEMALLOC in modes and stage in CONTRACT_STAGES
+        thread_id = threading.get_ident()
+
+        _local.busy = True
+        before = _TRACER.begin() if tracing else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:  # another profiler owns this thread (3.12+: the process)
+                profile = None
+        if SAMPLE in modes:
+            _SAMPLER.attach(thread_id, self)
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            if SAMPLE in modes:
+                _SAMPLER.detach(thread_id)
+            after = _TRACER.end() if tracing else None
+            _local.busy = False
+            self._record(stage, elapsed, profile, before, after)
+
+    def _record(
+        self,
+        stage: str,
+        elapsed: float,
+        profile: Optional[cProfile.Profile],
+        before: Optional[tracemalloc.Snapshot],
+        after: Optional[tracemalloc.Snapshot],
+    ) -> None:
+        differences = after.compare_to(before, "lineno")[:TOP_ALLOCATIONS] if after else None
+        with self._lock:
+            self.stages.append((stage, elapsed))
+            if profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            if after is not None:
+                self._allocations.append((stage, after, differences))
+
+    def add_stack(self, stack: str) -> None:
+        with self._lock:
+            self._stacks[stack] += 1
+
+    def finish(self) -> List[str]:
+        """Write the profile files (once). Returns their paths."""
+        with self._lock:
+            if self._finished:
+                return []
+            self._finished = True
+            stats, stacks, allocations = self._stats, self._stacks, self._allocations
+
+        if stats is None and not stacks and not allocations:
+            return []
+
+        directory = self.profiler.directory
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        prefix = os.path.join(directory, f"{stamp}-{_safe(self.request_id)}")
+        paths = []
+
+        if stats is not None:
+            stats.dump_stats(prefix + ".pstats")
+            paths.append(prefix + ".pstats")
+
+        if stacks:
+            with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(prefix + ".collapsed")
+
+        if allocations:
+            with open(prefix + ".alloc.txt", "w", encoding="utf-8") as f:
+                for n, (stage, snapshot, differences) in enumerate(allocations):
+                    path = f"{prefix}.{stage}.{n}.tracemalloc"
+                    snapshot.dump(path)
+                    paths.append(path)
+                    f.write(f"# {stage}: top {len(differences)} allocation sites by size change\n")
+                    for difference in differences:
+                        f.write(f"{difference}\n")
+                    f.write("\n")
+            paths.append(prefix + ".alloc.txt")
+
+        metrics.inc(PROFILES_WRITTEN)
+        return paths
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)[:64]
+
+
+# ─────────────────────────────────────────
+# Sampler
+
+def _collapse(frame) -> str:
+    """Root-first "function (file:line)" frames joined by ";" (collapsed stack format)."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Sampler:
+    """
+    One daemon thread sampling the stacks of threads inside captured
+    stages. It sleeps on an event while there are none.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Capture] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = DEFAULT_INTERVAL
+
+    def attach(self, thread_id: int, capture: Capture) -> None:
+        with self._lock:
+            self._targets[thread_id] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="lexiq-profile-sampler", daemon=True,
+                )
+                self._thread.start()
+            self._wake.set()
+
+    def detach(self, thread_id: int) -> None:
+        with self._lock:
+            self._targets.pop(thread_id, None)
+            if not self._targets:
+                self._wake.clear()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for thread_id, capture in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    capture.add_stack(_collapse(frame))
+            del frames
+            sleep(self.interval)
+
+
+# ─────────────────────────────────────────
+# tracemalloc
+
+class _Tracer:
+    """
+    Shares tracemalloc between concurrent stages: started by the first,
+    stopped by the last (unless something else had started it).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._owned = False
+
+    def begin(self) -> tracemalloc.Snapshot:
+        with self._lock:
+            if self._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._owned = True
+            self._users += 1
+        return _snapshot()
+
+    def end(self) -> tracemalloc.Snapshot:
+        snapshot = _snapshot()
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._owned:
+                tracemalloc.stop()
+                self._owned = False
+        return snapshot
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+
+
+# ─────────────────────────────────────────
+# Configuration
+
+class _Profiler:
+    def __init__(
+        self,
+        modes: FrozenSet[str],
+        rate: float,
+        directory: str,
+        allow_requests: bool,
+        max_captures: int,
+    ):
+        self.modes = modes
+        self.rate = rate
+        self.directory = directory
+        self.allow_requests = allow_requests
+        self._lock = threading.Lock()
+        self._remaining = max_captures
+
+    def take(self) -> bool:
+        """Claim one of the remaining captures."""
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+_PROFILER: Optional[_Profiler] = None
+_SAMPLER = _Sampler()
+_TRACER = _Tracer()
+_NO_CAPTURE = nullcontext()
+
+
+def _hook(stage: str, fn: Callable, *args, **kwargs):
+    capture = _capture.get()
+    if capture is None:
+        return fn(*args, **kwargs)
+    return capture.run(stage, fn, args, kwargs)
+
+
+def configure(
+    *,
+    modes: Tuple[str, ...] = (CPROFILE,),
+    rate: float = 0.0,
+    directory: str = DEFAULT_DIRECTORY,
+    interval: float = DEFAULT_INTERVAL,
+    allow_requests: bool = False,
+    max_captures: int = DEFAULT_MAX_CAPTURES,
+) -> None:
+    """
+    Enable profiling. modes: any of "cprofile", "sample", "tracemalloc";
+    rate: share of requests captured besides those that ask;
+    allow_requests: honour requests that ask (begin(force=True));
+    max_captures: captures taken before profiling stops capturing.
+    """
+    global _PROFILER
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise ValueError(f"unknown profiling mode(s): {', '.join(sorted(unknown))}")
+    if not modes:
+        disable()
+        return
+
+    _SAMPLER.interval = max(interval, 1e-4)
+    _PROFILER = _Profiler(
+        frozenset(modes), min(1.0, max(0.0, rate)), directory, allow_requests, max(0, max_captures),
+    )
+    metrics.set_stage_hook(_hook)
+
+
+def disable() -> None:
+    global _PROFILER
+    _PROFILER = None
+    metrics.set_stage_hook(None)
+
+
+def is_enabled() -> bool:
+    return _PROFILER is not None
+
+
+def _configure_from_env() -> None:
+    modes = tuple(
+        mode.strip().lower() for mode in os.getenv("LEXIQ_PROFILE", "").split(",") if mode.strip()
+    )
+    if not modes or modes == ("off",):
+        return
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        # A typo in the environment must not keep the service from starting
+        warnings.warn(f"LEXIQ_PROFILE: ignoring unknown mode(s) {', '.join(unknown)}")
+        modes = tuple(mode for mode in modes if mode in MODES)
+        if not modes:
+            return
+    try:
+        rate = float(os.getenv("LEXIQ_PROFILE_RATE", "0"))
+        interval = float(os.getenv("LEXIQ_PROFILE_INTERVAL", DEFAULT_INTERVAL))
+    except ValueError:
+        rate, interval = 0.0, DEFAULT_INTERVAL
+    try:
+        max_captures = int(os.getenv("LEXIQ_PROFILE_MAX_CAPTURES", DEFAULT_MAX_CAPTURES))
+    except ValueError:
+        max_captures = DEFAULT_MAX_CAPTURES
+    configure(
+        modes=modes,
+        rate=rate,
+        directory=os.getenv("LEXIQ_PROFILE_DIR", DEFAULT_DIRECTORY),
+        interval=interval,
+        allow_requests=os.getenv("LEXIQ_PROFILE_ALLOW_REQUESTS", "").lower() in ("1", "true", "yes"),
+        max_captures=max_captures,
+    )
+
+
+_configure_from_env()
+
+
+# ─────────────────────────────────────────
+# Requests
+
+def begin(request_id: Optional[str] = None, *, force: bool = False) -> Optional[Capture]:
+    """
+    A capture for this request, or None: profiling is off, the request
+    was not sampled (and did not ask, or asking is not allowed), or the
+    capture limit is used up.
+    """
+    profiler = _PROFILER
+    if profiler is None:
+        return None
+    asked = force and profiler.allow_requests
+    if not asked and not (profiler.rate and random.random() < profiler.rate):
+        return None
+    if not profiler.take():
+        metrics.inc(PROFILES_SKIPPED, reason="limit")
+        return None
+    return Capture(profiler, request_id)
+
+
+def attached(capture: Optional[Capture]):
+    """capture.attached(), or a no-op for None (a request begin() passed over)."""
+    return _NO_CAPTURE if capture is None else capture.attached()
+
+
+@contextmanager
+def _captured(capture: Capture) -> Iterator[Capture]:
+    try:
+        with capture.attached():
+            yield capture
+    finally:
+        capture.finish()
+
+
+def request(request_id: Optional[str] = None, *, force: bool = False):
+    """
+    Context manager around one request: its stages are captured and the
+    files written on exit when begin() selects it. A no-op otherwise.
+    """
+    capture = begin(request_id, force=force)
+    if capture is None:
+        return _NO_CAPTURE
+    return _captured(capture)
@@ -0,0 +1,219 @@
+"""
+LexIQ Labs – Prompt Budget
+
+Purpose:
+- Estimate prompt tokens locally (no tokenizer download, no API call)
+- Compact prompt inputs: quoted reply chains, signatures, JSON whitespace,
+  repeated principles
+- Fit variable-length input (the customer message) into a per-call budget
+- Report tokens saved per call
+
+Compaction only touches the *inputs*. Rules, structure and psychology
+constraints are always sent in full.
+"""
+
+import json
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+
+PROMPT_TOKENS = "lexiq_prompt_tokens_total"
+PROMPT_TOKENS_SAVED = "lexiq_prompt_tokens_saved_total"
+
+# Never squeeze the customer message below this, even when over budget
+MIN_MESSAGE_TOKENS = 64
+
+# Lines that start a quoted reply chain; everything after is history
+_REPLY_HEADER = re.compile(
+    r"^\s*(?:"
+    r"On .{0,200}wrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|-{2,}\s*Forwarded message\s*-{2,}"
+    r"|_{10,}\s*$"
+    r")",
+    re.IGNORECASE,
+)
+# "From: ..." starts a quoted block only when header fields follow it
+_FROM_HEADER = re.compile(r"^\s*From:\s.+", re.IGNORECASE)
+_HEADER_FIELD = re.compile(r"^\s*(?:Sent|To|Cc|Date|Subject):", re.IGNORECASE)
+_HEADER_LOOKAHEAD = 3
+_QUOTED_LINE = re.compile(r"^\s*>")
+_SIGNATURE_DELIMITER = re.compile(r"^--\s*$")
+_MOBILE_FOOTER = re.compile(r"^\s*Sent from my \w+", re.IGNORECASE)
+_SIGN_OFF = re.compile(
+    r"^\s*(?:best|kind|warm)?\s*(?:regards|thanks|thank you|cheers|best|sincerely)[,!.]?\s*$",
+    re.IGNORECASE,
+)
+_BLANK_RUNS = re.compile(r"\n{3,}")
+_WORD = re.compile(r"\S+")
+
+# Sign-offs only count as signatures near the end of the message
+_SIGNATURE_TAIL_LINES = 6
+# A line after a sign-off is signature (name, title, company) unless
+# it reads like a sentence: longer than this, or ending like one
+_SIGNATURE_LINE_WORDS = 5
+_SENTENCE_END = re.compile(r"(?:[?!…]|\.\.\.)\s*$")
+
+# Marks the cut in truncate_middle
+_ELISION = " […] "
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate: max of ~4 characters/token and ~0.75 words/token.
+    Accurate to roughly ±15% for English prose and JSON.
+    """
+    if not text:
+        return 0
+    return int(max(len(text) / 4, len(_WORD.findall(text)) * 4 / 3)) + 1
+
+
+def strip_reply_chain(text: str) -> str:
+    """
+    Keep only the newest message: drop quoted history, signatures and
+    mobile footers.
+    """
+    lines = text.replace("\r\n", "\n").split("\n")
+    kept: List[str] = []
+
+    for n, line in enumerate(lines):
+        if _REPLY_HEADER.match(line) or _SIGNATURE_DELIMITER.match(line):
+            break
+        if _FROM_HEADER.match(line) and any(
+            _HEADER_FIELD.match(following) for following in lines[n + 1:n + 1 + _HEADER_LOOKAHEAD]
+        ):
+            break
+        if _QUOTED_LINE.match(line) or _MOBILE_FOOTER.match(line):
+            continue
+        kept.append(line.rstrip())
+
+    # Trailing sign-off block ("Best regards,\nJane\nHead of Ops"), only
+    # when nothing but signature lines follows it
+    tail_start = max(0, len(kept) - _SIGNATURE_TAIL_LINES)
+    for i in range(len(kept) - 1, tail_start - 1, -1):
+        if _SIGN_OFF.match(kept[i]):
+            if all(_is_signature_line(line) for line in kept[i + 1:]):
+                kept = kept[:i]
+            break
+
+    compact = _BLANK_RUNS.sub("\n\n", "\n".join(kept)).strip()
+    return compact or text.strip()
+
+
+def _is_signature_line(line: str) -> bool:
+    words = line.split()
+    if not words:
+        return True
+    if len(words) > _SIGNATURE_LINE_WORDS or _SENTENCE_END.search(line):
+        return False
+    # "Acme Inc." is a signature; "The export fails." is not
+    return not (line.rstrip().endswith(".") and len(words) >= 3)
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """
+    Fit text into max_tokens keeping the opening and the most recent part.
+
+    Both the word and the character share of the estimate are capped, so
+    text without spaces (a pasted blob, Japanese) is cut by characters.
+    Cuts fall on whitespace where a nearby one exists. The result is
+    never longer than the input.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    keep_words = max(1, int(max_tokens * 0.75) - 2)  # words ≈ 0.75 × tokens
+    keep_chars = max(1, max_tokens * 4 - 2 * len(_ELISION))  # ≈ 4 characters/token
+    head_words = keep_words * 2 // 3
+    tail_words = keep_words - head_words
+
+    spans = [match.span() for match in _WORD.finditer(text)]
+    starts = [start for start, _ in spans]
+
+    head_end = keep_chars * 2 // 3
+    if head_words < len(spans):
+        head_end = min(head_end, spans[head_words][0])
+    tail_start = len(text) - (keep_chars - keep_chars * 2 // 3)
+    if tail_words < len(spans):
+        tail_start = max(tail_start, spans[-tail_words - 1][1])
+
+    # Move a cut that splits a word to that word's edge, unless the word
+    # covers most of the part (one long token): then cut inside it
+    word = bisect_right(starts, head_end) - 1
+    if word >= 0 and spans[word][0] < head_end < spans[word][1] and spans[word][0] > head_end // 2:
+        head_end = spans[word][0]
+    word = bisect_right(starts, tail_start) - 1
+    if word >= 0 and tail_start < spans[word][1] and spans[word][1] - tail_start < (len(text) - tail_start) // 2:
+        tail_start = spans[word][1]
+
+    head = text[:head_end].rstrip()
+    tail = text[max(tail_start, head_end):].lstrip()
+    fitted = f"{head}{_ELISION}{tail}".strip()
+    if len(fitted) >= len(text):
+        return text[:max(1, min(keep_chars, len(text) - 1))]
+    return fitted
+
+
+def minify_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def dedupe(items: Iterable[str]) -> List[str]:
+    """
+    Order-preserving, case- and whitespace-insensitive de-duplication.
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        key = " ".join(str(item).lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def fit_message(
+    message: str,
+    *,
+    fixed_tokens: int,
+    token_budget: Optional[int],
+) -> str:
+    """
+    Fit a customer message so that fixed_tokens + message tokens stays
+    within token_budget. Within budget the message is sent as written;
+    over it, quoted history and signatures go first, then the middle.
+    """
+    if token_budget is None:
+        return message
+
+    available = max(MIN_MESSAGE_TOKENS, token_budget - fixed_tokens)
+    if estimate_tokens(message) <= available:
+        return message
+    return truncate_middle(strip_reply_chain(message), available)
+
+
+def report(
+    *,
+    stage: str,
+    verbose_prompt: str,
+    prompt: str,
+    token_budget: Optional[int],
+) -> Dict:
+    """
+    Build per-call stats and record them as metrics.
+    """
+    before = estimate_tokens(verbose_prompt)
+    after = estimate_tokens(prompt)
+    stats = {
+        "stage": stage,
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": max(0, before - after),
+        "token_budget": token_budget,
+        "within_budget": token_budget is None or after <= token_budget,
+    }
+    metrics.inc(PROMPT_TOKENS, after, stage=stage)
+    metrics.inc(PROMPT_TOKENS_SAVED, stats["tokens_saved"], stage=stage)
+    return stats
@@ -0,0 +1,217 @@
+"""
+LexIQ Labs – Prompt Library
+
+Purpose:
+- Locate and load the God Mode and pain point YAML libraries, plus the
+  optional per-language keyword expansions
+- Resolve paths relative to this package, not the working directory
+- Expose persona-scoped lists in the shape the matcher expects
+- Load from a pre-parsed snapshot when present (no YAML parsing, no PyYAML import)
+
+Usage:
+    python prompt_library.py --snapshot [PROMPTS_DIR]
+"""
+
+import marshal
+import os
+import sys
+from typing import Dict, List, Optional
+
+from pain_point_matcher import TAG_FORMS, compile_tag_forms, pain_point_tags
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+GOD_MODE_FILENAME = "god_mode_prompts.yaml"
+PAIN_POINTS_FILENAME = "pain_points_library.yml"
+KEYWORD_EXPANSIONS_FILENAME = "keyword_expansions.yml"
+
+GOD_MODE_PATH = os.path.join(PROMPTS_DIR, GOD_MODE_FILENAME)
+PAIN_POINTS_PATH = os.path.join(PROMPTS_DIR, PAIN_POINTS_FILENAME)
+KEYWORD_EXPANSIONS_PATH = os.path.join(PROMPTS_DIR, KEYWORD_EXPANSIONS_FILENAME)
+
+SNAPSHOT_FILENAME = "library.snapshot"
+SNAPSHOT_FORMAT = 2
+
+
+def load_yaml(path: str):
+    # Deferred: PyYAML costs ~20 ms to import and snapshots never need it
+    import yaml
+
+    # libyaml is several times faster when available
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=loader)
+
+
+def load_keyword_expansions(prompts_dir: str) -> Dict:
+    """Parsed keyword expansions file, or {} when the library has none."""
+    path = os.path.join(prompts_dir, KEYWORD_EXPANSIONS_FILENAME)
+    return load_yaml(path) if os.path.exists(path) else {}
+
+
+# -------- Snapshots --------
+#
+# A snapshot is the parsed YAML of the libraries, marshalled. marshal is
+# tied to the interpreter version, so the cache tag is part of the header;
+# source sizes and mtimes detect stale snapshots. The optional expansions
+# file is stamped None when absent, so adding it invalidates the snapshot.
+
+def _source_stamps(prompts_dir: str) -> Optional[Dict[str, List[int]]]:
+    stamps = {}
+    for name in (GOD_MODE_FILENAME, PAIN_POINTS_FILENAME):
+        try:
+            st = os.stat(os.path.join(prompts_dir, name))
+        except OSError:
+            return None
+        stamps[name] = [st.st_mtime_ns, st.st_size]
+
+    try:
+        st = os.stat(os.path.join(prompts_dir, KEYWORD_EXPANSIONS_FILENAME))
+        stamps[KEYWORD_EXPANSIONS_FILENAME] = [st.st_mtime_ns, st.st_size]
+    except OSError:
+        stamps[KEYWORD_EXPANSIONS_FILENAME] = None
+    return stamps
+
+
+def save_snapshot(prompts_dir: Optional[str] = None, path: Optional[str] = None) -> str:
+    """
+    Parse the YAML libraries once and write a snapshot next to them.
+    """
+    prompts_dir = prompts_dir or PROMPTS_DIR
+    path = path or os.path.join(prompts_dir, SNAPSHOT_FILENAME)
+
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "cache_tag": sys.implementation.cache_tag,
+        "sources": _source_stamps(prompts_dir),
+        "god_mode": load_yaml(os.path.join(prompts_dir, GOD_MODE_FILENAME)),
+        "pain_points": load_yaml(os.path.join(prompts_dir, PAIN_POINTS_FILENAME)),
+        "keyword_expansions": load_keyword_expansions(prompts_dir),
+    }
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(snapshot, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(prompts_dir: Optional[str] = None, path: Optional[str] = None) -> Optional[Dict]:
+    """
+    Return snapshot data, or None if it is missing, stale or unreadable.
+
+    When the YAML sources are absent (snapshot-only deploys) the snapshot
+    is trusted as-is.
+    """
+    prompts_dir = prompts_dir or PROMPTS_DIR
+    path = path or os.path.join(prompts_dir, SNAPSHOT_FILENAME)
+
+    try:
+        with open(path, "rb") as f:
+            snapshot = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if not isinstance(snapshot, dict):
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if snapshot.get("cache_tag") != sys.implementation.cache_tag:
+        return None
+
+    stamps = _source_stamps(prompts_dir)
+    if stamps is not None and stamps != snapshot.get("sources"):
+        return None
+
+    return snapshot
+
+
+class PromptLibrary:
+    """
+    In-memory view of one God Mode library and one pain point library.
+
+    The raw YAML sections are kept as-is; entries are shared, not copied.
+    keyword_expansions is {language: {keyword: [variants]}}.
+    """
+
+    def __init__(self, *, god_mode: Dict, pain_points: Dict, keyword_expansions: Optional[Dict] = None):
+        self.god_mode_sections: Dict[str, List[Dict]] = god_mode or {}
+        self.pain_point_sections: Dict[str, List[Dict]] = (
+            (pain_points or {}).get("pain_points") or {}
+        )
+
+        self.god_mode_prompts: List[Dict] = [
+            entry
+            for entries in self.god_mode_sections.values()
+            for entry in entries or []
+        ]
+        self._god_mode_by_id: Dict[str, Dict] = {
+            entry.get("id"): entry for entry in self.god_mode_prompts
+        }
+        self.keyword_expansions: Dict[str, Dict[str, List[str]]] = (
+            (keyword_expansions or {}).get("keyword_expansions") or {}
+        )
+
+        # Normalize tags once here, before any worker forks (see tag_forms)
+        for entries in [self.god_mode_prompts, *self.pain_point_sections.values()]:
+            for entry in entries or []:
+                if not isinstance(entry, dict):
+                    continue
+                entry[TAG_FORMS] = compile_tag_forms(pain_point_tags(entry))
+
+    @classmethod
+    def load(
+        cls,
+        prompts_dir: Optional[str] = None,
+        *,
+        use_snapshot: bool = True,
+    ) -> "PromptLibrary":
+        prompts_dir = prompts_dir or PROMPTS_DIR
+
+        if use_snapshot:
+            snapshot = load_snapshot(prompts_dir)
+            if snapshot is not None:
+                return cls(
+                    god_mode=snapshot["god_mode"],
+                    pain_points=snapshot["pain_points"],
+                    keyword_expansions=snapshot["keyword_expansions"],
+                )
+
+        return cls(
+            god_mode=load_yaml(os.path.join(prompts_dir, GOD_MODE_FILENAME)),
+            pain_points=load_yaml(os.path.join(prompts_dir, PAIN_POINTS_FILENAME)),
+            keyword_expansions=load_keyword_expansions(prompts_dir),
+        )
+
+    @property
+    def personas(self) -> List[str]:
+        return list(self.god_mode_sections)
+
+    def pain_points_for(self, persona: str) -> List[Dict]:
+        return self.pain_point_sections.get(persona) or []
+
+    def god_mode_prompts_for(self, persona: str) -> List[Dict]:
+        return [p for p in self.god_mode_prompts if p.get("persona") == persona]
+
+    def get_god_mode_prompt(self, prompt_id: str) -> Optional[Dict]:
+        return self._god_mode_by_id.get(prompt_id)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage LexIQ prompt library snapshots.")
+    parser.add_argument("prompts_dir", nargs="?", default=PROMPTS_DIR)
+    parser.add_argument("--snapshot", action="store_true", help="write a fresh snapshot")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        print(f"Snapshot written: {save_snapshot(args.prompts_dir)}")
+        return 0
+
+    state = "fresh" if load_snapshot(args.prompts_dir) is not None else "missing or stale"
+    print(f"Snapshot {state} for {args.prompts_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
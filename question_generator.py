@@ -9,14 +9,11 @@ Purpose:
 """
 
 import os
-import json
-import requests
+from time import perf_counter
 from typing import List
 
-GEMINI_ENDPOINT = (
-    "https://generativelanguage.googleapis.com/v1beta/models/"
-    "gemini-2.5-flash:generateContent"
-)
+import event_log
+from gemini_client import MISSING_API_KEY, GeminiError, first_candidate_text, generate_content
 
 
 def generate_questions(
@@ -27,6 +24,7 @@ def generate_questions(
 ) -> List[str]:
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
+        event_log.emit("gemini_stage", stage="questions", outcome="error", reason=MISSING_API_KEY)
         return []
 
     prompt = build_prompt(customer_message, persona)
@@ -45,28 +43,28 @@ def generate_questions(
         },
     }
 
+    start = perf_counter()
     try:
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={api_key}",
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload),
+        data = generate_content(
+            stage="questions",
+            payload=payload,
             timeout=timeout,
+            api_key=api_key,
         )
-        response.raise_for_status()
-        data = response.json()
-
-        raw_text = (
-            data["candidates"][0]["content"]["parts"][0]["text"]
-            if data.get("candidates")
-            else ""
+    except GeminiError as e:
+        event_log.emit(
+            "gemini_stage", stage="questions", outcome="error",
+            latency_s=perf_counter() - start, reason=e.reason,
         )
-
-        questions = extract_questions(raw_text)
-        return filter_questions(questions)
-
-    except Exception:
         return []
 
+    questions = filter_questions(extract_questions(first_candidate_text(data)))
+    event_log.emit(
+        "gemini_stage", stage="questions",
+        latency_s=perf_counter() - start, questions=len(questions),
+    )
+    return questions
+
 
 def build_prompt(customer_message: str, persona: str) -> str:
     return f"""
@@ -0,0 +1,286 @@
+"""
+LexIQ Labs – Library Replay (A/B)
+
+Purpose:
+- Replay a JSONL corpus of historical messages through match_pain_point and
+  select_god_mode_prompt under an old and a new prompt library
+- Stream per-message diffs and aggregate shift statistics
+- Shard across a process pool; libraries are loaded once in the parent
+  (compact form) and shared with forked workers copy-on-write
+- Never hold the corpus in memory (bounded in-flight batches)
+
+Corpus lines: {"id": ..., "persona": ..., "customer_message": ...}
+(lines that don't parse, or whose persona/message aren't strings, are
+counted as invalid_lines and skipped)
+
+Usage:
+    python replay.py corpus.jsonl --old prompts_v1/ --new prompts/ \\
+        --out diffs.jsonl --summary summary.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from compact_library import CompactLibrary, freeze_for_fork
+from pain_point_matcher import match_pain_point, select_god_mode_prompt
+
+# (old, new) — populated in the parent before forking, or per worker —
+# and the (old_dir, new_dir) they were loaded from
+_LIBRARIES: Optional[Tuple[CompactLibrary, CompactLibrary]] = None
+_LIBRARY_DIRS: Optional[Tuple[str, str]] = None
+
+TOP_TRANSITIONS = 25
+
+
+def _load_libraries(old_dir: str, new_dir: str) -> None:
+    global _LIBRARIES, _LIBRARY_DIRS
+    dirs = (os.path.abspath(old_dir), os.path.abspath(new_dir))
+    if _LIBRARIES is None or _LIBRARY_DIRS != dirs:
+        _LIBRARIES = (CompactLibrary.load(old_dir), CompactLibrary.load(new_dir))
+        _LIBRARY_DIRS = dirs
+
+
+def _select(library: CompactLibrary, persona: str, message: str) -> Dict:
+    match = match_pain_point(
+        customer_message=message,
+        pain_points=library.pain_points_for(persona),
+    )
+    prompt = select_god_mode_prompt(
+        persona=persona,
+        god_mode_prompts=library.god_mode_prompts,
+        pain_point_match=match,
+    )
+    return {
+        "pain_point_id": (match.get("pain_point") or {}).get("id"),
+        "confidence": match["confidence"],
+        "god_mode_id": prompt.get("id"),
+    }
+
+
+def _new_stats() -> Dict:
+    return {
+        "messages": 0,
+        "invalid": 0,
+        "god_mode_changed": 0,
+        "pain_point_changed": 0,
+        "matched_old": 0,
+        "matched_new": 0,
+        "by_persona": Counter(),
+        "changed_by_persona": Counter(),
+        "selected_old": Counter(),
+        "selected_new": Counter(),
+        "transitions": Counter(),
+    }
+
+
+def replay_batch(batch: Tuple[int, List[bytes]], emit_all: bool = False) -> Tuple[List[str], Dict]:
+    """
+    Replay one batch of raw JSONL lines. Runs inside a worker.
+    """
+    old_library, new_library = _LIBRARIES
+    first_line, lines = batch
+    stats = _new_stats()
+    out: List[str] = []
+
+    for offset, raw in enumerate(lines):
+        try:
+            record = json.loads(raw)
+            persona = record["persona"]
+            message = record["customer_message"]
+        except (ValueError, KeyError, TypeError):
+            stats["invalid"] += 1
+            continue
+        if not (isinstance(persona, str) and persona and isinstance(message, str)):
+            stats["invalid"] += 1
+            continue
+
+        old = _select(old_library, persona, message)
+        new = _select(new_library, persona, message)
+
+        god_mode_changed = old["god_mode_id"] != new["god_mode_id"]
+        pain_point_changed = old["pain_point_id"] != new["pain_point_id"]
+
+        stats["messages"] += 1
+        stats["by_persona"][persona] += 1
+        stats["selected_old"][old["god_mode_id"]] += 1
+        stats["selected_new"][new["god_mode_id"]] += 1
+        stats["matched_old"] += old["pain_point_id"] is not None
+        stats["matched_new"] += new["pain_point_id"] is not None
+
+        if god_mode_changed:
+            stats["god_mode_changed"] += 1
+            stats["changed_by_persona"][persona] += 1
+            stats["transitions"][f"{old['god_mode_id']} -> {new['god_mode_id']}"] += 1
+        if pain_point_changed:
+            stats["pain_point_changed"] += 1
+
+        if emit_all or god_mode_changed or pain_point_changed:
+            out.append(json.dumps({
+                "id": record.get("id", record.get("request_id", first_line + offset)),
+                "persona": persona,
+                "changed": god_mode_changed,
+                "old": old,
+                "new": new,
+            }))
+
+    return out, stats
+
+
+def _merge(total: Dict, part: Dict) -> None:
+    for key, value in part.items():
+        total[key] += value  # ints add, Counters merge
+
+
+def iter_batches(path: str, batch_size: int) -> Iterator[Tuple[int, List[bytes]]]:
+    """
+    Lazily read the corpus as (first_line_number, raw_lines) batches.
+    """
+    with open(path, "rb") as f:
+        batch: List[bytes] = []
+        start = 1
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            if not batch:
+                start = number
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield start, batch
+                batch = []
+        if batch:
+            yield start, batch
+
+
+def _bounded_map(pool, fn, items: Iterator, window: int) -> Iterator:
+    """
+    Ordered map over a process pool with at most `window` batches in flight.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def summarize(stats: Dict) -> Dict:
+    messages = stats["messages"] or 1
+    shift = Counter(stats["selected_new"])
+    shift.subtract(stats["selected_old"])
+    return {
+        "messages": stats["messages"],
+        "invalid_lines": stats["invalid"],
+        "god_mode_changed": stats["god_mode_changed"],
+        "god_mode_changed_rate": round(stats["god_mode_changed"] / messages, 4),
+        "pain_point_changed": stats["pain_point_changed"],
+        "match_rate_old": round(stats["matched_old"] / messages, 4),
+        "match_rate_new": round(stats["matched_new"] / messages, 4),
+        "changed_by_persona": {
+            persona: {
+                "messages": count,
+                "changed": stats["changed_by_persona"][persona],
+            }
+            for persona, count in stats["by_persona"].items()
+        },
+        "selection_shift": {k: v for k, v in shift.most_common() if v},
+        "top_transitions": dict(stats["transitions"].most_common(TOP_TRANSITIONS)),
+    }
+
+
+def _replay_all(batch):
+    return replay_batch(batch, emit_all=True)
+
+
+def replay(
+    corpus_path: str,
+    *,
+    old_dir: str,
+    new_dir: str,
+    out,
+    workers: Optional[int] = None,
+    batch_size: int = 2000,
+    emit_all: bool = False,
+) -> Dict:
+    workers = workers or os.cpu_count() or 1
+    _load_libraries(old_dir, new_dir)
+
+    total = _new_stats()
+    batches = iter_batches(corpus_path, batch_size)
+    run = _replay_all if emit_all else replay_batch
+
+    if workers <= 1:
+        for lines, stats in map(run, batches):
+            _write(out, lines)
+            _merge(total, stats)
+        return summarize(total)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Children inherit the loaded libraries; freezing keeps the GC from
+        # touching (and so copying) those pages after fork.
+        freeze_for_fork()
+        context = multiprocessing.get_context("fork")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_load_libraries, initargs=(old_dir, new_dir),
+        )
+
+    with pool:
+        for lines, stats in _bounded_map(pool, run, batches, window=workers * 2):
+            _write(out, lines)
+            _merge(total, stats)
+
+    return summarize(total)
+
+
+def _write(out, lines: List[str]) -> None:
+    if lines:
+        out.write("\n".join(lines))
+        out.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="A/B replay of prompt libraries.")
+    parser.add_argument("corpus", help="JSONL file of historical messages")
+    parser.add_argument("--old", required=True, help="baseline prompts directory")
+    parser.add_argument("--new", required=True, help="candidate prompts directory")
+    parser.add_argument("--out", help="per-message diffs (JSONL); default stdout")
+    parser.add_argument("--summary", help="write aggregate stats here; default stderr")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--all", action="store_true", help="emit unchanged messages too")
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        summary = replay(
+            args.corpus,
+            old_dir=args.old,
+            new_dir=args.new,
+            out=out,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            emit_all=args.all,
+        )
+    finally:
+        if args.out:
+            out.close()
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,10 @@ Purpose:
 from typing import Dict, List
 from datetime import datetime
 
+from metrics import timed
 
+
+@timed("build_response_contract")
 def build_response_contract(
     *,
     customer_message: str,
@@ -20,7 +23,21 @@ def build_response_contract(
     persona: str,
     god_mode_prompt: Dict,
     voice_profile: Dict | None = None,
+    thread_summary: str | None = None,
 ) -> Dict:
+    """
+    `thread_summary` (see thread_context) stands in for the earlier turns
+    of a conversation; customer_message is only the newest one.
+    """
+    input_context = {
+        "customer_message": customer_message,
+        "empathy_summary": empathy_summary,
+        "clarifications": clarifications or {},
+        "user_intent": user_intent,
+    }
+    if thread_summary:
+        input_context["thread_summary"] = thread_summary
+
     return {
         "meta": {
             "generated_at": datetime.utcnow().isoformat(),
@@ -28,12 +45,7 @@ def build_response_contract(
             "god_mode_id": god_mode_prompt.get("id"),
             "fingerprint_id": god_mode_prompt.get("fingerprint_id"),
         },
-        "input_context": {
-            "customer_message": customer_message,
-            "empathy_summary": empathy_summary,
-            "clarifications": clarifications or {},
-            "user_intent": user_intent,
-        },
+        "input_context": input_context,
         "response_structure": mandatory_structure(),
         "psychology_constraints": {
             "principles": extract_psychology_principles(god_mode_prompt)
@@ -5,16 +5,31 @@ Purpose:
 - Store and retrieve past responses within a session
 - Support collapsible UI history (customer input + final response only)
 - Lightweight, in-memory by default
+- Offer near-duplicate past responses as instant drafts
+- Safe to share between threads: writes take a lock, list() hands out
+  an immutable snapshot
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+import threading
 import uuid
 
+from response_retrieval import DEFAULT_THRESHOLD, ResponseIndex
+
 
 class ResponseHistory:
-    def __init__(self):
-        self._history: List[Dict] = []
+    """
+    Entries are never modified once added; treat them as read-only.
+    `lock` lets an owner (SessionState) guard the history with its own
+    lock; it must be reentrant if the owner holds it while calling in.
+    """
+
+    def __init__(self, lock: Optional[threading.Lock] = None):
+        self._lock = lock or threading.Lock()
+        self._history: List[Dict] = []  # oldest first
+        self._snapshot: Optional[Tuple[Dict, ...]] = ()
+        self._index = ResponseIndex()
 
     def add(
         self,
@@ -22,32 +37,73 @@ class ResponseHistory:
         customer_message: str,
         final_response: str,
         persona: str,
+        god_mode_id: Optional[str] = None,
     ) -> Dict:
         entry = {
             "id": str(uuid.uuid4()),
             "created_at": datetime.utcnow().isoformat(),
             "persona": persona,
+            "god_mode_id": god_mode_id,
             "customer_message": customer_message.strip(),
             "final_response": final_response.strip(),
             "title": self._generate_title(customer_message),
         }
-        self._history.insert(0, entry)  # newest first
+        with self._lock:
+            self._history.append(entry)
+            self._index.add(entry)
+            self._snapshot = None
         return entry
 
-    def list(self) -> List[Dict]:
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def list(self) -> Tuple[Dict, ...]:
         """
-        Return all history entries (newest first).
+        Return all history entries (newest first), as a snapshot: later
+        writes do not change it.
         """
-        return self._history
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = tuple(reversed(self._history))
+        return snapshot
 
     def get(self, entry_id: str) -> Dict | None:
-        for entry in self._history:
+        for entry in self.list():
             if entry["id"] == entry_id:
                 return entry
         return None
 
+    def find_similar(
+        self,
+        *,
+        customer_message: str,
+        persona: str,
+        god_mode_id: Optional[str],
+        threshold: float = DEFAULT_THRESHOLD,
+        limit: int = 3,
+    ) -> List[Dict]:
+        """
+        Return past responses to near-duplicate messages (best first),
+        for use as instant drafts ahead of Gemini refinement.
+        """
+        # Signatures and entries are appended in two steps: read under the lock
+        with self._lock:
+            return self._index.find_similar(
+                customer_message=customer_message,
+                persona=persona,
+                god_mode_id=god_mode_id,
+                threshold=threshold,
+                limit=limit,
+            )
+
     def clear(self) -> None:
-        self._history.clear()
+        with self._lock:
+            self._history = []
+            self._index.clear()
+            self._snapshot = ()
 
     def _generate_title(self, customer_message: str) -> str:
         """
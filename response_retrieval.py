@@ -0,0 +1,148 @@
+"""
+LexIQ Labs – Response Retrieval
+
+Purpose:
+- Find previously accepted responses to near-duplicate customer messages
+- Offer them as instant drafts before running contract → Gemini refinement
+- Scope matches to the same persona and God Mode prompt
+- Stay incremental and memory-compact (64-bit SimHash signatures in arrays)
+"""
+
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+from pain_point_matcher import normalize
+
+SIGNATURE_BITS = 64
+DEFAULT_THRESHOLD = 0.9
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    """
+    Stable 64-bit hash for a shingle.
+    (Python's built-in hash() is salted per process.)
+    """
+    return int.from_bytes(
+        blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def _features(text: str) -> List[str]:
+    tokens = normalize(text).split()
+    bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return tokens + bigrams
+
+
+def simhash(text: str) -> int:
+    """
+    Compute a 64-bit SimHash of the normalized message.
+
+    Near-duplicate messages produce signatures that differ in few bits.
+    """
+    weights = [0] * SIGNATURE_BITS
+
+    for feature in _features(text):
+        h = _feature_hash(feature)
+        for bit in range(SIGNATURE_BITS):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    signature = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            signature |= 1 << bit
+
+    return signature
+
+
+def similarity(a: int, b: int) -> float:
+    """
+    Fraction of matching signature bits (1.0 = identical).
+    """
+    return 1.0 - (a ^ b).bit_count() / SIGNATURE_BITS
+
+
+class _Bucket:
+    __slots__ = ("signatures", "entries")
+
+    def __init__(self):
+        self.signatures = array("Q")
+        self.entries: List[Dict] = []
+
+
+class ResponseIndex:
+    """
+    Incremental SimHash index of accepted responses.
+
+    Entries are bucketed by (persona, god_mode_id) so lookups only
+    compare signatures that could legitimately be reused.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, Optional[str]], _Bucket] = {}
+
+    def __len__(self) -> int:
+        return sum(len(b.entries) for b in self._buckets.values())
+
+    def add(self, entry: Dict) -> None:
+        """
+        Index a history entry (as produced by ResponseHistory.add).
+        """
+        key = (entry.get("persona"), entry.get("god_mode_id"))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+
+        bucket.signatures.append(simhash(entry["customer_message"]))
+        bucket.entries.append(entry)
+
+    def find_similar(
+        self,
+        *,
+        customer_message: str,
+        persona: str,
+        god_mode_id: Optional[str],
+        threshold: float = DEFAULT_THRESHOLD,
+        limit: int = 3,
+    ) -> List[Dict]:
+        """
+        Return prior responses whose customer message is near-identical.
+
+        Returns (best first):
+        [
+            {
+                "entry": Dict,
+                "similarity": float
+            }
+        ]
+        """
+        bucket = self._buckets.get((persona, god_mode_id))
+        if bucket is None:
+            return []
+
+        query = simhash(customer_message)
+
+        scored = []
+        for position, signature in enumerate(bucket.signatures):
+            score = similarity(query, signature)
+            if score >= threshold:
+                scored.append((score, position))
+
+        # Newest entries are appended last; prefer them on ties
+        scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+
+        return [
+            {
+                "entry": bucket.entries[position],
+                "similarity": round(score, 3),
+            }
+            for score, position in scored[:limit]
+        ]
+
+    def clear(self) -> None:
+        self._buckets.clear()
@@ -0,0 +1,632 @@
+"""
+LexIQ Labs – HTTP Service
+
+Purpose:
+- Expose the engine over HTTP without a framework (asyncio, stdlib only)
+- Share one PromptLibrary, one pooled Gemini client and one session store
+- Run deterministic stages inline; run Gemini calls on a bounded worker pool
+- Apply backpressure: a bounded number of pending requests, 429 beyond it
+- Select God Mode prompts by tag overlap (default) or example-text
+  similarity (--selector similarity, needs NumPy)
+- Serve tenant overlays (prompts/tenants/<tenant>.yml) on top of the
+  shared library: /match, /contract and /refine accept "tenant"
+- Carry multi-turn conversations: with session_id and thread_id, the
+  stages get the thread's rolling summary and cumulative match state
+  (thread_context), and callers send only the newest message
+- Tag each request's events (event_log) with a request id: the body's
+  "request_id" when given, else a new one
+- Tolerate typos in pain point keywords (--fuzzy, or "fuzzy" per
+  request; see fuzzy_matcher)
+- Profile single requests on demand: with LEXIQ_PROFILE set, requests
+  in the LEXIQ_PROFILE_RATE sample (and bodies with "profile": true,
+  when LEXIQ_PROFILE_ALLOW_REQUESTS is on) write their stage profiles
+  to LEXIQ_PROFILE_DIR (see profiling)
+
+Routes:
+    GET  /health
+    GET  /metrics                 Prometheus text
+    POST /sessions                {persona}
+    POST /sessions/responses      {session_id, customer_message, final_response, god_mode_id?, thread_id?}
+    POST /match                   {customer_message, persona, language?, fuzzy?, session_id?, thread_id?}
+    POST /contract                {customer_message, persona, user_intent, ...}
+    POST /refine                  {customer_message, persona, user_intent, candidates?, tone_mode?, ...}
+    POST /questions               {customer_message, persona}
+    POST /time-travel             {customer_message, drafted_response, persona}
+    POST /library/upsert          {kind: pain_point|god_mode, entry, persona?}  (shared library)
+    POST /library/remove          {kind: pain_point|god_mode, id, persona?}
+
+Usage:
+    python server.py --port 8080 --concurrency 32 --queue 128
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable, Dict, Optional, Tuple
+
+import empathy_telemetry
+import event_log
+import gemini_client
+import gemini_refiner
+import metrics
+import profiling
+from fallback_composer import compose_fallback
+from library_index import LibraryIndex
+from prompt_library import PromptLibrary
+from question_generator import generate_questions
+from response_contract import build_response_contract
+from session_state import AsyncSessionState, SessionState
+from similarity_selector import SimilarityIndex
+from tenant_library import TENANT_VIOLATION, TenantLibraries, TenantLibrary, TenantNotFound
+from thread_context import ThreadContext
+from time_travel import simulate_time_travel
+
+MAX_BODY_BYTES = 1 << 20
+HEADER_TIMEOUT = 10.0
+MAX_CANDIDATES = 8
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SessionStore:
+    """
+    In-memory session registry shared by all requests.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+
+    def create(self, persona: Optional[str] = None) -> SessionState:
+        session = SessionState()
+        if persona:
+            session.set_persona(persona)
+        with self._lock:
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: Optional[str]) -> Optional[SessionState]:
+        if not session_id:
+            return None
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def _require(body: Dict, *fields: str) -> None:
+    missing = [f for f in fields if not body.get(f)]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"missing field(s): {', '.join(missing)}")
+
+
+def _candidate_count(value) -> int:
+    """Requested candidates, clamped to MAX_CANDIDATES; 1 when absent."""
+    if value is None:
+        return 1
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "candidates must be a positive integer")
+    try:
+        count = int(value)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "candidates must be a positive integer")
+    if count < 1:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "candidates must be a positive integer")
+    return min(count, MAX_CANDIDATES)
+
+
+class EngineService:
+    def __init__(
+        self,
+        *,
+        library: Optional[PromptLibrary] = None,
+        concurrency: int = 32,
+        queue_size: int = 128,
+        gemini_workers: Optional[int] = None,
+        selector: str = "tags",
+        tenants_dir: Optional[str] = None,
+        fuzzy: bool = False,
+    ):
+        self.library = library or PromptLibrary.load()
+        self.index = LibraryIndex.from_library(self.library)
+
+        # Typo-tolerant matching by default; the deletion index is built now,
+        # not on the first request
+        self.fuzzy = fuzzy
+        if fuzzy:
+            self.index.fuzzy_index()
+
+        # God Mode selection: "tags" (pain point tag overlap) or "similarity"
+        if selector not in ("tags", "similarity"):
+            raise ValueError(f"unknown selector: {selector}")
+        self.similarity = (
+            SimilarityIndex.from_library(self.library) if selector == "similarity" else None
+        )
+        if self.similarity is not None and not self.similarity.available:
+            # Still serves, but every selection takes the tag path
+            warnings.warn("selector 'similarity' needs NumPy, which is not installed; selecting by tags")
+
+        # Tenants fork self.index on first use; nothing loads up front
+        self.tenants = TenantLibraries(self.index, tenants_dir=tenants_dir)
+        self.sessions = SessionStore()
+
+        # Admission control: `concurrency` requests run, `queue_size` wait,
+        # everything beyond that is rejected with 429.
+        self.concurrency = concurrency
+        self.max_pending = concurrency + queue_size
+        self._pending = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        workers = gemini_workers or gemini_client.GEMINI_POOL_SIZE
+        self._gemini_pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="gemini",
+        )
+
+        self._routes: Dict[Tuple[str, str], Callable] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/sessions"): self.create_session,
+            ("POST", "/sessions/responses"): self.add_session_response,
+            ("POST", "/match"): self.match,
+            ("POST", "/contract"): self.contract,
+            ("POST", "/refine"): self.refine,
+            ("POST", "/questions"): self.questions,
+            ("POST", "/time-travel"): self.time_travel,
+            ("POST", "/library/upsert"): self.library_upsert,
+            ("POST", "/library/remove"): self.library_remove,
+        }
+
+    # -------- Engine stages --------
+
+    async def _tenant(self, body: Dict) -> Optional[TenantLibrary]:
+        tenant_id = body.get("tenant")
+        if tenant_id is None:
+            return None
+        try:
+            # A first use parses and applies the overlay: not on the event loop
+            return await self._in_executor(self.tenants.get, tenant_id)
+        except TenantNotFound:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown tenant: {tenant_id}")
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f"invalid overlay for tenant {tenant_id}: {e}")
+
+    def _thread(self, body: Dict) -> Optional[ThreadContext]:
+        thread_id = body.get("thread_id")
+        if thread_id is None:
+            return None
+        if not isinstance(thread_id, str) or not thread_id:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "thread_id must be a non-empty string")
+        session = self.sessions.get(body.get("session_id"))
+        if session is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "thread_id requires a valid session_id")
+        return session.get_thread(thread_id)
+
+    async def _select(self, body: Dict) -> Tuple[Dict, Dict]:
+        persona = body["persona"]
+        language = body.get("language")
+        fuzzy = body.get("fuzzy", self.fuzzy)
+        tenant = await self._tenant(body)
+        index = tenant.index if tenant is not None else self.index
+        match = index.match_pain_point(
+            customer_message=body["customer_message"],
+            persona=persona,
+            language=language if isinstance(language, str) else None,
+            fuzzy=fuzzy is True,
+        )
+        # Only the new message is matched; earlier turns count through the thread
+        thread = self._thread(body)
+        if thread is not None:
+            thread.add_customer_turn(body["customer_message"], match=match)
+            match = thread.effective_match(match)
+        if self.similarity is not None:
+            god_mode_prompt = self.similarity.select(
+                customer_message=body["customer_message"],
+                persona=persona,
+                pain_point_match=match,
+                index=index,
+            )
+            # Vectors cover the shared library: take the tenant's version
+            if tenant is not None:
+                god_mode_prompt = index.get_god_mode_prompt(god_mode_prompt.get("id")) or (
+                    index.select_god_mode_prompt(persona=persona, pain_point_match=match)
+                )
+        else:
+            god_mode_prompt = index.select_god_mode_prompt(
+                persona=persona,
+                pain_point_match=match,
+            )
+        return match, god_mode_prompt
+
+    def _refresh_similarity(self, *personas: Optional[str]) -> None:
+        if self.similarity is None:
+            return
+        for persona in set(personas):
+            if persona:
+                self.similarity.rebuild(persona, self.index.god_mode_prompts_for(persona))
+
+    def _build_contract(self, body: Dict, god_mode_prompt: Dict) -> Dict:
+        session = self.sessions.get(body.get("session_id"))
+        voice = body.get("voice_profile") or (session.get_voice_profile() if session else None)
+        thread = self._thread(body)
+        return build_response_contract(
+            customer_message=body["customer_message"],
+            empathy_summary=body.get("empathy_summary", ""),
+            clarifications=body.get("clarifications") or {},
+            user_intent=body.get("user_intent", ""),
+            persona=body["persona"],
+            god_mode_prompt=god_mode_prompt,
+            voice_profile=voice,
+            # _select recorded the turn; the context is the thread before it
+            thread_summary=thread.context_summary() if thread else None,
+        )
+
+    async def _in_gemini_pool(self, fn: Callable, *args, **kwargs):
+        return await self._in_executor(fn, *args, executor=self._gemini_pool, **kwargs)
+
+    async def _in_executor(self, fn: Callable, *args, executor=None, **kwargs):
+        """fn on `executor` (default: the loop's), with this request's context."""
+        loop = asyncio.get_running_loop()
+        # Executors do not carry context variables (request id) on their own
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, lambda: context.run(fn, *args, **kwargs))
+
+    # -------- Handlers --------
+
+    async def health(self, body: Dict) -> Dict:
+        return {
+            "status": "ok",
+            "pending": self._pending,
+            "sessions": len(self.sessions),
+            "tenants": len(self.tenants),
+        }
+
+    async def metrics(self, body: Dict) -> str:
+        return metrics.REGISTRY.to_prometheus()
+
+    async def create_session(self, body: Dict) -> Dict:
+        session = self.sessions.create(body.get("persona"))
+        return {"session_id": session.session_id, "persona": session.get_persona()}
+
+    async def add_session_response(self, body: Dict) -> Dict:
+        _require(body, "session_id", "customer_message", "final_response")
+        session = self.sessions.get(body["session_id"])
+        if session is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown session: {body['session_id']}")
+        self._thread(body)
+        try:
+            entry = await AsyncSessionState(session).add_response(
+                customer_message=body["customer_message"],
+                final_response=body["final_response"],
+                god_mode_id=body.get("god_mode_id"),
+                thread_id=body.get("thread_id"),
+            )
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return {"id": entry["id"], "title": entry.get("title")}
+
+    async def match(self, body: Dict) -> Dict:
+        _require(body, "customer_message", "persona")
+        match, god_mode_prompt = await self._select(body)
+        pain_point = match.get("pain_point") or {}
+        result = {
+            "matched": match["matched"],
+            "confidence": match["confidence"],
+            "reason": match["reason"],
+            "pain_point_id": pain_point.get("id"),
+            "god_mode_id": god_mode_prompt.get("id"),
+            "fingerprint_id": god_mode_prompt.get("fingerprint_id"),
+        }
+        thread = self._thread(body)
+        if thread is not None:
+            result["thread"] = thread.state()
+        return result
+
+    async def contract(self, body: Dict) -> Dict:
+        _require(body, "customer_message", "persona")
+        _, god_mode_prompt = await self._select(body)
+        return self._build_contract(body, god_mode_prompt)
+
+    async def refine(self, body: Dict) -> Dict:
+        _require(body, "customer_message", "persona")
+        _, god_mode_prompt = await self._select(body)
+
+        session = self.sessions.get(body.get("session_id"))
+        if session is not None and session.get_persona() == body["persona"]:
+            similar = await AsyncSessionState(session).find_similar_responses(
+                customer_message=body["customer_message"],
+                god_mode_id=god_mode_prompt.get("id"),
+            )
+            if similar:
+                return {
+                    "response": similar[0]["entry"]["final_response"],
+                    "source": "history",
+                    "similarity": similar[0]["similarity"],
+                    "god_mode_id": god_mode_prompt.get("id"),
+                }
+
+        contract = self._build_contract(body, god_mode_prompt)
+        instruction = empathy_telemetry.build_prompt(contract)
+
+        candidates = _candidate_count(body.get("candidates"))
+        if candidates > 1:
+            refined = await self._in_gemini_pool(
+                gemini_refiner.refine_instruction_best,
+                instruction,
+                candidate_count=candidates,
+                response_contract=contract,
+            )
+        else:
+            refined = await self._in_gemini_pool(gemini_refiner.refine_instruction, instruction)
+
+        tenant = await self._tenant(body)
+        if refined and tenant is not None and tenant.constraint_violation(refined):
+            metrics.inc(metrics.CONSTRAINT_REJECTIONS, reason=TENANT_VIOLATION)
+            refined = None
+
+        if refined:
+            return {
+                "response": refined,
+                "source": "gemini",
+                "god_mode_id": god_mode_prompt.get("id"),
+            }
+
+        # Gemini down, slow or off-contract: answer locally instead of empty
+        tone_mode = body.get("tone_mode")
+        if not isinstance(tone_mode, str):
+            tone_mode = session.get_settings().get("tone_mode") if session is not None else "auto"
+        return {
+            "response": compose_fallback(
+                response_contract=contract,
+                god_mode_prompt=god_mode_prompt,
+                tone_mode=tone_mode,
+                forbidden_phrases=tenant.forbidden_phrases if tenant is not None else (),
+            ),
+            "source": "fallback",
+            "god_mode_id": god_mode_prompt.get("id"),
+        }
+
+    async def questions(self, body: Dict) -> Dict:
+        _require(body, "customer_message", "persona")
+        questions = await self._in_gemini_pool(
+            generate_questions,
+            customer_message=body["customer_message"],
+            persona=body["persona"],
+        )
+        return {"questions": questions}
+
+    async def time_travel(self, body: Dict) -> Dict:
+        _require(body, "customer_message", "drafted_response", "persona")
+        simulation = await self._in_gemini_pool(
+            simulate_time_travel,
+            customer_message=body["customer_message"],
+            drafted_response=body["drafted_response"],
+            persona=body["persona"],
+        )
+        return {"simulation": simulation}
+
+    async def library_upsert(self, body: Dict) -> Dict:
+        _require(body, "kind", "entry")
+        entry = body["entry"]
+        if not isinstance(entry, dict) or not entry.get("id"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "entry must be an object with an id")
+
+        try:
+            if body["kind"] == "pain_point":
+                _require(body, "persona")
+                version = self.index.upsert_pain_point(body["persona"], entry)
+            elif body["kind"] == "god_mode":
+                previous = self.index.get_god_mode_prompt(entry["id"]) or {}
+                version = self.index.upsert_god_mode_prompt(entry)
+                self._refresh_similarity(previous.get("persona"), entry.get("persona"))
+            else:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown kind: {body['kind']}")
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+        # Tenants forked the old base; they re-fork on next use
+        self.tenants.invalidate()
+        return {"id": entry["id"], "version": version}
+
+    async def library_remove(self, body: Dict) -> Dict:
+        _require(body, "kind", "id")
+        if body["kind"] == "pain_point":
+            _require(body, "persona")
+            removed = self.index.remove_pain_point(body["persona"], body["id"])
+        elif body["kind"] == "god_mode":
+            previous = self.index.get_god_mode_prompt(body["id"]) or {}
+            removed = self.index.remove_god_mode_prompt(body["id"])
+            self._refresh_similarity(previous.get("persona"))
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown kind: {body['kind']}")
+
+        if not removed:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no such entry: {body['id']}")
+        self.tenants.invalidate()
+        return {"id": body["id"], "removed": True}
+
+    # -------- HTTP plumbing --------
+
+    async def dispatch(self, method: str, path: str, raw_body: bytes) -> Tuple[int, object]:
+        handler = self._routes.get((method, path.split("?", 1)[0]))
+        if handler is None:
+            known = any(p == path for _, p in self._routes)
+            raise HTTPError(
+                HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND,
+                "method not allowed" if known else "not found",
+            )
+
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid JSON body")
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+
+        if self._pending >= self.max_pending:
+            metrics.inc("lexiq_http_rejected_total", route=path)
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, "server overloaded, retry later")
+
+        request_id = body.get("request_id")
+        self._pending += 1
+        try:
+            async with self._slots:
+                with event_log.request_context(
+                    request_id if isinstance(request_id, str) else None
+                ) as request_id:
+                    capture = profiling.begin(request_id, force=body.get("profile") is True)
+                    try:
+                        with profiling.attached(capture):
+                            return HTTPStatus.OK, await self._handle(handler, path, body)
+                    finally:
+                        if capture is not None:
+                            # Writes the pstats / tracemalloc dumps: file I/O, not on the loop
+                            await self._in_executor(capture.finish)
+        finally:
+            self._pending -= 1
+
+    async def _handle(self, handler: Callable, path: str, body: Dict):
+        try:
+            return await handler(body)
+        except HTTPError:
+            raise
+        except Exception as e:
+            # Answered as a bare 500: keep what happened, under the request id
+            metrics.inc("lexiq_http_errors_total", route=path)
+            event_log.emit(
+                "http_request", stage=path, outcome="error", reason="internal_error",
+                detail=f"{type(e).__name__}: {e}",
+            )
+            raise
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT
+                    )
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._write(writer, HTTPStatus.BAD_REQUEST, {"error": "bad request line"}, False)
+                    return
+
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._write(writer, HTTPStatus.BAD_REQUEST,
+                                      {"error": "invalid Content-Length"}, False)
+                    return
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                      {"error": "body too large"}, False)
+                    return
+                raw_body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self.dispatch(method, path, raw_body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}
+
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status: int, payload, keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+
+        head = [
+            f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            head.append("Retry-After: 1")
+
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self) -> None:
+        self._gemini_pool.shutdown(wait=False)
+
+
+async def serve(host: str, port: int, **options) -> None:
+    service = EngineService(**options)
+    server = await service.start(host, port)
+    print(f"LexIQ engine listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LexIQ engine HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue", type=int, default=128)
+    parser.add_argument("--gemini-workers", type=int, default=None)
+    parser.add_argument("--selector", choices=("tags", "similarity"), default="tags",
+                        help="God Mode selection (similarity needs NumPy)")
+    parser.add_argument("--tenants-dir", default=None, help="tenant overlays (default: prompts/tenants)")
+    parser.add_argument("--fuzzy", action="store_true", help="typo-tolerant pain point matching by default")
+    args = parser.parse_args()
+
+    asyncio.run(serve(
+        args.host, args.port,
+        concurrency=args.concurrency,
+        queue_size=args.queue,
+        gemini_workers=args.gemini_workers,
+        selector=args.selector,
+        tenants_dir=args.tenants_dir,
+        fuzzy=args.fuzzy,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,38 +4,63 @@ LexIQ Labs – Session State
 Purpose:
 - Maintain per-session context
 - Store persona, voice profile, settings, and response history
+- Keep conversation threads (thread_context.ThreadContext), most
+  recently used last, at most MAX_THREADS per session
 - Lightweight, in-memory implementation (backend-agnostic)
+- Safe under concurrent requests: writes take the session's lock and
+  publish new immutable values; reads take no lock and return
+  snapshots that later writes leave untouched
+- AsyncSessionState: the same session for asyncio code, never
+  blocking the event loop on a lock a worker thread holds
 """
 
-from typing import Dict, Optional
+from collections import OrderedDict
+from functools import partial
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
 from datetime import datetime
+import asyncio
+import threading
 import uuid
 
 from response_history import ResponseHistory
+from response_retrieval import DEFAULT_THRESHOLD
+from thread_context import ThreadContext
+
+MAX_THREADS = 64
 
 
 class SessionState:
+    """
+    One reentrant lock per session guards every write, including the
+    response history's and the threads' (they share it), so an
+    operation such as add_response is recorded whole or not at all.
+    """
+
     def __init__(self):
         self.session_id: str = str(uuid.uuid4())
         self.created_at: str = datetime.utcnow().isoformat()
+        self._lock = threading.RLock()
 
         # Session-level selections
         self.persona: Optional[str] = None
-        self.voice_profile: Optional[Dict] = None
+        self._voice_profile: Optional[Mapping] = None
 
-        # Settings
-        self.settings: Dict = {
+        # Settings (replaced on update, never changed in place)
+        self._settings: Mapping = MappingProxyType({
             "tone_mode": "auto",      # auto | conservative | assertive
             "gemini_enabled": True,   # can be toggled
-        }
+        })
 
         # Runtime state
-        self.response_history = ResponseHistory()
+        self.response_history = ResponseHistory(lock=self._lock)
+        self.threads: "OrderedDict[str, ThreadContext]" = OrderedDict()
 
     # -------- Persona --------
 
     def set_persona(self, persona: str) -> None:
-        self.persona = persona
+        with self._lock:
+            self.persona = persona
 
     def get_persona(self) -> Optional[str]:
         return self.persona
@@ -43,23 +68,40 @@ class SessionState:
     # -------- Voice Profile --------
 
     def set_voice_profile(self, voice_profile: Dict) -> None:
-        self.voice_profile = voice_profile
+        # Copied: later edits to the caller's dict do not leak in
+        with self._lock:
+            self._voice_profile = dict(voice_profile)
 
     def get_voice_profile(self) -> Optional[Dict]:
-        return self.voice_profile
+        """The stored profile. Shared with other readers: do not modify."""
+        return self._voice_profile
+
+    @property
+    def voice_profile(self) -> Optional[Dict]:
+        return self._voice_profile
 
     def clear_voice_profile(self) -> None:
-        self.voice_profile = None
+        with self._lock:
+            self._voice_profile = None
 
     # -------- Settings --------
 
     def update_settings(self, **kwargs) -> None:
-        for key, value in kwargs.items():
-            if key in self.settings:
-                self.settings[key] = value
+        """Apply all known keys at once; unknown keys are ignored."""
+        with self._lock:
+            settings = dict(self._settings)
+            for key, value in kwargs.items():
+                if key in settings:
+                    settings[key] = value
+            self._settings = MappingProxyType(settings)
+
+    def get_settings(self) -> Mapping:
+        """Read-only view of the current settings."""
+        return self._settings
 
-    def get_settings(self) -> Dict:
-        return self.settings
+    @property
+    def settings(self) -> Mapping:
+        return self._settings
 
     # -------- Response History --------
 
@@ -68,21 +110,188 @@ class SessionState:
         *,
         customer_message: str,
         final_response: str,
+        god_mode_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
     ) -> Dict:
-        if not self.persona:
-            raise ValueError("Persona must be set before adding responses.")
+        """
+        Store an accepted response. With a thread_id the exchange is also
+        recorded in that thread; a customer turn already recorded (by
+        matching) and awaiting this reply is not recorded again, and the
+        reply closes it.
+        """
+        with self._lock:
+            if not self.persona:
+                raise ValueError("Persona must be set before adding responses.")
+            for name, text in (("customer_message", customer_message), ("final_response", final_response)):
+                if not isinstance(text, str) or not text.strip():
+                    raise ValueError(f"{name} must be non-blank text.")
 
-        return self.response_history.add(
-            customer_message=customer_message,
-            final_response=final_response,
-            persona=self.persona,
-        )
+            entry = self.response_history.add(
+                customer_message=customer_message,
+                final_response=final_response,
+                persona=self.persona,
+                god_mode_id=god_mode_id,
+            )
+            if thread_id is not None:
+                thread = self.get_thread(thread_id)
+                thread.add_customer_turn(customer_message)
+                thread.add_agent_turn(final_response)
+            return entry
 
-    def list_responses(self):
+    def list_responses(self) -> Tuple[Dict, ...]:
+        """Snapshot of the history, newest first."""
         return self.response_history.list()
 
     def get_response(self, entry_id: str):
         return self.response_history.get(entry_id)
 
+    def find_similar_responses(
+        self,
+        *,
+        customer_message: str,
+        god_mode_id: Optional[str],
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> List[Dict]:
+        """
+        Look up accepted responses to near-duplicate messages for the
+        current persona. Check this before calling refine_instruction.
+        """
+        persona = self.persona
+        if not persona:
+            return []
+
+        return self.response_history.find_similar(
+            customer_message=customer_message,
+            persona=persona,
+            god_mode_id=god_mode_id,
+            threshold=threshold,
+        )
+
     def clear_responses(self):
         self.response_history.clear()
+
+    # -------- Threads --------
+
+    def get_thread(self, thread_id: str, create: bool = True) -> Optional[ThreadContext]:
+        """
+        The thread with this id, started on first use. The least recently
+        used thread is dropped beyond MAX_THREADS.
+        """
+        with self._lock:
+            thread = self.threads.get(thread_id)
+            if thread is not None:
+                self.threads.move_to_end(thread_id)
+                return thread
+            if not create:
+                return None
+
+            thread = self.threads[thread_id] = ThreadContext(thread_id, lock=self._lock)
+            while len(self.threads) > MAX_THREADS:
+                self.threads.popitem(last=False)
+            return thread
+
+    def list_threads(self) -> List[Dict]:
+        with self._lock:
+            return [thread.state() for thread in self.threads.values()]
+
+    def clear_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.threads.pop(thread_id, None)
+
+    # -------- Snapshot --------
+
+    def snapshot(self) -> Dict:
+        """
+        Consistent copy of the whole session at one point in time.
+
+        Returns:
+        {
+            "session_id": str,
+            "created_at": str,
+            "persona": str | None,
+            "voice_profile": Mapping | None,
+            "settings": Mapping,
+            "responses": Tuple[Dict, ...],    # newest first
+            "threads": List[Dict]             # ThreadContext.state()
+        }
+        """
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "created_at": self.created_at,
+                "persona": self.persona,
+                "voice_profile": self._voice_profile,
+                "settings": self._settings,
+                "responses": self.response_history.list(),
+                "threads": [thread.state() for thread in self.threads.values()],
+            }
+
+
+class AsyncSessionState:
+    """
+    asyncio front for a SessionState, for handlers that share a session
+    with worker threads.
+
+    Writes try the session lock without blocking; if a thread holds it,
+    the write waits on the default executor instead of stalling the
+    event loop. Reads are the lock-free snapshot reads of SessionState.
+    """
+
+    def __init__(self, session: Optional[SessionState] = None):
+        self.session = session or SessionState()
+
+    @property
+    def session_id(self) -> str:
+        return self.session.session_id
+
+    async def _locked(self, fn: Callable, *args, **kwargs):
+        lock = self.session._lock
+        if lock.acquire(blocking=False):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                lock.release()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self._call_locked, fn, args, kwargs))
+
+    def _call_locked(self, fn: Callable, args: Tuple, kwargs: Dict):
+        with self.session._lock:
+            return fn(*args, **kwargs)
+
+    # -------- Reads --------
+
+    def get_persona(self) -> Optional[str]:
+        return self.session.get_persona()
+
+    def get_voice_profile(self) -> Optional[Dict]:
+        return self.session.get_voice_profile()
+
+    def get_settings(self) -> Mapping:
+        return self.session.get_settings()
+
+    def list_responses(self) -> Tuple[Dict, ...]:
+        return self.session.list_responses()
+
+    # -------- Writes --------
+
+    async def set_persona(self, persona: str) -> None:
+        await self._locked(self.session.set_persona, persona)
+
+    async def set_voice_profile(self, voice_profile: Dict) -> None:
+        await self._locked(self.session.set_voice_profile, voice_profile)
+
+    async def update_settings(self, **kwargs) -> None:
+        await self._locked(self.session.update_settings, **kwargs)
+
+    async def add_response(self, **kwargs) -> Dict:
+        return await self._locked(self.session.add_response, **kwargs)
+
+    async def find_similar_responses(self, **kwargs) -> List[Dict]:
+        return await self._locked(self.session.find_similar_responses, **kwargs)
+
+    async def get_thread(self, thread_id: str, create: bool = True) -> Optional[ThreadContext]:
+        return await self._locked(self.session.get_thread, thread_id, create)
+
+    async def snapshot(self) -> Dict:
+        return await self._locked(self.session.snapshot)
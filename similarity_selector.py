@@ -0,0 +1,236 @@
+"""
+LexIQ Labs – Similarity Selector
+
+Purpose:
+- Choose a God Mode prompt by how close the customer's message is to
+  the prompt's own language: its safe/direct example texts, tags and
+  pain point name, not tag overlap alone
+- Offline and CPU-only: TF-IDF vectors over word unigrams and bigrams,
+  one L2-normalized NumPy matrix per persona, built at library load
+- Selection is one matrix-vector product (cosine scores for every
+  prompt of the persona at once)
+- Fall back to the tag logic when NumPy is missing, the persona has no
+  vectors, or no prompt is similar enough
+
+NumPy is optional; without it `available` is False and every selection
+takes the tag path.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import math
+
+from language import STOPWORDS
+from metrics import timed
+from pain_point_matcher import normalize, select_god_mode_prompt
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Cosine score below which the tag logic decides instead. Off-topic
+# messages score about 0.05-0.10 against the stock library.
+MIN_SIMILARITY = 0.10
+
+DEFAULT_TOP_K = 3
+
+_STOPWORDS = STOPWORDS["en"]
+
+
+def _features(tokens: Sequence[str]) -> Iterator[str]:
+    """Content-word unigrams and bigrams of a normalized token list."""
+    previous: Optional[str] = None
+    for token in tokens:
+        if token in _STOPWORDS or len(token) < 2:
+            previous = None
+            continue
+        yield token
+        if previous is not None:
+            yield f"{previous} {token}"
+        previous = token
+
+
+def prompt_text(prompt: Dict) -> str:
+    """
+    The language a prompt is represented by: example texts of both
+    sets, pain point tags, pain point and blend type names.
+    """
+    parts: List[str] = []
+    for examples in (prompt.get("prompts") or {}).values():
+        parts.extend(
+            example.get("text") or ""
+            for example in examples or ()
+            if isinstance(example, dict)
+        )
+    parts.extend(tag for tag in prompt.get("pain_point_tags") or () if not tag.startswith("_"))
+    for key in ("pain_point", "blend_type"):
+        if prompt.get(key):
+            parts.append(str(prompt[key]).replace("_", " "))
+    return " \n ".join(parts)
+
+
+class _PersonaVectors:
+    """
+    One persona's prompts as a TF-IDF matrix. Never mutated after
+    creation; rebuilds publish a new object.
+    """
+
+    __slots__ = ("prompts", "vocabulary", "idf", "matrix")
+
+    def __init__(self, prompts: List[Dict]):
+        documents: List[Dict[str, int]] = []
+        document_frequency: Dict[str, int] = {}
+        for prompt in prompts:
+            counts: Dict[str, int] = {}
+            for feature in _features(normalize(prompt_text(prompt)).split()):
+                counts[feature] = counts.get(feature, 0) + 1
+            documents.append(counts)
+            for feature in counts:
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+
+        self.prompts = tuple(prompts)
+        self.vocabulary = {feature: column for column, feature in enumerate(sorted(document_frequency))}
+
+        # Smoothed IDF: terms every prompt shares still count a little
+        total = len(prompts)
+        self.idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for feature, column in self.vocabulary.items():
+            self.idf[column] = math.log((1 + total) / (1 + document_frequency[feature])) + 1
+
+        self.matrix = np.zeros((total, len(self.vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(documents):
+            for feature, count in counts.items():
+                column = self.vocabulary[feature]
+                self.matrix[row, column] = (1 + math.log(count)) * self.idf[column]
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.matrix /= norms
+
+    def scores(self, text: str):
+        """Cosine score per prompt for a normalized message, or None."""
+        vocabulary = self.vocabulary
+        counts: Dict[int, int] = {}
+        for feature in _features(text.split()):
+            column = vocabulary.get(feature)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        if not counts:
+            return None
+
+        columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        weights = (1 + np.log(tf)) * self.idf[columns]
+
+        vector = np.zeros(len(vocabulary), dtype=np.float32)
+        vector[columns] = weights / np.linalg.norm(weights)
+        return self.matrix @ vector
+
+
+class SimilarityIndex:
+    """
+    Per-persona TF-IDF matrices over a library's God Mode prompts.
+
+    Reads never lock: rebuild() replaces a persona's matrix with a new
+    one, and readers keep the one they started with.
+    """
+
+    def __init__(self, god_mode_prompts: Iterable[Dict], *, min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+
+        by_persona: Dict[str, List[Dict]] = {}
+        for prompt in god_mode_prompts:
+            by_persona.setdefault(prompt.get("persona"), []).append(prompt)
+        self._prompts: Dict[str, List[Dict]] = by_persona
+        self._vectors: Dict[str, _PersonaVectors] = {}
+        if np is not None:
+            for persona, prompts in by_persona.items():
+                self._vectors[persona] = _PersonaVectors(prompts)
+
+    @classmethod
+    def from_library(cls, library, **kwargs) -> "SimilarityIndex":
+        return cls(list(library.god_mode_prompts), **kwargs)
+
+    @property
+    def available(self) -> bool:
+        """True when NumPy is installed and vectors were built."""
+        return bool(self._vectors)
+
+    def rebuild(self, persona: str, god_mode_prompts: List[Dict]) -> None:
+        """
+        Replace one persona's prompts, after library edits
+        (e.g. LibraryIndex.god_mode_prompts_for(persona)).
+        """
+        prompts = list(god_mode_prompts)
+        self._prompts[persona] = prompts
+        if np is not None:
+            if prompts:
+                self._vectors[persona] = _PersonaVectors(prompts)
+            else:
+                self._vectors.pop(persona, None)
+
+    # -------- Reads --------
+
+    def rank(
+        self,
+        *,
+        customer_message: str,
+        persona: str,
+        top_k: int = DEFAULT_TOP_K,
+    ) -> List[Dict]:
+        """
+        Most similar prompts of a persona, best first. Empty when there
+        are no vectors or the message shares no term with any prompt.
+
+        Returns:
+        [
+            {
+                "prompt": Dict,
+                "id": str,
+                "score": float    # cosine, 0..1
+            }
+        ]
+        """
+        vectors = self._vectors.get(persona)
+        if vectors is None:
+            return []
+        scores = vectors.scores(normalize(customer_message))
+        if scores is None:
+            return []
+
+        # Stable: equal scores keep library order
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            {
+                "prompt": vectors.prompts[row],
+                "id": vectors.prompts[row].get("id"),
+                "score": round(float(scores[row]), 4),
+            }
+            for row in order
+            if scores[row] > 0
+        ]
+
+    @timed("select_god_mode_prompt_similarity")
+    def select(
+        self,
+        *,
+        customer_message: str,
+        persona: str,
+        pain_point_match: Dict,
+        index=None,
+    ) -> Dict:
+        """
+        Most similar prompt of the persona when it scores at least
+        min_similarity; otherwise the tag logic decides, through `index`
+        (a LibraryIndex) when given, else select_god_mode_prompt.
+        """
+        ranked = self.rank(customer_message=customer_message, persona=persona, top_k=1)
+        if ranked and ranked[0]["score"] >= self.min_similarity:
+            return ranked[0]["prompt"]
+
+        if index is not None:
+            return index.select_god_mode_prompt(persona=persona, pain_point_match=pain_point_match)
+        return select_god_mode_prompt(
+            persona=persona,
+            god_mode_prompts=self._prompts.get(persona, []),
+            pain_point_match=pain_point_match,
+        )
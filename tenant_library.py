@@ -0,0 +1,326 @@
+"""
+LexIQ Labs – Tenant Libraries
+
+Purpose:
+- Serve many client tenants from one shared, compiled prompt library
+- Describe each tenant as a small overlay: God Mode and pain point
+  upserts/removes plus extra forbidden phrases
+- Resolve lookups through a copy-on-write fork of the shared index
+  (LibraryIndex.fork): a tenant costs its edits, not a library
+- Load tenants lazily on first use, outside the registry lock: one
+  load per tenant, concurrent callers wait for it; evict idle and least
+  recently used tenants
+- Remember malformed overlays briefly instead of re-parsing them on
+  every request
+
+Overlay files live in prompts/tenants/<tenant_id>.yml:
+
+    tenant_overlay:
+      forbidden_phrases: ["free upgrade", "discount"]
+      god_mode:
+        upsert: [<God Mode entry>, ...]      # matched on id
+        remove: [gm_sales_07_just_send_info]
+      pain_points:
+        support:
+          upsert: [<pain point entry>, ...]
+          remove: [support_billing_01]
+
+Every key is optional.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import monotonic
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import re
+import threading
+
+import metrics
+from gemini_refiner import _constraint_violation
+from library_index import LibraryIndex
+from metrics import timed
+from prompt_library import PROMPTS_DIR, load_yaml
+
+TENANTS_DIR = os.path.join(PROMPTS_DIR, "tenants")
+OVERLAY_EXTENSIONS = (".yml", ".yaml")
+
+DEFAULT_MAX_TENANTS = 256
+DEFAULT_IDLE_SECONDS = 900.0
+# How long a malformed overlay is reported from memory before re-reading
+DEFAULT_RETRY_SECONDS = 10.0
+
+# Tenant ids become file names: no separators, no leading dot
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+TENANT_VIOLATION = "tenant_forbidden_phrase"
+
+
+class TenantNotFound(LookupError):
+    pass
+
+
+# ─────────────────────────────────────────
+# Overlays
+
+def overlay_path(tenant_id: str, tenants_dir: Optional[str] = None) -> Optional[str]:
+    """Overlay file of a tenant, or None if the id is invalid or has no file."""
+    if not isinstance(tenant_id, str) or not _TENANT_ID.match(tenant_id):
+        return None
+    tenants_dir = tenants_dir or TENANTS_DIR
+    for extension in OVERLAY_EXTENSIONS:
+        path = os.path.join(tenants_dir, tenant_id + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _edits(section, where: str) -> Tuple[List[Dict], List[str]]:
+    section = section or {}
+    if not isinstance(section, dict):
+        raise ValueError(f"{where}: expected a mapping")
+
+    upserts = section.get("upsert") or []
+    removes = section.get("remove") or []
+    if not isinstance(upserts, list) or not all(isinstance(e, dict) and e.get("id") for e in upserts):
+        raise ValueError(f"{where}.upsert: expected a list of entries with ids")
+    if not isinstance(removes, list) or not all(isinstance(i, str) for i in removes):
+        raise ValueError(f"{where}.remove: expected a list of ids")
+    return upserts, removes
+
+
+def parse_overlay(data: Optional[Dict]) -> Dict:
+    """
+    Check and normalize a loaded overlay file. Raises ValueError.
+
+    Returns:
+    {
+        "forbidden_phrases": List[str],
+        "god_mode": {"upsert": List[Dict], "remove": List[str]},
+        "pain_points": {persona: {"upsert": List[Dict], "remove": List[str]}}
+    }
+    """
+    overlay = (data or {}).get("tenant_overlay") if isinstance(data, dict) else None
+    overlay = overlay or {}
+    if not isinstance(overlay, dict):
+        raise ValueError("tenant_overlay: expected a mapping")
+
+    phrases = overlay.get("forbidden_phrases") or []
+    if not isinstance(phrases, list) or not all(isinstance(p, str) and p.strip() for p in phrases):
+        raise ValueError("tenant_overlay.forbidden_phrases: expected a list of phrases")
+
+    upserts, removes = _edits(overlay.get("god_mode"), "tenant_overlay.god_mode")
+    for entry in upserts:
+        if not entry.get("persona"):
+            raise ValueError(f"tenant_overlay.god_mode: entry {entry['id']} has no persona")
+
+    pain_points = overlay.get("pain_points") or {}
+    if not isinstance(pain_points, dict):
+        raise ValueError("tenant_overlay.pain_points: expected a mapping of personas")
+
+    return {
+        "forbidden_phrases": [p.strip() for p in phrases],
+        "god_mode": {"upsert": upserts, "remove": removes},
+        "pain_points": {
+            persona: dict(zip(("upsert", "remove"), _edits(section, f"tenant_overlay.pain_points.{persona}")))
+            for persona, section in pain_points.items()
+        },
+    }
+
+
+# ─────────────────────────────────────────
+# Tenant view
+
+class TenantLibrary:
+    """
+    One tenant's library: a fork of the shared index with the overlay
+    applied, plus the tenant's forbidden phrases.
+    """
+
+    __slots__ = ("tenant_id", "index", "forbidden_phrases", "_forbidden", "last_used")
+
+    def __init__(self, tenant_id: str, index: LibraryIndex, overlay: Dict):
+        self.tenant_id = tenant_id
+        self.index = index
+        self.forbidden_phrases: Tuple[str, ...] = tuple(overlay["forbidden_phrases"])
+        self._forbidden = (
+            re.compile("|".join(re.escape(p) for p in self.forbidden_phrases), re.IGNORECASE)
+            if self.forbidden_phrases else None
+        )
+        self.last_used = 0.0
+
+        for persona, edits in overlay["pain_points"].items():
+            for pain_point_id in edits["remove"]:
+                index.remove_pain_point(persona, pain_point_id)
+            for entry in edits["upsert"]:
+                index.upsert_pain_point(persona, entry)
+        for prompt_id in overlay["god_mode"]["remove"]:
+            index.remove_god_mode_prompt(prompt_id)
+        for entry in overlay["god_mode"]["upsert"]:
+            index.upsert_god_mode_prompt(entry)
+
+    def constraint_violation(self, text: str) -> Optional[str]:
+        """The hard constraints plus this tenant's forbidden phrases."""
+        violation = _constraint_violation(text)
+        if violation is None and self._forbidden is not None and self._forbidden.search(text):
+            violation = TENANT_VIOLATION
+        return violation
+
+
+# ─────────────────────────────────────────
+# Registry
+
+class TenantLibraries:
+    """
+    Lazily loaded tenant libraries over one shared LibraryIndex.
+
+    At most `max_tenants` stay loaded (least recently used go first);
+    tenants unused for `idle_seconds` are dropped on the next access.
+    An evicted tenant reloads from its overlay file when next asked for.
+
+    Loading (YAML parse, fork, overlay) runs without the registry lock;
+    the first caller loads, others asking for the same tenant meanwhile
+    wait on its future. A malformed overlay is reported from memory for
+    `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        base: LibraryIndex,
+        *,
+        tenants_dir: Optional[str] = None,
+        max_tenants: int = DEFAULT_MAX_TENANTS,
+        idle_seconds: Optional[float] = DEFAULT_IDLE_SECONDS,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.base = base
+        self.tenants_dir = tenants_dir or TENANTS_DIR
+        self.max_tenants = max(1, max_tenants)
+        self.idle_seconds = idle_seconds
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, TenantLibrary]" = OrderedDict()  # oldest use first
+        self._loading: Dict[str, Future] = {}
+        self._failed: Dict[str, Tuple[float, str]] = {}  # tenant id -> (retry at, error)
+        # Bumped by invalidate: a load that started before is not kept
+        self._generation = 0
+
+    @classmethod
+    def from_library(cls, library, **kwargs) -> "TenantLibraries":
+        return cls(LibraryIndex.from_library(library), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._loaded)
+
+    @property
+    def loaded(self) -> List[str]:
+        return list(self._loaded)
+
+    def get(self, tenant_id: str) -> TenantLibrary:
+        """
+        The tenant's library, loading it on first use.
+
+        Raises TenantNotFound for unknown tenants and ValueError for
+        malformed overlay files.
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict_idle_locked(now)
+            tenant = self._loaded.get(tenant_id)
+            if tenant is not None:
+                self._loaded.move_to_end(tenant_id)
+                tenant.last_used = now
+                return tenant
+
+            failed = self._failed.get(tenant_id)
+            if failed is not None:
+                if now < failed[0]:
+                    raise ValueError(failed[1])
+                del self._failed[tenant_id]
+
+            future = self._loading.get(tenant_id)
+            if future is not None:
+                loading = False
+            else:
+                loading = True
+                future = self._loading[tenant_id] = Future()
+                generation = self._generation
+
+        if not loading:
+            return future.result()
+
+        try:
+            tenant = self._load(tenant_id)
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(tenant_id) is future:
+                    del self._loading[tenant_id]
+                if isinstance(e, ValueError) and generation == self._generation:
+                    self._failed[tenant_id] = (now + self.retry_seconds, str(e))
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if self._loading.get(tenant_id) is future:
+                del self._loading[tenant_id]
+            tenant.last_used = now
+            if generation == self._generation:
+                self._loaded[tenant_id] = tenant
+                while len(self._loaded) > self.max_tenants:
+                    self._loaded.popitem(last=False)
+                    metrics.inc("lexiq_tenant_evictions_total", reason="capacity")
+        future.set_result(tenant)
+        return tenant
+
+    @timed("tenant_load")
+    def _load(self, tenant_id: str) -> TenantLibrary:
+        path = overlay_path(tenant_id, self.tenants_dir)
+        if path is None:
+            raise TenantNotFound(tenant_id)
+
+        # Deferred like load_yaml's own import
+        import yaml
+
+        try:
+            overlay = parse_overlay(load_yaml(path))
+        except (yaml.YAMLError, ValueError) as e:
+            raise ValueError(f"{os.path.basename(path)}: {e}") from e
+        return TenantLibrary(tenant_id, self.base.fork(), overlay)
+
+    def evict_idle(self) -> int:
+        """Drop tenants idle for longer than idle_seconds. Returns how many."""
+        with self._lock:
+            return self._evict_idle_locked(self._clock())
+
+    def _evict_idle_locked(self, now: float) -> int:
+        if self.idle_seconds is None:
+            return 0
+        evicted = 0
+        # Ordered by last use: stop at the first tenant still active
+        while self._loaded:
+            tenant_id, tenant = next(iter(self._loaded.items()))
+            if now - tenant.last_used <= self.idle_seconds:
+                break
+            del self._loaded[tenant_id]
+            evicted += 1
+        if evicted:
+            metrics.inc("lexiq_tenant_evictions_total", evicted, reason="idle")
+        return evicted
+
+    def invalidate(self, tenant_id: Optional[str] = None) -> None:
+        """
+        Drop one loaded tenant (its overlay changed) or all of them (the
+        shared base changed); they reload on next use.
+        """
+        with self._lock:
+            self._generation += 1
+            if tenant_id is None:
+                self._loaded.clear()
+                self._loading.clear()
+                self._failed.clear()
+            else:
+                self._loaded.pop(tenant_id, None)
+                self._loading.pop(tenant_id, None)
+                self._failed.pop(tenant_id, None)
@@ -0,0 +1,6 @@
+"""
+LexIQ Labs – Tests
+
+Run from the repository root:
+    python -m pytest -q
+"""
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+import event_log
+from batch_runner import INVALID_RECORD, STAGE_ERROR, BatchRunner, CheckpointMismatch
+from prompt_library import PromptLibrary
+
+MESSAGES = [
+    "Our CRM export keeps failing and the pipeline reports are wrong.",
+    "We sent the proposal weeks ago and heard nothing back.",
+    "Procurement is stuck in redlines with legal.",
+    "There is a budget freeze until next year.",
+    "Can you just send me some info by email?",
+    "Our champion left the company last month.",
+]
+
+
+class Killed(BaseException):
+    """Stands in for the process dying mid-run."""
+
+
+@pytest.fixture(scope="module")
+def library():
+    event_log.configure(sink="off")
+    return PromptLibrary.load()
+
+
+def _write_input(path, records):
+    path.write_text("".join(
+        (record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records
+    ))
+
+
+def _read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _run(runner, input_path, output_path):
+    return asyncio.run(runner.run(str(input_path), str(output_path)))
+
+
+def test_invalid_records_become_error_lines(tmp_path, library):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(input_path, [
+        {"id": 1, "persona": "sales", "customer_message": None},
+        {"id": 2, "persona": "sales", "customer_message": MESSAGES[0]},
+        {"id": 3, "persona": None, "customer_message": MESSAGES[1]},
+        "not json",
+        {"id": 5, "customer_message": MESSAGES[2]},
+        {"id": 6, "persona": "sales", "customer_message": 42},
+    ])
+
+    stats = _run(BatchRunner(library=library), input_path, output_path)
+
+    results = _read_output(output_path)
+    # Lines that don't parse into the required fields carry no id
+    assert [r["id"] for r in results] == [1, 2, 3, None, None, 6]
+    assert [r.get("error") for r in results] == [
+        INVALID_RECORD, None, INVALID_RECORD, INVALID_RECORD, INVALID_RECORD, INVALID_RECORD,
+    ]
+    assert results[1]["contract"]
+    assert stats["records"] == 6 and stats["invalid"] == 5
+
+
+def test_stage_failure_does_not_stop_the_run(tmp_path, library):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(input_path, [
+        {"id": n, "persona": "sales", "customer_message": message} for n, message in enumerate(MESSAGES[:3])
+    ])
+
+    class Failing(BatchRunner):
+        def _prepare_record(self, record, *args):
+            if record["id"] == 1:
+                raise RuntimeError("stage blew up")
+            return super()._prepare_record(record, *args)
+
+    stats = _run(Failing(library=library), input_path, output_path)
+
+    results = _read_output(output_path)
+    assert [r.get("error") for r in results] == [None, STAGE_ERROR, None]
+    assert stats["failed"] == 1
+
+
+def test_resume_continues_after_the_last_checkpoint(tmp_path, library):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(input_path, [
+        {"id": n, "persona": "sales", "customer_message": message} for n, message in enumerate(MESSAGES)
+    ])
+
+    class Dying(BatchRunner):
+        def prepare(self, line, offset):
+            if json.loads(line)["id"] == 4:
+                raise Killed()
+            return super().prepare(line, offset)
+
+    with pytest.raises(Killed):
+        _run(Dying(library=library, concurrency=1, checkpoint_every=2), input_path, output_path)
+
+    stats = _run(BatchRunner(library=library, concurrency=1, checkpoint_every=2), input_path, output_path)
+
+    assert stats["resumed_at"] > 0
+    assert stats["records"] < len(MESSAGES)
+    assert [r["id"] for r in _read_output(output_path)] == list(range(len(MESSAGES)))
+
+    again = _run(BatchRunner(library=library), input_path, output_path)
+    assert again.get("skipped") == "already complete"
+
+
+def test_resume_refuses_an_input_that_changed(tmp_path, library):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    records = [{"id": n, "persona": "sales", "customer_message": message} for n, message in enumerate(MESSAGES)]
+    _write_input(input_path, records)
+
+    class Dying(BatchRunner):
+        def prepare(self, line, offset):
+            if json.loads(line)["id"] == 4:
+                raise Killed()
+            return super().prepare(line, offset)
+
+    with pytest.raises(Killed):
+        _run(Dying(library=library, concurrency=1, checkpoint_every=2), input_path, output_path)
+
+    # Same path, other records: the checkpoint's offsets no longer apply
+    _write_input(input_path, records[1:])
+    with pytest.raises(CheckpointMismatch):
+        _run(BatchRunner(library=library), input_path, output_path)
+
+    stats = asyncio.run(BatchRunner(library=library).run(str(input_path), str(output_path), resume=False))
+    assert stats["resumed_at"] == 0
+    assert [r["id"] for r in _read_output(output_path)] == list(range(1, len(MESSAGES)))
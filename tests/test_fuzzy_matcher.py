@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from fuzzy_matcher import DeletionIndex
+from library_index import LibraryIndex
+from prompt_library import PromptLibrary
+
+PAIN_POINT = {
+    "id": "pp_test_zorblatt",
+    "title": "Zorblatt sync failing",
+    "keywords": ["zorblatt", "zorblatt sync", "sync crash"],
+}
+
+
+@pytest.fixture(scope="module")
+def library():
+    return PromptLibrary.load()
+
+
+@pytest.fixture
+def index(library):
+    return LibraryIndex.from_library(library)
+
+
+def test_corrects_within_allowed_distance():
+    vocabulary = DeletionIndex(["refund", "procurement", "cost"])
+
+    assert vocabulary.lookup("refnd") == ("refund", 1)
+    assert vocabulary.lookup("procurmnet") == ("procurement", 2)
+    # Too short to correct: "cast" never becomes "cost"
+    assert vocabulary.lookup("cast") is None
+
+
+def test_layered_index_matches_a_merged_one():
+    rng = random.Random(1)
+    words = ["".join(rng.choice("abcdefg") for _ in range(rng.randint(5, 10))) for _ in range(400)]
+    base = DeletionIndex(words[:300])
+    layer = DeletionIndex(words[300:], base=base)
+    merged = DeletionIndex(words)
+
+    for _ in range(2000):
+        token = "".join(rng.choice("abcdefg") for _ in range(rng.randint(5, 10)))
+        found, expected = layer.lookup(token), merged.lookup(token)
+        assert (found and found[1]) == (expected and expected[1]), token
+    assert all(word in base for word in words[:300])
+    assert not any(word in base for word in set(words[300:]) - set(words[:300]))
+
+
+def test_fork_fuzzy_vocabulary_stays_in_the_fork(library, index):
+    persona = library.personas[0]
+    index.fuzzy_index()
+    fork, other = index.fork(), index.fork()
+
+    fork.upsert_pain_point(persona, PAIN_POINT)
+
+    assert "zorblatt" in fork.fuzzy_index()
+    assert "zorblatt" not in index.fuzzy_index()
+    assert "zorblatt" not in other.fuzzy_index()
+
+    typo = fork.match_pain_point(
+        customer_message="our zorblat sync keeps failing with a sync crash", persona=persona, fuzzy=True,
+    )
+    assert (typo["pain_point"] or {}).get("id") == PAIN_POINT["id"]
+
+
+def test_fork_sees_base_vocabulary_added_later(library, index):
+    persona = library.personas[0]
+    fork = index.fork()
+    fork.fuzzy_index()
+
+    index.upsert_pain_point(persona, dict(PAIN_POINT, keywords=["quuxification"]))
+
+    assert fork.fuzzy_index().lookup("quuxificaton") == ("quuxification", 1)
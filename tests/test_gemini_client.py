@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+
+import event_log
+import gemini_client
+from gemini_client import CONNECTION_ERROR, GeminiError, generate_content
+
+SECRET = "SECRETKEY123"
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_connection_errors_never_log_the_api_key(monkeypatch):
+    # Nothing listens on the discard port
+    monkeypatch.setattr(gemini_client, "GEMINI_ENDPOINT", "http://127.0.0.1:9/v1beta/models/m:generateContent")
+    collected = _Collect()
+    event_log.configure(handler=collected, sample_rate=1.0)
+    try:
+        with pytest.raises(GeminiError) as error:
+            generate_content(stage="refine_instruction", payload={}, timeout=1, api_key=SECRET)
+    finally:
+        event_log.configure(sink="off")
+
+    assert error.value.reason == CONNECTION_ERROR
+    assert SECRET not in str(error.value)
+    assert collected.lines and not any(SECRET in line for line in collected.lines)
+
+
+def test_scrub_redacts_key_parameters():
+    assert gemini_client._scrub("GET /v1?key=abc&alt=json") == "GET /v1?key=<redacted>&alt=json"
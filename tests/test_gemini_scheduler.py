@@ -0,0 +1,80 @@
+import threading
+from time import sleep
+
+import pytest
+
+from gemini_scheduler import BACKGROUND, INTERACTIVE, DeadlineExceeded, GeminiScheduler, TokenBucket
+
+
+def _exhausted(window=1.0):
+    # rpm 10 over `window`: one request of burst, then one per window / 9
+    scheduler = GeminiScheduler(rpm=10, window=window)
+    scheduler.acquire(priority=INTERACTIVE, tokens=0)
+    return scheduler
+
+
+def _wait_for_pending(scheduler, count):
+    for _ in range(200):
+        if scheduler.pending() == count:
+            return
+        sleep(0.005)
+    raise AssertionError(f"expected {count} waiting requests, saw {scheduler.pending()}")
+
+
+def test_unlimited_scheduler_admits_immediately():
+    scheduler = GeminiScheduler()
+    assert not scheduler.enabled
+    assert scheduler.acquire(priority=BACKGROUND, tokens=10_000) == 0.0
+
+
+def test_interactive_is_served_before_earlier_background():
+    scheduler = _exhausted()
+    admitted = []
+
+    def worker(name, priority):
+        scheduler.acquire(priority=priority, tokens=0, max_wait=5.0)
+        admitted.append(name)
+
+    background = threading.Thread(target=worker, args=("background", BACKGROUND))
+    background.start()
+    _wait_for_pending(scheduler, 1)
+    interactive = threading.Thread(target=worker, args=("interactive", INTERACTIVE))
+    interactive.start()
+    _wait_for_pending(scheduler, 2)
+
+    background.join()
+    interactive.join()
+    assert admitted == ["interactive", "background"]
+
+
+def test_request_past_its_deadline_is_dropped():
+    scheduler = _exhausted(window=60.0)
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire(priority=BACKGROUND, tokens=0, max_wait=0.05)
+
+    assert scheduler.pending() == 0
+
+
+def test_dropped_request_does_not_block_the_queue():
+    scheduler = _exhausted()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire(priority=INTERACTIVE, tokens=0, max_wait=0.01)
+
+    waited = scheduler.acquire(priority=BACKGROUND, tokens=0, max_wait=5.0)
+    assert 0 < waited < 1.0
+
+
+def test_requests_larger_than_the_burst_are_charged_in_full():
+    # tpm 10000 has a burst of 1000, so each 2000-token request overdraws it
+    bucket = TokenBucket(10_000, window=60.0)
+    now = start = bucket.updated
+    admitted = 0
+    while True:
+        now += bucket.wait_time(2000, now)
+        if now >= start + 60.0:
+            break
+        bucket.take(2000)
+        admitted += 2000
+
+    assert 10_000 - 2000 <= admitted <= 10_000
@@ -0,0 +1,68 @@
+import pytest
+
+from benchmarks.synthetic import generate_corpus
+from library_index import LibraryIndex
+from pain_point_matcher import match_pain_point, select_god_mode_prompt
+from prompt_library import PromptLibrary
+
+PAIN_POINT = {
+    "id": "pp_test_zorblatt",
+    "title": "Zorblatt sync failing",
+    "keywords": ["zorblatt", "zorblatt sync", "sync crash"],
+}
+MESSAGE = "our zorblatt sync keeps failing with a sync crash"
+
+
+@pytest.fixture(scope="module")
+def library():
+    return PromptLibrary.load()
+
+
+@pytest.fixture
+def index(library):
+    return LibraryIndex.from_library(library)
+
+
+def _summary(match, god_mode_prompt):
+    return (
+        match["matched"],
+        match["confidence"],
+        match["reason"],
+        (match["pain_point"] or {}).get("id"),
+        god_mode_prompt.get("id"),
+    )
+
+
+def test_index_matches_the_linear_functions(library, index):
+    for item in generate_corpus(library, count_per_persona=100):
+        persona, message = item["persona"], item["customer_message"]
+
+        indexed = index.match_pain_point(customer_message=message, persona=persona)
+        linear = match_pain_point(customer_message=message, pain_points=library.pain_points_for(persona))
+
+        assert _summary(
+            indexed, index.select_god_mode_prompt(persona=persona, pain_point_match=indexed),
+        ) == _summary(
+            linear,
+            select_god_mode_prompt(
+                persona=persona, god_mode_prompts=library.god_mode_prompts, pain_point_match=linear,
+            ),
+        ), message
+
+
+def test_fork_edits_stay_in_the_fork(library, index):
+    persona = library.personas[0]
+    fork, other = index.fork(), index.fork()
+
+    fork.upsert_pain_point(persona, PAIN_POINT)
+
+    def matched_id(target):
+        match = target.match_pain_point(customer_message=MESSAGE, persona=persona)
+        return (match["pain_point"] or {}).get("id")
+
+    assert matched_id(fork) == PAIN_POINT["id"]
+    assert matched_id(index) != PAIN_POINT["id"]
+    assert matched_id(other) != PAIN_POINT["id"]
+
+    assert fork.remove_pain_point(persona, PAIN_POINT["id"])
+    assert matched_id(fork) != PAIN_POINT["id"]
@@ -0,0 +1,91 @@
+from prompt_budget import estimate_tokens, fit_message, strip_reply_chain, truncate_middle
+
+
+def test_keeps_a_plain_message_whole():
+    message = "Hi,\nThanks.\nThe export still fails every morning since the update."
+    assert strip_reply_chain(message) == message
+
+
+def test_drops_quoted_history_after_a_reply_header():
+    message = (
+        "The export still fails.\n"
+        "\n"
+        "On Mon, 3 Jun 2024 at 10:00, Support <help@example.com> wrote:\n"
+        "> Could you try again?\n"
+    )
+    assert strip_reply_chain(message) == "The export still fails."
+
+
+def test_drops_an_outlook_header_block():
+    message = (
+        "Still broken after the fix.\n"
+        "\n"
+        "From: Support <help@example.com>\n"
+        "Sent: Monday, June 3, 2024 10:00 AM\n"
+        "To: Jane <jane@example.com>\n"
+        "Subject: RE: Export\n"
+        "Please try again.\n"
+    )
+    assert strip_reply_chain(message) == "Still broken after the fix."
+
+
+def test_keeps_a_line_that_merely_starts_with_from():
+    message = "From what I can see, the export never finishes.\nIt stops at 90%."
+    assert strip_reply_chain(message) == message
+
+
+def test_drops_a_trailing_sign_off_block():
+    message = "The export still fails.\n\nBest regards,\nJane\nHead of Ops\nAcme Inc."
+    assert strip_reply_chain(message) == "The export still fails."
+
+
+def test_keeps_text_after_a_sign_off_word():
+    message = "Thanks,\nThe export still fails when I pick CSV and the file is empty."
+    assert strip_reply_chain(message) == message
+
+
+def test_fit_message_leaves_messages_within_budget_alone():
+    message = "The export still fails.\n\nBest regards,\nJane"
+    assert fit_message(message, fixed_tokens=100, token_budget=1000) == message
+    assert fit_message(message, fixed_tokens=100, token_budget=None) == message
+
+
+def test_fit_message_compacts_over_budget():
+    history = "\n".join(f"> earlier line {n} with some quoted words" for n in range(200))
+    message = f"The export still fails.\n\nOn Mon, Support wrote:\n{history}"
+    fitted = fit_message(message, fixed_tokens=0, token_budget=50)
+    assert fitted == "The export still fails."
+    assert estimate_tokens(fitted) <= 50
+
+
+def test_truncate_middle_keeps_both_ends_without_overlap():
+    text = " ".join(f"w{n}" for n in range(2000))
+    fitted = truncate_middle(text, 100)
+    head, tail = fitted.split(" […] ")
+    assert text.startswith(head) and text.endswith(tail)
+    assert estimate_tokens(fitted) <= 100
+
+
+def test_truncate_middle_cuts_on_any_whitespace():
+    fitted = truncate_middle("word\n" * 3000, 100)
+    assert len(fitted) < 100 * 4
+    assert set(fitted.replace("[…]", "").split()) == {"word"}
+
+
+def test_truncate_middle_cuts_text_without_spaces_by_characters():
+    for text in ("x" * 4000, "エクスポートが毎朝失敗します。" * 200):
+        fitted = truncate_middle(text, 100)
+        assert len(fitted) < len(text)
+        assert estimate_tokens(fitted) <= 100
+
+
+def test_truncate_middle_never_grows_the_text():
+    for text in ("ab", "a b c d e f", "x" * 40):
+        for max_tokens in (1, 2, 5):
+            assert len(truncate_middle(text, max_tokens)) <= len(text)
+
+
+def test_fit_message_fits_a_long_japanese_message():
+    message = "エクスポートが失敗します。" * 231
+    assert estimate_tokens(message) > 700
+    assert estimate_tokens(fit_message(message, fixed_tokens=0, token_budget=300)) <= 300
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+import event_log
+from benchmarks.session_stress import run_round
+from server import EngineService, HTTPError
+from session_state import SessionState
+
+
+@pytest.fixture
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_writers_lose_no_updates(fast_switching):
+    result = run_round(safe=True, threads=4, tasks=4, ops=300)
+
+    assert result["errors"] == 0, result["error_samples"]
+    assert result["lost_updates"] == {"history": 0, "index": 0, "thread_turns": 0}
+
+
+@pytest.mark.parametrize("message", ["   ", "\n\t", None, 5])
+def test_add_response_rejects_blank_message(message):
+    session = SessionState()
+    session.set_persona("support")
+
+    with pytest.raises(ValueError):
+        session.add_response(customer_message=message, final_response="Thanks.", thread_id="t1")
+    assert session.list_responses() == ()
+
+
+def test_blank_message_is_a_bad_request():
+    event_log.configure(sink="off")
+
+    async def post(service, body):
+        return await service.dispatch("POST", "/sessions/responses", json.dumps(body).encode())
+
+    async def scenario():
+        service = EngineService()
+        service._slots = asyncio.Semaphore(1)
+        session = service.sessions.create("support")
+        body = {"session_id": session.session_id, "final_response": "Thanks."}
+
+        with pytest.raises(HTTPError) as error:
+            await post(service, dict(body, customer_message="   "))
+        assert error.value.status == 400
+
+        status, _ = await post(service, dict(body, customer_message="The export fails."))
+        assert status == 200
+
+    asyncio.run(scenario())
+
+
+def test_a_message_is_one_thread_turn_across_routes_and_retries():
+    event_log.configure(sink="off")
+    message = "Our leads are unqualified and not converting."
+
+    async def scenario():
+        service = EngineService()
+        service._slots = asyncio.Semaphore(1)
+        session = service.sessions.create("sales")
+        body = {
+            "session_id": session.session_id,
+            "thread_id": "t1",
+            "persona": "sales",
+            "customer_message": message,
+        }
+        for path in ("/match", "/contract", "/match"):
+            status, _ = await service.dispatch("POST", path, json.dumps(body).encode())
+            assert status == 200
+
+        thread = session.get_thread("t1")
+        assert thread.customer_turns == 1
+        assert [state["turns"] for state in thread.pain_points.values()] == [1]
+
+        await service.dispatch(
+            "POST", "/sessions/responses", json.dumps(dict(body, final_response="On it.")).encode()
+        )
+        await service.dispatch("POST", "/match", json.dumps(body).encode())
+        assert (thread.customer_turns, thread.agent_turns) == (2, 1)
+
+    asyncio.run(scenario())
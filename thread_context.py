@@ -0,0 +1,285 @@
+"""
+LexIQ Labs – Thread Context
+
+Purpose:
+- Carry a conversation across turns without re-sending or re-scanning it
+- Keep a rolling, compact thread summary, updated once per turn
+- Accumulate match state (which pain points the thread keeps returning
+  to) and telemetry state (repeat contact, urgency, escalation cues)
+- Each turn costs O(new text); the summary stays bounded however long
+  the thread gets
+
+The summary goes into the response contract (thread_summary) in place
+of the raw thread, so callers send only the newest message.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import re
+import threading
+import uuid
+
+from prompt_budget import strip_reply_chain
+
+# Turns quoted in the summary
+MAX_RECENT_TURNS = 4
+# Words kept per quoted turn
+DIGEST_WORDS = 24
+# Opening sentences this short ("Hi, thanks.") are skipped by the digest
+GREETING_WORDS = 3
+# Pain points named in the summary
+MAX_TOPICS = 3
+# Confidence kept per turn when an earlier match carries over
+CARRY_DECAY = 0.8
+
+CUSTOMER = "customer"
+AGENT = "agent"
+
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
+# Telemetry cues, counted once per customer turn
+SIGNALS: Dict[str, re.Pattern] = {
+    "repeat_contact": re.compile(
+        r"\b(again|still|another|once more|(second|third|fourth) time|follow(ing)?[- ]up)\b",
+        re.IGNORECASE,
+    ),
+    "urgency": re.compile(r"\b(asap|urgent\w*|immediately|right now|deadline|today)\b|!!", re.IGNORECASE),
+    "escalation": re.compile(
+        r"\b(manager|escalat\w*|cancel\w*|unacceptable|lawyer|complain\w*|switch\w* to)\b",
+        re.IGNORECASE,
+    ),
+    "gratitude": re.compile(r"\b(thanks|thank you|appreciate\w*)\b", re.IGNORECASE),
+}
+
+_SIGNAL_LABELS = {
+    "repeat_contact": "repeat contact",
+    "urgency": "urgency",
+    "escalation": "escalation",
+    "gratitude": "gratitude",
+}
+
+
+def digest(text: str, max_words: int = DIGEST_WORDS) -> str:
+    """
+    First substantive sentence of a turn (greetings and pleasantries
+    skipped), at most max_words words. Only the opening of the text is
+    read, so long turns cost no more than short ones.
+    """
+    head = text[: max_words * 12]
+    start = 0
+    for end in _SENTENCE_END.finditer(head):
+        sentence = head[start:end.start() + 1]
+        if len(sentence.split()) > GREETING_WORDS:
+            head = sentence
+            break
+        start = end.end()
+    else:
+        # No long sentence: what follows the short ones, else the text itself
+        head = head[start:] if head[start:].strip() else head
+    words = head.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "…"
+    return " ".join(words)
+
+
+class ThreadContext:
+    """
+    Rolling state of one conversation thread.
+
+    Updates take `lock` (reentrant; SessionState passes its own), so one
+    turn is recorded whole even when requests of a thread overlap.
+    """
+
+    def __init__(self, thread_id: Optional[str] = None, lock: Optional[threading.RLock] = None):
+        self.thread_id: str = thread_id or str(uuid.uuid4())
+        self._lock = lock or threading.RLock()
+        self.turns = 0
+        self.customer_turns = 0
+        self.agent_turns = 0
+
+        self.opening: Optional[str] = None
+        self.recent: Deque[Tuple[str, str]] = deque(maxlen=MAX_RECENT_TURNS)
+        # pain point id -> {"pain_point", "turns", "last_turn", "confidence"}
+        self.pain_points: Dict[str, Dict] = {}
+        self.signals: Dict[str, int] = dict.fromkeys(SIGNALS, 0)
+
+        self._summary: Optional[str] = None
+        # Newest customer turn while it awaits a reply, and the summary
+        # that preceded it (the context sent along with it)
+        self._last_customer: Optional[str] = None
+        self._context_for_last = ""
+
+    # -------- Turns --------
+
+    def add_customer_turn(self, text: str, *, match: Optional[Dict] = None) -> str:
+        """
+        Record a customer message (quoted history and signatures are
+        dropped) and its pain point match.
+
+        Returns the thread summary as it stood before this turn: the
+        context to send along with the message (see context_summary).
+        The message awaiting a reply is one turn however often it is
+        recorded (several routes, client retries); add_agent_turn closes
+        it, so a customer repeating themselves after a reply counts twice.
+        """
+        text = strip_reply_chain(text)
+        line = digest(text)
+        signals = [name for name, pattern in SIGNALS.items() if pattern.search(text)]
+
+        with self._lock:
+            if self._last_customer is not None and text == self._last_customer:
+                if match is not None:
+                    self.observe_match(match)
+                return self._context_for_last
+
+            context = self.summary()
+            self.turns += 1
+            self.customer_turns += 1
+            if self.opening is None:
+                self.opening = line
+            self.recent.append((CUSTOMER, line))
+            for name in signals:
+                self.signals[name] += 1
+            if match is not None:
+                self.observe_match(match)
+
+            self._last_customer = text
+            self._context_for_last = context
+            self._summary = None
+            return context
+
+    def awaiting_reply(self, text: str) -> bool:
+        """Whether text is the newest customer turn, not yet answered."""
+        with self._lock:
+            return self._last_customer is not None and strip_reply_chain(text) == self._last_customer
+
+    def add_agent_turn(self, text: str) -> None:
+        """Record a reply that was sent."""
+        line = digest(text.strip())
+        with self._lock:
+            self.turns += 1
+            self.agent_turns += 1
+            self.recent.append((AGENT, line))
+            self._last_customer = None
+            self._summary = None
+
+    # -------- Match state --------
+
+    def observe_match(self, match: Dict) -> None:
+        """Fold one turn's pain point match into the thread state."""
+        pain_point = match.get("pain_point") if match.get("matched") else None
+        if not pain_point or not pain_point.get("id"):
+            return
+
+        with self._lock:
+            state = self.pain_points.get(pain_point["id"])
+            if state is None:
+                state = self.pain_points[pain_point["id"]] = {
+                    "pain_point": pain_point, "turns": 0, "last_turn": 0, "confidence": 0.0,
+                }
+            if state["last_turn"] != self.turns:
+                state["turns"] += 1
+            state["pain_point"] = pain_point
+            state["last_turn"] = self.turns
+            state["confidence"] = max(state["confidence"], match.get("confidence", 0.0))
+            self._summary = None
+
+    def dominant_pain_point(self) -> Optional[Dict]:
+        """Pain point state the thread returned to most often (then most recently)."""
+        with self._lock:
+            if not self.pain_points:
+                return None
+            return max(self.pain_points.values(), key=lambda s: (s["turns"], s["last_turn"]))
+
+    def effective_match(self, match: Dict) -> Dict:
+        """
+        This turn's match, or, when it found nothing, the thread's
+        dominant pain point with confidence decayed by turns elapsed.
+        """
+        if match.get("matched"):
+            return match
+        with self._lock:
+            dominant = self.dominant_pain_point()
+            if dominant is None:
+                return match
+            dominant = dict(dominant)
+            elapsed = max(0, self.turns - dominant["last_turn"])
+
+        return {
+            "matched": True,
+            "pain_point": dominant["pain_point"],
+            "confidence": round(dominant["confidence"] * CARRY_DECAY ** elapsed, 2),
+            "reason": "Carried over from earlier in the thread.",
+        }
+
+    # -------- Summary --------
+
+    def summary(self) -> str:
+        """
+        Compact, bounded description of the thread so far ("" before the
+        first turn). Rebuilt only after the state changed.
+        """
+        summary = self._summary
+        if summary is None:
+            with self._lock:
+                summary = self._summary
+                if summary is None:
+                    summary = self._summary = self._render()
+        return summary
+
+    def context_summary(self) -> str:
+        """
+        Read-only: the summary to send with the newest customer message,
+        i.e. the thread as it stood before it (while it awaits a reply),
+        else the current summary. Records nothing.
+        """
+        with self._lock:
+            if self._last_customer is not None:
+                return self._context_for_last
+            return self.summary()
+
+    def _render(self) -> str:
+        if not self.turns:
+            return ""
+
+        parts: List[str] = [
+            f"{self.turns} earlier turns ({self.customer_turns} customer, {self.agent_turns} agent)."
+        ]
+        # Once the first turn has scrolled out of the recent ones
+        if self.opening and all(line != self.opening for _, line in self.recent):
+            parts.append(f"Opened with: \"{self.opening}\"")
+
+        topics = sorted(
+            self.pain_points.values(), key=lambda s: (-s["turns"], -s["last_turn"])
+        )[:MAX_TOPICS]
+        if topics:
+            parts.append("Recurring issues: " + "; ".join(
+                f"{s['pain_point'].get('text') or s['pain_point']['id']} ({s['turns']}×)"
+                for s in topics
+            ) + ".")
+
+        cues = [f"{_SIGNAL_LABELS[name]} ({count}×)" for name, count in self.signals.items() if count]
+        if cues:
+            parts.append("Signals: " + ", ".join(cues) + ".")
+
+        if self.recent:
+            parts.append("Latest: " + " | ".join(f"{role}: {line}" for role, line in self.recent))
+
+        return " ".join(parts)
+
+    def state(self) -> Dict:
+        """Cumulative match and telemetry state, for clients and logs (a copy)."""
+        with self._lock:
+            dominant = self.dominant_pain_point()
+            return {
+                "thread_id": self.thread_id,
+                "turns": self.turns,
+                "customer_turns": self.customer_turns,
+                "agent_turns": self.agent_turns,
+                "signals": dict(self.signals),
+                "dominant_pain_point_id": dominant["pain_point"]["id"] if dominant else None,
+                "pain_points": {
+                    pain_point_id: {"turns": s["turns"], "confidence": s["confidence"]}
+                    for pain_point_id, s in self.pain_points.items()
+                },
+            }
@@ -10,13 +10,14 @@ Purpose:
 
 import os
 import json
-import requests
+from time import perf_counter
 from typing import Dict, Optional
 
-GEMINI_ENDPOINT = (
-    "https://generativelanguage.googleapis.com/v1beta/models/"
-    "gemini-2.5-flash:generateContent"
-)
+import event_log
+from gemini_client import MISSING_API_KEY, GeminiError, first_candidate_text, generate_content
+from prompt_budget import estimate_tokens, fit_message, report
+
+DEFAULT_TOKEN_BUDGET = 800
 
 
 def simulate_time_travel(
@@ -25,12 +26,14 @@ def simulate_time_travel(
     drafted_response: str,
     persona: str,
     timeout: int = 15,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
 ) -> Optional[Dict]:
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
+        event_log.emit("gemini_stage", stage="time_travel", outcome="error", reason=MISSING_API_KEY)
         return None
 
-    prompt = build_prompt(customer_message, drafted_response, persona)
+    prompt = build_prompt(customer_message, drafted_response, persona, token_budget)
 
     payload = {
         "contents": [
@@ -46,29 +49,59 @@ def simulate_time_travel(
         },
     }
 
+    start = perf_counter()
     try:
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={api_key}",
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload),
+        data = generate_content(
+            stage="time_travel",
+            payload=payload,
             timeout=timeout,
+            api_key=api_key,
         )
-        response.raise_for_status()
-        data = response.json()
-
-        raw = (
-            data["candidates"][0]["content"]["parts"][0]["text"]
-            if data.get("candidates")
-            else ""
+    except GeminiError as e:
+        event_log.emit(
+            "gemini_stage", stage="time_travel", outcome="error",
+            latency_s=perf_counter() - start, reason=e.reason,
         )
-
-        return parse_simulation(raw)
-
-    except Exception:
         return None
 
+    result = parse_simulation(first_candidate_text(data))
+    event_log.emit(
+        "gemini_stage", stage="time_travel",
+        outcome=event_log.OK if result is not None else "rejected",
+        latency_s=perf_counter() - start,
+        reason=None if result is not None else "unparseable_output",
+    )
+    return result
 
-def build_prompt(customer_message: str, drafted_response: str, persona: str) -> str:
+
+def build_prompt(
+    customer_message: str,
+    drafted_response: str,
+    persona: str,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+) -> str:
+    """
+    Build the simulation prompt. Only the customer message is compacted
+    (quoted history and signatures dropped, then truncated if over budget);
+    the drafted response is always sent in full.
+    """
+    message = fit_message(
+        customer_message,
+        fixed_tokens=estimate_tokens(_render("", drafted_response, persona)),
+        token_budget=token_budget,
+    )
+    prompt = _render(message, drafted_response, persona)
+
+    report(
+        stage="time_travel",
+        verbose_prompt=_render(customer_message, drafted_response, persona),
+        prompt=prompt,
+        token_budget=token_budget,
+    )
+    return prompt
+
+
+def _render(customer_message: str, drafted_response: str, persona: str) -> str:
     return f"""
 You are simulating a possible next customer reply.
 
@@ -1,44 +1,597 @@
-import yaml
+"""
+LexIQ Labs – Prompt Library Validator
+
+Purpose:
+- Validate God Mode and pain point libraries (and keyword expansions)
+  against a declared schema
+- Lint ids, fingerprints and tags across the libraries of one directory
+- Validate many files in parallel (CI, deploy, hot reload)
+- Return structured diagnostics; exit non-zero when errors are found
+
+Usage:
+    python validate_prompts.py [--json] [--workers N] [PATH ...]
+
+PATH may be a library file or a directory of library files.
+Defaults to the stock libraries in prompts/.
+"""
+
+import argparse
+import json
 import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import yaml
+
+from language import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES
+from pain_point_matcher import normalize
+from prompt_library import GOD_MODE_PATH, KEYWORD_EXPANSIONS_PATH, PAIN_POINTS_PATH, load_yaml
+
+ERROR = "error"
+WARNING = "warning"
+INFO = "info"
+
+# field -> (type, required)
+GOD_MODE_ENTRY_SCHEMA = {
+    "id": (str, True),
+    "persona": (str, True),
+    "pain_point_tags": (list, True),
+    "fingerprint_id": (str, True),
+    "prompts": (dict, True),
+    "blend_type": (str, False),
+    "pain_point": (str, False),
+    "inspired_by": (str, False),
+    "psychology_used": (list, False),
+}
+
+PROMPT_EXAMPLE_SCHEMA = {
+    "id": (str, True),
+    "text": (str, True),
+}
+
+PAIN_POINT_ENTRY_SCHEMA = {
+    "id": (str, True),
+    "text": (str, True),
+    "keywords": (list, True),
+}
+
+PROMPT_MODES = ("safe", "direct")
+FINGERPRINT_PATTERN = re.compile(r"^lexq_[0-9a-f]{8}$")
+LIBRARY_EXTENSIONS = (".yaml", ".yml")
+
+# Below this many files, process start-up costs more than it saves
+PARALLEL_MIN_FILES = 4
+
+
+def _diagnostic(
+    severity: str,
+    code: str,
+    path: str,
+    message: str,
+    *,
+    section: Optional[str] = None,
+    entry_id: Optional[str] = None,
+) -> Dict:
+    return {
+        "severity": severity,
+        "code": code,
+        "file": path,
+        "section": section,
+        "entry_id": entry_id,
+        "message": message,
+    }
+
+
+def _check_fields(
+    entry: Dict,
+    schema: Dict,
+    path: str,
+    section: str,
+    entry_id: str,
+    diagnostics: List[Dict],
+) -> None:
+    for field, (expected, required) in schema.items():
+        if field not in entry or entry[field] is None:
+            if required:
+                diagnostics.append(_diagnostic(
+                    ERROR, "missing_field", path, f"missing '{field}'",
+                    section=section, entry_id=entry_id,
+                ))
+            continue
+
+        if not isinstance(entry[field], expected):
+            diagnostics.append(_diagnostic(
+                ERROR, "invalid_type", path,
+                f"'{field}' must be {expected.__name__}, "
+                f"got {type(entry[field]).__name__}",
+                section=section, entry_id=entry_id,
+            ))
+        elif required and not entry[field]:
+            diagnostics.append(_diagnostic(
+                ERROR, "empty_field", path, f"empty '{field}'",
+                section=section, entry_id=entry_id,
+            ))
+
+    for field in entry:
+        if field not in schema:
+            diagnostics.append(_diagnostic(
+                WARNING, "unknown_field", path, f"unknown field '{field}'",
+                section=section, entry_id=entry_id,
+            ))
+
+
+def _check_tags(
+    tags,
+    field: str,
+    path: str,
+    section: str,
+    entry_id: str,
+    diagnostics: List[Dict],
+) -> List[str]:
+    if not isinstance(tags, list):
+        return []
+
+    valid: List[str] = []
+    seen = set()
+
+    for tag in tags:
+        if not isinstance(tag, str) or not tag.strip():
+            diagnostics.append(_diagnostic(
+                ERROR, "invalid_tag", path, f"blank or non-string entry in '{field}'",
+                section=section, entry_id=entry_id,
+            ))
+            continue
+        if tag in seen:
+            diagnostics.append(_diagnostic(
+                WARNING, "duplicate_tag", path, f"'{tag}' repeated in '{field}'",
+                section=section, entry_id=entry_id,
+            ))
+            continue
+        seen.add(tag)
+        valid.append(tag)
+
+    return valid
+
+
+def _validate_god_mode(data, path: str, result: Dict) -> None:
+    diagnostics = result["diagnostics"]
+
+    for section, entries in data.items():
+        if not isinstance(entries, list):
+            diagnostics.append(_diagnostic(
+                ERROR, "invalid_section", path,
+                f"section '{section}' must be a list of prompts",
+                section=section,
+            ))
+            continue
+
+        for entry in entries:
+            if not isinstance(entry, dict):
+                diagnostics.append(_diagnostic(
+                    ERROR, "invalid_entry", path, "entry must be a mapping",
+                    section=section,
+                ))
+                continue
+
+            eid = entry.get("id") or "UNKNOWN"
+            _check_fields(entry, GOD_MODE_ENTRY_SCHEMA, path, section, eid, diagnostics)
+
+            result["ids"].append((eid, section))
+
+            persona = entry.get("persona")
+            if isinstance(persona, str) and persona != section:
+                diagnostics.append(_diagnostic(
+                    ERROR, "persona_mismatch", path,
+                    f"persona '{persona}' listed under section '{section}'",
+                    section=section, entry_id=eid,
+                ))
+
+            fingerprint = entry.get("fingerprint_id")
+            if isinstance(fingerprint, str):
+                result["fingerprints"].append((fingerprint, eid))
+                if not FINGERPRINT_PATTERN.match(fingerprint):
+                    diagnostics.append(_diagnostic(
+                        WARNING, "invalid_fingerprint", path,
+                        f"fingerprint '{fingerprint}' does not match lexq_<8 hex>",
+                        section=section, entry_id=eid,
+                    ))
+
+            for tag in _check_tags(
+                entry.get("pain_point_tags"), "pain_point_tags",
+                path, section, eid, diagnostics,
+            ):
+                result["tags"][section].setdefault(tag, eid)
+
+            prompts = entry.get("prompts")
+            if not isinstance(prompts, dict):
+                continue
+
+            for mode in PROMPT_MODES:
+                examples = prompts.get(mode)
+                if not examples:
+                    diagnostics.append(_diagnostic(
+                        ERROR, "missing_field", path, f"missing 'prompts.{mode}'",
+                        section=section, entry_id=eid,
+                    ))
+                    continue
+                if not isinstance(examples, list):
+                    diagnostics.append(_diagnostic(
+                        ERROR, "invalid_type", path, f"'prompts.{mode}' must be list",
+                        section=section, entry_id=eid,
+                    ))
+                    continue
+
+                for example in examples:
+                    if not isinstance(example, dict):
+                        diagnostics.append(_diagnostic(
+                            ERROR, "invalid_entry", path,
+                            f"'prompts.{mode}' items must be mappings",
+                            section=section, entry_id=eid,
+                        ))
+                        continue
+                    example_id = example.get("id") or eid
+                    _check_fields(
+                        example, PROMPT_EXAMPLE_SCHEMA,
+                        path, section, example_id, diagnostics,
+                    )
+                    if isinstance(example.get("id"), str):
+                        result["ids"].append((example["id"], section))
+
+            for mode in prompts:
+                if mode not in PROMPT_MODES:
+                    diagnostics.append(_diagnostic(
+                        WARNING, "unknown_field", path, f"unknown prompt mode '{mode}'",
+                        section=section, entry_id=eid,
+                    ))
+
+
+def _validate_pain_points(data, path: str, result: Dict) -> None:
+    diagnostics = result["diagnostics"]
+    sections = data.get("pain_points")
+
+    if not isinstance(sections, dict):
+        diagnostics.append(_diagnostic(
+            ERROR, "invalid_section", path,
+            "'pain_points' must map persona to a list of pain points",
+        ))
+        return
+
+    for section, entries in sections.items():
+        if not isinstance(entries, list):
+            diagnostics.append(_diagnostic(
+                ERROR, "invalid_section", path,
+                f"section '{section}' must be a list of pain points",
+                section=section,
+            ))
+            continue
+
+        for entry in entries:
+            if not isinstance(entry, dict):
+                diagnostics.append(_diagnostic(
+                    ERROR, "invalid_entry", path, "entry must be a mapping",
+                    section=section,
+                ))
+                continue
 
-GOD_MODE_PATH = os.path.join("prompts", "god_mode_prompts.yaml")
+            eid = entry.get("id") or "UNKNOWN"
+            _check_fields(entry, PAIN_POINT_ENTRY_SCHEMA, path, section, eid, diagnostics)
 
-def load_yaml(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+            result["ids"].append((eid, section))
 
-def validate_prompts():
-    data = load_yaml(GOD_MODE_PATH)
-    issues_found = False
+            for keyword in _check_tags(
+                entry.get("keywords"), "keywords",
+                path, section, eid, diagnostics,
+            ):
+                result["tags"][section].setdefault(keyword, eid)
 
-    for section in ["sales", "support", "success"]:
-        prompts = data.get(section, [])
-        for entry in prompts:
-            eid = entry.get("id", "UNKNOWN")
-            problems = []
 
-            if not entry.get("persona"):
-                problems.append("missing 'persona'")
+def _validate_keyword_expansions(data, path: str, result: Dict) -> None:
+    diagnostics = result["diagnostics"]
+    languages = data.get("keyword_expansions")
 
-            if "pain_point_tags" not in entry:
-                problems.append("missing 'pain_point_tags'")
-            elif not entry["pain_point_tags"]:
-                problems.append("empty 'pain_point_tags'")
+    if not isinstance(languages, dict):
+        diagnostics.append(_diagnostic(
+            ERROR, "invalid_section", path,
+            "'keyword_expansions' must map language to {keyword: [variants]}",
+        ))
+        return
 
-            if not isinstance(entry.get("prompts", {}), dict):
-                problems.append("missing or invalid 'prompts'")
+    for language, expansions in languages.items():
+        if language == DEFAULT_LANGUAGE or language not in SUPPORTED_LANGUAGES:
+            diagnostics.append(_diagnostic(
+                ERROR, "unsupported_language", path,
+                f"language '{language}' is not one of "
+                f"{', '.join(l for l in SUPPORTED_LANGUAGES if l != DEFAULT_LANGUAGE)}",
+                section=language,
+            ))
+            continue
+        if not isinstance(expansions, dict):
+            diagnostics.append(_diagnostic(
+                ERROR, "invalid_section", path,
+                f"section '{language}' must map keywords to lists of variants",
+                section=language,
+            ))
+            continue
+
+        for keyword, variants in expansions.items():
+            if not isinstance(variants, list) or not variants:
+                diagnostics.append(_diagnostic(
+                    ERROR, "invalid_type", path,
+                    f"variants of '{keyword}' must be a non-empty list",
+                    section=language, entry_id=str(keyword),
+                ))
+                continue
+            _check_tags(variants, str(keyword), path, language, str(keyword), diagnostics)
+            result["tags"][language].setdefault(str(keyword), str(keyword))
+
+
+def detect_kind(data) -> str:
+    if isinstance(data, dict) and "pain_points" in data:
+        return "pain_points"
+    if isinstance(data, dict) and "keyword_expansions" in data:
+        return "keyword_expansions"
+    return "god_mode"
+
+
+def validate_file(path: str) -> Dict:
+    """
+    Validate a single library file against its schema.
+
+    Returns:
+    {
+        "file": str,
+        "kind": "god_mode" | "pain_points" | "keyword_expansions" | None,
+        "diagnostics": List[Dict],
+        "ids": List[(id, section)],
+        "fingerprints": List[(fingerprint, id)],
+        "tags": {section: {tag: first_entry_id}}
+    }
+    """
+    result = {
+        "file": path,
+        "kind": None,
+        "diagnostics": [],
+        "ids": [],
+        "fingerprints": [],
+        "tags": defaultdict(dict),
+    }
+
+    try:
+        data = load_yaml(path)
+    except OSError as e:
+        result["diagnostics"].append(_diagnostic(ERROR, "unreadable", path, str(e)))
+        return result
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        where = f" (line {mark.line + 1}, column {mark.column + 1})" if mark else ""
+        problem = getattr(e, "problem", None) or str(e)
+        result["diagnostics"].append(_diagnostic(
+            ERROR, "parse_error", path, f"{problem}{where}",
+        ))
+        return result
+
+    if not isinstance(data, dict) or not data:
+        result["diagnostics"].append(_diagnostic(
+            ERROR, "invalid_document", path,
+            "library must be a non-empty mapping of persona sections",
+        ))
+        return result
+
+    result["kind"] = detect_kind(data)
+
+    if result["kind"] == "pain_points":
+        _validate_pain_points(data, path, result)
+    elif result["kind"] == "keyword_expansions":
+        _validate_keyword_expansions(data, path, result)
+    else:
+        _validate_god_mode(data, path, result)
+
+    result["tags"] = dict(result["tags"])
+    return result
+
+
+def lint_references(results: List[Dict]) -> List[Dict]:
+    """
+    Cross-check the libraries that live together (same directory).
+
+    - duplicate ids and fingerprints across all files of the group
+    - God Mode tags that no pain point uses (can never drive selection)
+    - pain point keywords that no God Mode prompt references (dangling)
+    - expanded keywords that no pain point uses (their variants never score)
+    """
+    diagnostics: List[Dict] = []
+
+    first_seen: Dict[tuple, str] = {}
+    for result in results:
+        kind = result["kind"]
+        for eid, section in result["ids"]:
+            key = (kind, eid)
+            if key in first_seen:
+                diagnostics.append(_diagnostic(
+                    ERROR, "duplicate_id", result["file"],
+                    f"id already defined in {first_seen[key]}",
+                    section=section, entry_id=eid,
+                ))
+            else:
+                first_seen[key] = result["file"]
+
+    fingerprints: Dict[str, str] = {}
+    for result in results:
+        for fingerprint, eid in result["fingerprints"]:
+            if fingerprint in fingerprints:
+                diagnostics.append(_diagnostic(
+                    ERROR, "duplicate_fingerprint", result["file"],
+                    f"fingerprint '{fingerprint}' already used by {fingerprints[fingerprint]}",
+                    entry_id=eid,
+                ))
             else:
-                if not entry["prompts"].get("safe"):
-                    problems.append("missing 'prompts.safe'")
-                if not entry["prompts"].get("direct"):
-                    problems.append("missing 'prompts.direct'")
+                fingerprints[fingerprint] = eid
+
+    god_mode = [r for r in results if r["kind"] == "god_mode"]
+    pain_points = [r for r in results if r["kind"] == "pain_points"]
+    expansions = [r for r in results if r["kind"] == "keyword_expansions"]
+
+    if expansions and pain_points:
+        # Expansions apply to every persona and match on normalized forms
+        known = {
+            normalize(tag)
+            for result in pain_points
+            for tags in result["tags"].values()
+            for tag in tags
+        }
+        for result in expansions:
+            for language, keywords in result["tags"].items():
+                for keyword in keywords:
+                    if normalize(keyword) not in known:
+                        diagnostics.append(_diagnostic(
+                            WARNING, "unknown_keyword", result["file"],
+                            f"expanded keyword '{keyword}' is not used by any pain point",
+                            section=language, entry_id=keyword,
+                        ))
+
+    if not god_mode or not pain_points:
+        return diagnostics
+
+    keywords: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for result in pain_points:
+        for section, tags in result["tags"].items():
+            for tag, eid in tags.items():
+                keywords[section].setdefault(tag, eid)
+
+    referenced: Dict[str, set] = defaultdict(set)
+    for result in god_mode:
+        for section, tags in result["tags"].items():
+            for tag, eid in tags.items():
+                referenced[section].add(tag)
+                if tag == "_wildcard":
+                    continue
+                if tag not in keywords.get(section, {}):
+                    diagnostics.append(_diagnostic(
+                        WARNING, "unused_tag", result["file"],
+                        f"tag '{tag}' is not used by any '{section}' pain point",
+                        section=section, entry_id=eid,
+                    ))
+
+    for result in pain_points:
+        for section, tags in result["tags"].items():
+            for tag, eid in tags.items():
+                if tag not in referenced.get(section, set()):
+                    diagnostics.append(_diagnostic(
+                        INFO, "dangling_tag", result["file"],
+                        f"keyword '{tag}' is not referenced by any '{section}' God Mode prompt",
+                        section=section, entry_id=eid,
+                    ))
+
+    return diagnostics
+
+
+def _expand_paths(paths: Sequence[str]) -> List[str]:
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(LIBRARY_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return [os.path.abspath(f) for f in files]
+
+
+def validate_prompts(
+    paths: Optional[Sequence[str]] = None,
+    *,
+    max_workers: Optional[int] = None,
+) -> Dict:
+    """
+    Validate library files (or directories of them).
+
+    Files are validated in a process pool when there are enough of them;
+    cross-library lints run per directory.
+
+    Returns:
+    {
+        "ok": bool,             # True when there are no errors
+        "files": int,
+        "counts": {severity: int},
+        "diagnostics": List[Dict]
+    }
+    """
+    default_paths = [GOD_MODE_PATH, PAIN_POINTS_PATH]
+    if os.path.exists(KEYWORD_EXPANSIONS_PATH):
+        default_paths.append(KEYWORD_EXPANSIONS_PATH)
+    files = _expand_paths(paths or default_paths)
+
+    if max_workers is None:
+        max_workers = min(len(files), os.cpu_count() or 1)
+
+    if max_workers > 1 and len(files) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(validate_file, files, chunksize=4))
+    else:
+        results = [validate_file(f) for f in files]
+
+    diagnostics: List[Dict] = []
+    groups: Dict[str, List[Dict]] = defaultdict(list)
+    for result in results:
+        diagnostics.extend(result["diagnostics"])
+        if result["kind"]:
+            groups[os.path.dirname(result["file"])].append(result)
+
+    for group in groups.values():
+        diagnostics.extend(lint_references(group))
+
+    counts = {ERROR: 0, WARNING: 0, INFO: 0}
+    for d in diagnostics:
+        counts[d["severity"]] += 1
+
+    return {
+        "ok": counts[ERROR] == 0,
+        "files": len(files),
+        "counts": counts,
+        "diagnostics": diagnostics,
+    }
+
+
+def _format(d: Dict) -> str:
+    where = os.path.relpath(d["file"])
+    if d["entry_id"]:
+        where += f" {d['entry_id']}"
+    if d["section"]:
+        where += f" ({d['section']})"
+    return f"[{d['severity']}] {d['code']}: {where}: {d['message']}"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate LexIQ prompt libraries.")
+    parser.add_argument("paths", nargs="*", help="library files or directories")
+    parser.add_argument("--json", action="store_true", help="emit JSON diagnostics")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--verbose", action="store_true", help="also print info diagnostics",
+    )
+    args = parser.parse_args(argv)
+
+    report = validate_prompts(args.paths, max_workers=args.workers)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for d in report["diagnostics"]:
+            if d["severity"] != INFO or args.verbose:
+                print(_format(d))
+        counts = report["counts"]
+        print(
+            f"{'✅' if report['ok'] else '❌'} {report['files']} file(s): "
+            f"{counts[ERROR]} error(s), {counts[WARNING]} warning(s), {counts[INFO]} info"
+        )
 
-            if problems:
-                issues_found = True
-                print(f"[⚠️] {eid} ({section}): {', '.join(problems)}")
+    return 0 if report["ok"] else 1
 
-    if not issues_found:
-        print("✅ All prompts are valid.")
 
 if __name__ == "__main__":
-    validate_prompts()
+    sys.exit(main())
@@ -7,15 +7,13 @@ Purpose:
 - Behavioural style, not linguistic imitation
 """
 
+from time import perf_counter
 from typing import Dict, List, Optional
 import os
 import json
-import requests
 
-GEMINI_ENDPOINT = (
-    "https://generativelanguage.googleapis.com/v1beta/models/"
-    "gemini-2.5-flash:generateContent"
-)
+import event_log
+from gemini_client import MISSING_API_KEY, GeminiError, first_candidate_text, generate_content
 
 
 def create_voice_profile(
@@ -32,6 +30,7 @@ def create_voice_profile(
 
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
+        event_log.emit("gemini_stage", stage="voice_profile", outcome="error", reason=MISSING_API_KEY)
         return None
 
     prompt = build_analysis_prompt(writing_samples)
@@ -50,27 +49,30 @@ def create_voice_profile(
         },
     }
 
+    start = perf_counter()
     try:
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={api_key}",
-            headers={"Content-Type": "application/json"},
-            data=json.dumps(payload),
+        data = generate_content(
+            stage="voice_profile",
+            payload=payload,
             timeout=timeout,
+            api_key=api_key,
         )
-        response.raise_for_status()
-        data = response.json()
-
-        raw = (
-            data["candidates"][0]["content"]["parts"][0]["text"]
-            if data.get("candidates")
-            else ""
+    except GeminiError as e:
+        event_log.emit(
+            "gemini_stage", stage="voice_profile", outcome="error",
+            latency_s=perf_counter() - start, reason=e.reason,
         )
-
-        return parse_voice_profile(raw)
-
-    except Exception:
         return None
 
+    result = parse_voice_profile(first_candidate_text(data))
+    event_log.emit(
+        "gemini_stage", stage="voice_profile",
+        outcome=event_log.OK if result is not None else "rejected",
+        latency_s=perf_counter() - start,
+        reason=None if result is not None else "unparseable_output",
+    )
+    return result
+
 
 def build_analysis_prompt(samples: List[str]) -> str:
     joined = "\n\n---\n\n".join(samples)